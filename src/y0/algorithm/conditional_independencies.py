@@ -2,31 +2,55 @@
 
 """An implementation to get conditional independencies of an ADMG."""
 
-import copy
+from collections import defaultdict
 from functools import partial
 from itertools import chain, combinations, groupby
-from typing import Iterable, List, Optional, Set, Tuple, Union
+from typing import (
+    Callable,
+    Collection,
+    DefaultDict,
+    Dict,
+    FrozenSet,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import networkx as nx
+import numpy as np
 from ananke.graphs import ADMG, SG
 from tqdm import tqdm
 
 from ..constants import NodeType
-from ..graph import NxMixedGraph
-from ..struct import DSeparationJudgement
+from ..graph import GraphChange, NxMixedGraph
+from ..struct import DSeparationJudgement, DSeparationSetJudgement, DSeparationTable
 from ..util.combinatorics import powerset
 
 __all__ = [
     "are_d_separated",
+    "bayes_ball",
+    "d_connected_set",
+    "DSeparationOracle",
     "minimal",
+    "minimal_d_separators",
+    "minimal_d_separations",
+    "ordered_local_markov",
     "get_conditional_independencies",
+    "topological_table_policy",
+    "update_conditional_independencies",
 ]
 
 
 def get_conditional_independencies(
-    graph: Union[NxMixedGraph[NodeType], SG],
+    graph: Union[NxMixedGraph[NodeType], SG, "DSeparationOracle[NodeType]"],
     *,
     policy=None,
+    minimal_separators: bool = False,
     **kwargs,
 ) -> Set[DSeparationJudgement[NodeType]]:
     """Get the conditional independencies from the given ADMG.
@@ -34,21 +58,28 @@ def get_conditional_independencies(
     Conditional independencies is the minmal set of d-separation judgements to cover
     the unique left/right combinations in all valid d-separation.
 
-    :param graph: An acyclic directed mixed graph
+    :param graph: An acyclic directed mixed graph, or a :class:`DSeparationOracle` for one
     :param policy: Retention policy when more than one conditional independency option exists (see minimal for details)
+    :param minimal_separators: If true, the policy chooses among all minimal d-separators of
+        each pair from :func:`minimal_d_separations` instead of the first separator found
+        by :func:`d_separations`
     :param kwargs: Other keyword arguments are passed to d_separations
     :return: A set of conditional dependencies
 
     .. seealso:: Original issue https://github.com/y0-causal-inference/y0/issues/24
     """
+    oracle = graph if isinstance(graph, DSeparationOracle) else None
+    if oracle is not None:
+        graph = oracle.graph
     if isinstance(graph, NxMixedGraph):
         graph = graph.to_admg()
     if policy is None:
         policy = topological_policy(graph)
-    return minimal(
-        d_separations(graph, **kwargs),
-        policy=policy,
-    )
+    if minimal_separators:
+        judgements = minimal_d_separations(graph, **kwargs)
+    else:
+        judgements = d_separations(graph if oracle is None else oracle, **kwargs)
+    return minimal(judgements, policy=policy)
 
 
 def minimal(
@@ -94,6 +125,21 @@ def _topological_policy(judgement: DSeparationJudgement, order):
     )
 
 
+def topological_table_policy(graph: ADMG):
+    """Sort the rows of a :class:`DSeparationTable` like :func:`topological_policy`.
+
+    :param graph: ADMG
+    :return: A function suitable for use as the policy of :meth:`DSeparationTable.minimal`
+    """
+    order = graph.topological_sort()
+    return partial(_topological_table_policy, order=order)
+
+
+def _topological_table_policy(table: DSeparationTable, order) -> List[np.ndarray]:
+    ranks = np.array([order.index(node) for node in table.nodes], dtype=np.int64)
+    return [table.sizes(), table.membership() @ ranks]
+
+
 def _judgement_grouper(judgement: DSeparationJudgement[NodeType]) -> Tuple[NodeType, NodeType]:
     """Simplify d-separation to just left & right element (for grouping left/right pairs)."""
     return judgement.left, judgement.right
@@ -104,27 +150,6 @@ def _len_lex(judgement: DSeparationJudgement) -> Tuple[int, str]:
     return len(judgement.conditions), ",".join(judgement.conditions)
 
 
-def disorient(graph: SG) -> nx.Graph:
-    """Convert an :mod:`ananke` mixed directed/undirected into a undirected (networkx) graph."""
-    rv = nx.Graph()
-    rv.add_nodes_from(graph.vertices)
-    rv.add_edges_from(chain(graph.di_edges, graph.ud_edges, graph.bi_edges))
-    return rv
-
-
-def get_moral_links(graph: SG) -> List[Tuple[NodeType, NodeType]]:
-    """Generate links to ensure all co-parents in a graph are linked.
-
-    May generate links that already exist as we assume we are not working on a multi-graph.
-
-    :param graph: Graph to process
-    :return: An collection of edges to add.
-    """
-    parents = [graph.parents([v]) for v in graph.vertices]
-    moral_links = [*chain(*[combinations(nodes, 2) for nodes in parents if len(parents) > 1])]
-    return moral_links
-
-
 def are_d_separated(
     graph: Union[SG, NxMixedGraph[NodeType]],
     a: NodeType,
@@ -132,7 +157,7 @@ def are_d_separated(
     *,
     conditions: Optional[Iterable[NodeType]] = None,
 ) -> DSeparationJudgement[NodeType]:
-    """Test if nodes named by a & b are d-separated in G.
+    r"""Test if nodes named by a & b are d-separated in G.
 
     a & b can be provided in either order and the order of conditions does not matter.
     However DSeparationJudgement may put things in canonical order.
@@ -142,35 +167,273 @@ def are_d_separated(
     :param b: A node in the graph
     :param conditions: A collection of graph nodes
     :return: T/F and the final graph (as evidence)
+
+    Bidirected edges are treated as having an arrowhead at each end, so two nodes joined by
+    a path of colliders, like :math:`A \leftrightarrow B \leftrightarrow C`, are
+    d-connected given the colliders, as in the m-separation criterion for ADMGs.
     """
-    if isinstance(graph, NxMixedGraph):
-        graph = graph.to_admg()
+    conditions = set(conditions) if conditions else set()
+    separated = a != b and b not in d_connected_set(graph, [a], conditions)
+    return DSeparationJudgement.create(left=a, right=b, conditions=conditions, separated=separated)
 
+
+def d_connected_set(
+    graph: Union[SG, NxMixedGraph[NodeType]],
+    sources: Iterable[NodeType],
+    conditions: Optional[Iterable[NodeType]] = None,
+) -> Set[NodeType]:
+    """Get all nodes that are d-connected to any of the sources given the conditions.
+
+    This answers :func:`are_d_separated` for every target at once with a single traversal
+    of the graph in linear time, following the "Bayes ball" reachability algorithm of Koller
+    and Friedman (2009), Algorithm 3.1. Bidirected edges and hyperedges have an arrowhead
+    at each end.
+
+    :param graph: Graph to test
+    :param sources: Nodes in the graph
+    :param conditions: A collection of graph nodes
+    :return: The nodes, other than the sources and the conditions, that aren't d-separated
+        from the sources given the conditions
+    """
+    if isinstance(graph, SG):
+        graph = NxMixedGraph.from_admg(graph)
+    sources = set(sources)
     conditions = set(conditions) if conditions else set()
-    named = {a, b}.union(conditions)
+    hyperedges: DefaultDict[NodeType, List[FrozenSet[NodeType]]] = defaultdict(list)
+    for nodes in graph.hyperedges.values():
+        for node in nodes:
+            hyperedges[node].append(nodes)
+
+    def _siblings(node: NodeType) -> Iterable[NodeType]:
+        yield from graph.undirected.neighbors(node)
+        for nodes in hyperedges.get(node, []):
+            for neighbor in nodes:
+                if neighbor != node:
+                    yield neighbor
+
+    reachable = bayes_ball(
+        sources,
+        conditions,
+        # colliders are open if they're ancestors of the conditions
+        ancestors=graph.ancestors_inclusive(conditions),
+        parents=graph.directed.predecessors,
+        children=graph.directed.successors,
+        siblings=_siblings,
+    )
+    return reachable - sources
+
+
+def bayes_ball(
+    sources: Iterable[NodeType],
+    conditions: Collection[NodeType],
+    ancestors: Collection[NodeType],
+    parents: Callable[[NodeType], Iterable[NodeType]],
+    children: Callable[[NodeType], Iterable[NodeType]],
+    siblings: Callable[[NodeType], Iterable[NodeType]],
+) -> Set[NodeType]:
+    """Get the nodes reachable from the sources by a path that's active given the conditions.
+
+    The graph is given by functions, so a mutilated graph can be searched without
+    constructing it, by leaving the removed edges out of the functions. For an unmodified
+    graph, use :func:`d_connected_set` instead.
+
+    :param sources: The nodes to start from
+    :param conditions: The nodes that are conditioned on
+    :param ancestors: The ancestors of the conditions, including the conditions
+    :param parents: A function from a node to its parents
+    :param children: A function from a node to its children
+    :param siblings: A function from a node to the nodes it shares a bidirected edge with
+    :return: The reachable nodes that aren't conditioned on, including the sources
+    """
+    # each node is visited at most once arriving from a tail ("up", from a child) and once
+    # arriving at an arrowhead ("down", from a parent or along a bidirected edge)
+    up: Set[NodeType] = set(sources)
+    down: Set[NodeType] = set()
+    stack = [(node, True) for node in up]
+    rv = set()
+    while stack:
+        node, from_tail = stack.pop()
+        if node not in conditions:
+            rv.add(node)
+        nexts: List[Tuple[NodeType, bool]] = []
+        if node not in conditions:
+            # leaving along a tail is never a collider
+            nexts.extend((child, False) for child in children(node))
+        if (from_tail and node not in conditions) or (not from_tail and node in ancestors):
+            # leaving along an arrowhead is a collider if the node was entered by one too
+            nexts.extend((parent, True) for parent in parents(node))
+            nexts.extend((sibling, False) for sibling in siblings(node))
+        for neighbor, to_tail in nexts:
+            visited = up if to_tail else down
+            if neighbor not in visited:
+                visited.add(neighbor)
+                stack.append((neighbor, to_tail))
+    return rv
 
-    # Filter to ancestors
-    keep = graph.ancestors(named)
-    graph = copy.deepcopy(graph.subgraph(keep))
 
-    # Moralize (link parents of mentioned nodes)
-    for u, v in get_moral_links(graph):  # type: ignore
-        graph.add_udedge(u, v)
+class DSeparationOracle(Generic[NodeType]):
+    r"""Answer d-separation queries on a graph, remembering the work done for earlier ones.
 
-    # disorient & remove conditions
-    evidence_graph = disorient(graph)
+    Each query is answered from the set of nodes d-connected to one of its nodes given its
+    conditions, from :func:`d_connected_set`. These sets are cached by the source and the
+    frozen set of conditions, so a query is answered without a traversal if either of its
+    nodes was the source of an earlier query with the same conditions, in either order.
+    Two more shortcuts avoid traversals:
 
-    keep = set(evidence_graph.nodes) - set(conditions)
-    evidence_graph = evidence_graph.subgraph(keep)
+    - adjacent nodes are never d-separated.
+    - d-separation satisfies composition and weak union, so if :math:`a` is d-separated from
+      both :math:`b` and :math:`w` given :math:`Z`, then :math:`a` is d-separated from
+      :math:`b` given :math:`Z \cup \{w\}`, which is checked against cached sets for each
+      :math:`w`.
 
-    # check for path....
-    separated = not nx.has_path(evidence_graph, a, b)  # If no path, then d-separated!
+    The oracle is bound to the version of the graph, and its cache is cleared when the graph
+    is changed through its mutators. It can be passed in place of the graph to
+    :func:`d_separations`, :func:`get_conditional_independencies`, and
+    :func:`y0.algorithm.identify.idc`, and shared between them.
 
-    return DSeparationJudgement.create(left=a, right=b, conditions=conditions, separated=separated)
+    .. code-block:: python
+
+        oracle = DSeparationOracle(graph)
+        judgements = get_conditional_independencies(oracle)
+        oracle.is_separated("X", "Y", ["Z"])
+        print(oracle.hit_rate)
+    """
+
+    def __init__(self, graph: Union[NxMixedGraph[NodeType], SG]) -> None:
+        """Create an oracle.
+
+        :param graph: The graph to answer queries on
+        """
+        if isinstance(graph, SG):
+            graph = NxMixedGraph.from_admg(graph)
+        self.graph = graph
+        self.version = graph.version
+        #: The number of queries answered from a cached traversal
+        self.hits = 0
+        #: The number of queries answered by adjacency or weak union without a traversal
+        self.inferred = 0
+        #: The number of queries that needed a new traversal
+        self.misses = 0
+        self._connected: Dict[Tuple[NodeType, FrozenSet[NodeType]], FrozenSet[NodeType]] = {}
+        self._mutilated: Dict[
+            Tuple[FrozenSet[NodeType], FrozenSet[NodeType]], "DSeparationOracle[NodeType]"
+        ] = {}
+
+    @property
+    def hit_rate(self) -> float:
+        """Get the fraction of queries that were answered without a new traversal."""
+        total = self.hits + self.inferred + self.misses
+        return (self.hits + self.inferred) / total if total else 0.0
+
+    def _check_version(self) -> None:
+        if self.graph.version != self.version:
+            self.version = self.graph.version
+            self._connected.clear()
+            self._mutilated.clear()
+
+    def d_connected_set(
+        self, source: NodeType, conditions: Optional[Iterable[NodeType]] = None
+    ) -> FrozenSet[NodeType]:
+        """Get all nodes that are d-connected to the source given the conditions.
+
+        :param source: A node in the graph
+        :param conditions: A collection of graph nodes
+        :return: The nodes, other than the source and the conditions, that aren't d-separated
+            from the source given the conditions
+        """
+        self._check_version()
+        key = source, frozenset(conditions or ())
+        rv = self._connected.get(key)
+        if rv is None:
+            self.misses += 1
+            rv = self._connected[key] = frozenset(d_connected_set(self.graph, [source], key[1]))
+        else:
+            self.hits += 1
+        return rv
+
+    def is_separated(
+        self, a: NodeType, b: NodeType, conditions: Optional[Iterable[NodeType]] = None
+    ) -> bool:
+        """Check if the nodes are d-separated given the conditions, as in :func:`are_d_separated`.
+
+        :param a: A node in the graph
+        :param b: A node in the graph
+        :param conditions: A collection of graph nodes
+        :return: If the nodes are d-separated
+        """
+        self._check_version()
+        if a == b:
+            return False
+        conditions = frozenset(conditions or ())
+        for source, target in ((a, b), (b, a)):
+            connected = self._connected.get((source, conditions))
+            if connected is not None:
+                self.hits += 1
+                return target not in connected
+        if self._is_adjacent(a, b):
+            self.inferred += 1
+            return False
+        if self._weak_union(a, b, conditions) or self._weak_union(b, a, conditions):
+            self.inferred += 1
+            return True
+        return b not in self.d_connected_set(a, conditions)
+
+    def are_d_separated(
+        self, a: NodeType, b: NodeType, conditions: Optional[Iterable[NodeType]] = None
+    ) -> DSeparationJudgement[NodeType]:
+        """Test if the nodes are d-separated given the conditions, as in :func:`are_d_separated`.
+
+        :param a: A node in the graph
+        :param b: A node in the graph
+        :param conditions: A collection of graph nodes
+        :return: The d-separation judgement
+        """
+        conditions = set(conditions) if conditions else set()
+        return DSeparationJudgement.create(
+            left=a, right=b, conditions=conditions, separated=self.is_separated(a, b, conditions)
+        )
+
+    def mutilate(
+        self, incoming: Iterable[NodeType] = (), outgoing: Iterable[NodeType] = ()
+    ) -> "DSeparationOracle[NodeType]":
+        """Get an oracle for the graph without the edges into some nodes and out of others.
+
+        The oracles are cached, so the same mutilated graphs share their queries, like the
+        checks of rule 2 of the do-calculus made by :func:`y0.algorithm.identify.idc`.
+
+        :param incoming: The nodes whose incoming edges are removed, as in :meth:`NxMixedGraph.intervene`
+        :param outgoing: The nodes whose outgoing edges are removed
+        :return: An oracle for the mutilated graph, which keeps all of the nodes
+        """
+        self._check_version()
+        key = frozenset(incoming), frozenset(outgoing)
+        rv = self._mutilated.get(key)
+        if rv is None:
+            graph = self.graph.intervene(key[0]).remove_outgoing_edges_from(key[1])
+            for node in self.graph.nodes():
+                # nodes that lose all of their edges are dropped, but are still d-separated
+                graph.add_node(node)
+            rv = self._mutilated[key] = DSeparationOracle(graph)
+        return rv
+
+    def _is_adjacent(self, a: NodeType, b: NodeType) -> bool:
+        return (
+            self.graph.directed.has_edge(a, b)
+            or self.graph.directed.has_edge(b, a)
+            or self.graph.undirected.has_edge(a, b)
+        )
+
+    def _weak_union(self, a: NodeType, b: NodeType, conditions: FrozenSet[NodeType]) -> bool:
+        """Check if a is d-separated from b and a condition given the other conditions."""
+        for condition in conditions:
+            connected = self._connected.get((a, conditions - {condition}))
+            if connected is not None and b not in connected and condition not in connected:
+                return True
+        return False
 
 
 def d_separations(
-    graph: Union[NxMixedGraph[NodeType], SG],
+    graph: Union[NxMixedGraph[NodeType], SG, DSeparationOracle[NodeType]],
     *,
     max_conditions: Optional[int] = None,
     verbose: Optional[bool] = False,
@@ -178,20 +441,376 @@ def d_separations(
 ) -> Iterable[DSeparationJudgement[NodeType]]:
     """Generate d-separations in the provided graph.
 
-    :param graph: Graph to search for d-separations.
+    :param graph: Graph to search for d-separations, or a :class:`DSeparationOracle` for it
     :param max_conditions: Longest set of conditions to investigate
     :param return_all: If false (default) only returns the first d-separation per left/right pair.
     :param verbose: If true, prints extra output with tqdm
     :yields: True d-separation judgements
     """
-    if isinstance(graph, NxMixedGraph):
-        graph = graph.to_admg()
-
-    vertices = set(graph.vertices)
+    # the nodes d-connected to the left node given each set of conditions are only found
+    # once, then shared by all of its pairs
+    oracle = graph if isinstance(graph, DSeparationOracle) else DSeparationOracle(graph)
+    vertices = set(oracle.graph.nodes())
     for a, b in tqdm(combinations(vertices, 2), disable=not verbose, desc="d-separation check"):
         for conditions in powerset(vertices - {a, b}, stop=max_conditions):
-            judgement = are_d_separated(graph, a, b, conditions=conditions)
-            if judgement.separated:
-                yield judgement
+            if oracle.is_separated(a, b, conditions):
+                yield DSeparationJudgement.create(left=a, right=b, conditions=conditions)
                 if not return_all:
                     break
+
+
+def minimal_d_separations(
+    graph: Union[NxMixedGraph[NodeType], SG],
+    *,
+    max_conditions: Optional[int] = None,
+    verbose: Optional[bool] = False,
+) -> Iterable[DSeparationJudgement[NodeType]]:
+    """Generate all minimal d-separations in the provided graph.
+
+    Unlike ``d_separations(graph, return_all=True)``, this doesn't test every subset of the
+    nodes, but gets the minimal d-separators of each pair from :func:`minimal_d_separators`.
+
+    :param graph: Graph to search for d-separations.
+    :param max_conditions: Longest set of conditions to keep
+    :param verbose: If true, prints extra output with tqdm
+    :yields: True d-separation judgements, whose conditions are minimal for their pair
+    """
+    if isinstance(graph, SG):
+        graph = NxMixedGraph.from_admg(graph)
+    vertices = set(graph.nodes())
+    for a, b in tqdm(combinations(vertices, 2), disable=not verbose, desc="d-separation check"):
+        for judgement in minimal_d_separators(graph, a, b):
+            if max_conditions is None or len(judgement.conditions) <= max_conditions:
+                yield judgement
+
+
+def minimal_d_separators(
+    graph: Union[NxMixedGraph[NodeType], SG], left: NodeType, right: NodeType
+) -> Iterable[DSeparationJudgement[NodeType]]:
+    """Generate all minimal sets of conditions that d-separate two nodes, with polynomial delay.
+
+    Every minimal d-separator of two nodes is made of their ancestors, so the minimal
+    d-separators are the minimal vertex separators of the nodes in the moral graph of their
+    ancestral subgraph. These are listed by starting from the separator closest to the left
+    node, then moving each of its nodes in turn to the left node's side and taking the
+    closest separator to that side, as in Kloks & Kratsch (1998).
+
+    :param graph: An acyclic directed mixed graph
+    :param left: A node in the graph
+    :param right: Another node in the graph
+    :yields: True d-separation judgements, one for each minimal d-separator of the nodes
+    """
+    if isinstance(graph, SG):
+        graph = NxMixedGraph.from_admg(graph)
+    moral = _ancestral_moral_graph(graph, [left, right])
+    if left == right or moral.has_edge(left, right):
+        return
+    separator = _close_separator(moral, {left}, right)
+    seen = {separator}
+    stack = [separator]
+    yield DSeparationJudgement.create(left=left, right=right, conditions=separator)
+    while stack:
+        separator = stack.pop()
+        side = _component(moral, left, separator)
+        for node in separator:
+            if moral.has_edge(node, right):
+                continue
+            child = _close_separator(moral, side | {node}, right)
+            if child not in seen:
+                seen.add(child)
+                stack.append(child)
+                yield DSeparationJudgement.create(left=left, right=right, conditions=child)
+
+
+def ordered_local_markov(
+    graph: Union[NxMixedGraph[NodeType], SG],
+    *,
+    order: Optional[Sequence[NodeType]] = None,
+    max_conditions: Optional[int] = None,
+    verbose: Optional[bool] = False,
+) -> Iterable[DSeparationSetJudgement[NodeType]]:
+    r"""Generate the d-separations of the ordered local Markov property.
+
+    For each node :math:`v` in a topological order, its predecessors and itself make an
+    ancestral set :math:`A`. In :math:`G_A`, the Markov blanket of :math:`v` is its district
+    and the parents of its district, so :math:`v` is d-separated from all of its other
+    predecessors jointly given the blanket (Richardson, 2003). In a DAG, these are the
+    d-separations of each node from its non-parent predecessors given its parents. Together,
+    the judgements imply all the other d-separations.
+
+    The districts are grown with the order, so all of the judgements are found in one pass
+    without testing any d-separations. There is at most one judgement per node, and nodes
+    that are d-separated from none of their predecessors are skipped.
+
+    :param graph: An acyclic directed mixed graph
+    :param order: A topological order of the nodes. By default, the graph's own.
+    :param max_conditions: Longest set of conditions to keep
+    :param verbose: If true, prints extra output with tqdm
+    :yields: A true d-separation judgement of each node from a set of its predecessors
+    :raises ValueError: If the order doesn't have each node once, or isn't topological
+    """
+    if isinstance(graph, SG):
+        graph = NxMixedGraph.from_admg(graph)
+    if order is None:
+        order = list(graph.topological_sort())
+    else:
+        position = {node: i for i, node in enumerate(order)}
+        if len(position) != len(order) or position.keys() != set(graph.nodes()):
+            raise ValueError("the order must contain each node of the graph exactly once")
+        # a node is before one of its ancestors if and only if it's before one of its parents
+        for parent, child in graph.directed.edges():
+            if position[child] < position[parent]:
+                raise ValueError(f"the order is not topological: {child} is before {parent}")
+    hyperedges: DefaultDict[NodeType, List[FrozenSet[NodeType]]] = defaultdict(list)
+    for nodes in graph.hyperedges.values():
+        for node in nodes:
+            hyperedges[node].append(nodes)
+
+    districts: Dict[NodeType, Set[NodeType]] = {}
+    for node in tqdm(order, disable=not verbose, desc="local Markov property"):
+        district = {node}
+        districts[node] = district
+        siblings = chain(graph.undirected.neighbors(node), *hyperedges.get(node, []))
+        for sibling in siblings:
+            other = districts.get(sibling)
+            if other is None or other is district:
+                continue
+            if len(district) < len(other):
+                district, other = other, district
+            district.update(other)
+            for member in other:
+                districts[member] = district
+
+        parents = (graph.directed.predecessors(member) for member in district)
+        blanket = district.union(*parents) - {node}
+        if max_conditions is not None and max_conditions < len(blanket):
+            continue
+        rest = [predecessor for predecessor in districts if predecessor not in blanket]
+        rest.remove(node)
+        if rest:
+            yield DSeparationSetJudgement.create(left=node, right=rest, conditions=blanket)
+
+
+def _ancestral_moral_graph(graph: NxMixedGraph[NodeType], nodes: Iterable[NodeType]) -> nx.Graph:
+    """Get the moral graph of the ancestral subgraph of the nodes.
+
+    Two nodes are connected if they are joined by a path on which every other node is a
+    collider, which is when both are in some district or its parents.
+
+    :param graph: An acyclic directed mixed graph
+    :param nodes: The nodes whose ancestors make up the subgraph
+    :return: An undirected graph over the ancestors of the nodes, including themselves
+    """
+    ancestral = graph.subgraph(graph.ancestors_inclusive(nodes))
+    rv = nx.Graph()
+    rv.add_nodes_from(ancestral.nodes())
+    for district in ancestral.get_c_components():
+        parents = {parent for node in district for parent in ancestral.directed.predecessors(node)}
+        rv.add_edges_from(combinations(district | parents, 2))
+    return rv
+
+
+def _component(graph: nx.Graph, source: NodeType, removed: Collection[NodeType]) -> Set[NodeType]:
+    """Get the connected component of the source after removing some nodes."""
+    rv = {source}
+    stack = [source]
+    while stack:
+        for neighbor in graph[stack.pop()]:
+            if neighbor not in rv and neighbor not in removed:
+                rv.add(neighbor)
+                stack.append(neighbor)
+    return rv
+
+
+def _close_separator(graph: nx.Graph, side: Set[NodeType], target: NodeType) -> FrozenSet[NodeType]:
+    """Get the minimal separator of the side and the target that is closest to the side."""
+    boundary = {neighbor for node in side for neighbor in graph[node]} - side
+    component = _component(graph, target, side | boundary)
+    return frozenset(neighbor for node in component for neighbor in graph[node]) - component
+
+
+def update_conditional_independencies(
+    graph: NxMixedGraph[NodeType],
+    judgements: Iterable[DSeparationJudgement[NodeType]],
+    changes: Iterable[GraphChange],
+    *,
+    max_conditions: Optional[int] = None,
+) -> Set[DSeparationJudgement[NodeType]]:
+    """Update the conditional independencies of a graph after it's been edited.
+
+    :param graph: The graph, after the changes have been made
+    :param judgements: The conditional independencies from before the changes, e.g., from
+        :func:`get_conditional_independencies`
+    :param changes: The changes made to the graph, e.g., from :meth:`NxMixedGraph.changes_since`
+    :param max_conditions: Longest set of conditions to investigate
+    :returns: The updated conditional independencies. The same pairs are d-separated as
+        when recalculating them from scratch, each by a set of conditions of the same size,
+        but not necessarily the same set when several of that size separate the pair.
+
+    The changes are replayed one at a time. Removing an edge can only make more pairs
+    d-separated, so for each pair, only smaller sets of conditions need to be checked.
+    Adding an edge can only make fewer pairs d-separated, so only the pairs whose previous
+    conditions no longer separate them need to be searched again. In both cases, whether
+    a pair is d-separated given some conditions only depends on the ancestral subgraph of
+    the pair and the conditions, so sets whose ancestors don't include the edge are skipped.
+
+    Changes to hyperedges aren't handled incrementally, and cause the conditional
+    independencies to be recalculated from scratch.
+    """
+    changes = list(changes)
+    if any(change.kind == "hyperedge" for change in changes):
+        return get_conditional_independencies(graph, max_conditions=max_conditions)
+
+    working = _undo_changes(graph, changes)
+    # use the same ordering as d_separations() for searching sets of conditions
+    order = list(set(graph.nodes()))
+    separations: Dict[Tuple[NodeType, NodeType], Optional[Tuple[NodeType, ...]]] = {
+        _pair(u, v): None for u, v in combinations(working.nodes(), 2)
+    }
+    for judgement in judgements:
+        separations[judgement.left, judgement.right] = judgement.conditions
+
+    for change in changes:
+        if change.kind == "node":
+            # a new node is separated from everything by the empty set, if it's searched
+            separated = max_conditions is None or 0 < max_conditions
+            for node in working.nodes():
+                separations[_pair(node, change.item)] = () if separated else None
+            working.add_node(change.item)
+            continue
+
+        _redo_change(working, change)
+        updater = _Updater(working, change, order, max_conditions)
+        for (left, right), conditions in separations.items():
+            if change.action == "add":
+                separations[left, right] = updater.update_after_adding(left, right, conditions)
+            else:
+                separations[left, right] = updater.update_after_removing(left, right, conditions)
+
+    return {
+        DSeparationJudgement.create(left=left, right=right, conditions=conditions)
+        for (left, right), conditions in separations.items()
+        if conditions is not None
+    }
+
+
+def _pair(u: NodeType, v: NodeType) -> Tuple[NodeType, NodeType]:
+    left, right = sorted([u, v])
+    return left, right
+
+
+def _undo_changes(
+    graph: NxMixedGraph[NodeType], changes: Sequence[GraphChange]
+) -> NxMixedGraph[NodeType]:
+    """Get a copy of the graph from before the changes were made."""
+    nodes = set(graph.nodes())
+    directed = set(graph.directed.edges())
+    undirected = {frozenset(edge) for edge in graph.undirected.edges()}
+    for change in reversed(changes):
+        edges: Set = directed if change.kind == "directed" else undirected
+        item = frozenset(change.item) if change.kind == "undirected" else change.item
+        if change.kind == "node":
+            nodes.discard(change.item)
+        elif change.action == "add":
+            edges.discard(item)
+        else:
+            edges.add(item)
+    return NxMixedGraph.from_edges(
+        nodes=nodes,
+        directed=directed,
+        undirected=[tuple(edge) for edge in undirected],
+        hyperedges=graph.hyperedges,
+    )
+
+
+def _redo_change(graph: NxMixedGraph[NodeType], change: GraphChange) -> None:
+    if change.kind == "directed" and change.action == "add":
+        graph.add_directed_edge(*change.item)
+    elif change.kind == "directed":
+        graph.remove_directed_edge(*change.item)
+    elif change.action == "add":
+        graph.add_undirected_edge(*change.item)
+    else:
+        graph.remove_undirected_edge(*change.item)
+
+
+class _Updater(Generic[NodeType]):
+    """Update the d-separation of each pair after a single edge has been added or removed."""
+
+    def __init__(
+        self,
+        graph: NxMixedGraph[NodeType],
+        change: GraphChange,
+        order: Sequence[NodeType],
+        max_conditions: Optional[int],
+    ) -> None:
+        self.graph = graph
+        self.vertices = [node for node in order if node in graph.nodes()]
+        self.max_conditions = max_conditions
+        self.index = graph.get_ancestor_index()
+        # Adding or removing u -> v changes the ancestors of nodes upstream of u, but not
+        # whether v is an ancestor of a set, so the new graph can be used for both
+        u, v = change.item
+        self.edge = self.index.to_bits([v] if change.kind == "directed" else [u, v])
+
+    def is_adjacent(self, left: NodeType, right: NodeType) -> bool:
+        """Check if the pair are adjacent, in which case they can't be d-separated."""
+        return (
+            self.graph.directed.has_edge(left, right)
+            or self.graph.directed.has_edge(right, left)
+            or self.graph.undirected.has_edge(left, right)
+        )
+
+    def is_relevant(self, left: NodeType, right: NodeType, conditions: Iterable[NodeType]) -> bool:
+        """Check if the edge is in the ancestral subgraph of the pair and conditions."""
+        ancestors = self.index.get_ancestor_bits(chain([left, right], conditions))
+        return self.edge & ancestors == self.edge
+
+    def separates(self, left: NodeType, right: NodeType, conditions: Iterable[NodeType]) -> bool:
+        """Check if the pair are d-separated given the conditions."""
+        return right not in d_connected_set(self.graph, [left], conditions)
+
+    def first_separating(
+        self, left: NodeType, right: NodeType, candidates: Iterable[Tuple[NodeType, ...]]
+    ) -> Optional[Tuple[NodeType, ...]]:
+        """Get the first set of conditions that separates the pair, if any."""
+        for conditions in candidates:
+            if self.separates(left, right, conditions):
+                return conditions
+        return None
+
+    def iter_candidates(
+        self, left: NodeType, right: NodeType, start: int = 0, stop: Optional[int] = None
+    ) -> Iterable[Tuple[NodeType, ...]]:
+        others = (node for node in self.vertices if node != left and node != right)
+        return powerset(others, start=start, stop=stop)  # type: ignore
+
+    def update_after_adding(
+        self, left: NodeType, right: NodeType, conditions: Optional[Tuple[NodeType, ...]]
+    ) -> Optional[Tuple[NodeType, ...]]:
+        """Update the conditions after an edge was added, where pairs can only become connected."""
+        if conditions is None or self.is_adjacent(left, right):
+            return None
+        if not self.is_relevant(left, right, conditions):
+            return conditions
+        if self.separates(left, right, conditions):
+            return conditions
+        # smaller sets of conditions still don't separate the pair
+        candidates = self.iter_candidates(left, right, len(conditions), self.max_conditions)
+        return self.first_separating(left, right, candidates)
+
+    def update_after_removing(
+        self, left: NodeType, right: NodeType, conditions: Optional[Tuple[NodeType, ...]]
+    ) -> Optional[Tuple[NodeType, ...]]:
+        """Update the conditions after an edge was removed, where pairs can only become separated."""
+        if self.is_adjacent(left, right):
+            return conditions
+        # the previous conditions still separate the pair, so only smaller sets need checking
+        stop = self.max_conditions if conditions is None else len(conditions)
+        candidates = (
+            candidate
+            for candidate in self.iter_candidates(left, right, stop=stop)
+            if self.is_relevant(left, right, candidate)
+        )
+        rv = self.first_separating(left, right, candidates)
+        return conditions if rv is None else rv
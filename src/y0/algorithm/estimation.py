@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+
+"""Numeric evaluation of estimands on discrete observational data.
+
+An estimand returned by :func:`y0.algorithm.identify.identify` is a symbolic expression built from
+:class:`y0.dsl.Probability`, :class:`y0.dsl.Product`, :class:`y0.dsl.Sum`, and :class:`y0.dsl.Fraction`.
+Given data, every probability term can be read off a single joint count tensor over the variables
+mentioned in the expression, so evaluation reduces to marginalizing, broadcasting, and dividing
+that tensor.
+
+Since only the count tensor is needed, data never has to be loaded all at once. Passing a path to a
+CSV or Parquet file reads it in chunks, keeps only the columns mentioned in the estimand, and
+accumulates the counts chunk by chunk with memory bounded by the chunk size and the number of
+distinct level combinations.
+
+All tensor operations carry a leading replicate axis. A point estimate is evaluated with a single
+replicate, while :func:`bootstrap` draws all of its resampled count tensors at once and evaluates
+them together in the same pass.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+import pandas as pd
+
+from ..dsl import (
+    CounterfactualVariable,
+    Expression,
+    Fraction,
+    One,
+    Probability,
+    Product,
+    Sum,
+    Variable,
+)
+
+__all__ = [
+    "CountTable",
+    "Table",
+    "evaluate",
+    "bootstrap",
+    "bootstrap_confidence_interval",
+]
+
+#: Data that can be evaluated against, either a data frame, a path to a CSV or Parquet file,
+#: or pre-computed counts
+DataHint = Union[pd.DataFrame, str, Path, "CountTable"]
+
+#: The default number of rows read at a time from files
+DEFAULT_CHUNKSIZE = 1_000_000
+
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+
+
+class CountTable(NamedTuple):
+    """Joint counts over a set of discrete variables."""
+
+    #: The variables, in the order of the axes of the count tensor
+    variables: Tuple[Variable, ...]
+    #: The observed levels of each variable, in the order of the corresponding axis
+    levels: Tuple[Tuple[Any, ...], ...]
+    #: A tensor of counts with one axis per variable
+    counts: np.ndarray
+
+    @classmethod
+    def from_frame(
+        cls, data: pd.DataFrame, variables: Optional[Iterable[Variable]] = None
+    ) -> CountTable:
+        """Count the joint occurrences of the given variables in a data frame.
+
+        :param data: A data frame whose columns are named after the variables
+        :param variables: The variables to count. If none given, uses all columns.
+        :returns: A count table. Rows with missing values in any of the variables are skipped.
+        """
+        names: Iterable[Union[str, Variable]] = (
+            [str(column) for column in data.columns] if variables is None else variables
+        )
+        variables = _ensure_variables(names)
+        if not variables:
+            return cls((), (), np.array(len(data), dtype=float))
+        codes, levels = [], []
+        for variable in variables:
+            column_codes, uniques = pd.factorize(data[variable.name], sort=True)
+            codes.append(column_codes)
+            levels.append(tuple(uniques))
+        shape = tuple(len(level) for level in levels)
+        codes_matrix = np.vstack(codes)
+        keep = (codes_matrix >= 0).all(axis=0)
+        flat = np.ravel_multi_index(tuple(codes_matrix[:, keep]), shape)
+        counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+        return cls(variables, tuple(levels), counts.astype(float))
+
+    @classmethod
+    def from_counts(cls, counts: pd.Series) -> CountTable:
+        """Build a count table from a series of counts indexed by level combinations.
+
+        :param counts: A series like the one returned by ``data.groupby(columns).size()``, whose
+            index names are the variable names
+        :returns: A count table
+        """
+        index = counts.index
+        if isinstance(index, pd.MultiIndex):
+            names = [str(name) for name in index.names]
+            arrays = [index.get_level_values(i) for i in range(index.nlevels)]
+        else:
+            names, arrays = [str(index.name)], [index]
+        codes, levels = [], []
+        for array in arrays:
+            array_codes, uniques = pd.factorize(array, sort=True)
+            codes.append(array_codes)
+            levels.append(tuple(uniques))
+        shape = tuple(len(level) for level in levels)
+        flat = np.ravel_multi_index(codes, shape)
+        tensor = np.zeros(int(np.prod(shape)), dtype=float)
+        np.add.at(tensor, flat, counts.to_numpy(dtype=float))
+        return cls(_ensure_variables(names), tuple(levels), tensor.reshape(shape))
+
+    @classmethod
+    def from_path(
+        cls,
+        path: Union[str, Path],
+        variables: Iterable[Variable],
+        *,
+        chunksize: Optional[int] = None,
+        **kwargs,
+    ) -> CountTable:
+        """Count the joint occurrences of the given variables in a file, one chunk at a time.
+
+        Only the columns for the given variables are read. The counts from each chunk are
+        accumulated, so memory is bounded by the chunk size and the number of distinct
+        combinations of levels rather than by the size of the file.
+
+        :param path: The path to a CSV file or a Parquet file (ending in ``.parquet`` or ``.pq``)
+        :param variables: The variables to count
+        :param chunksize: The number of rows to read at a time. Defaults to
+            :data:`DEFAULT_CHUNKSIZE`.
+        :param kwargs: Keyword arguments passed to :func:`pandas.read_csv` for CSV files
+        :returns: A count table. Rows with missing values in any of the variables are skipped.
+        :raises ValueError: If no variables are given or no complete rows are found
+        """
+        names = [variable.name for variable in _ensure_variables(variables)]
+        if not names:
+            raise ValueError("must give at least one variable to count")
+        if chunksize is None:
+            chunksize = DEFAULT_CHUNKSIZE
+        total: Optional[pd.Series] = None
+        for chunk in _iter_chunks(Path(path), names, chunksize=chunksize, **kwargs):
+            counts = chunk.groupby(names).size()
+            total = counts if total is None else total.add(counts, fill_value=0)
+        if total is None or total.empty:
+            raise ValueError(f"no complete rows for {names} in {path}")
+        return cls.from_counts(total)
+
+    @property
+    def total(self) -> float:
+        """Get the total number of counted rows."""
+        return float(self.counts.sum())
+
+
+class Table(NamedTuple):
+    """The numeric value of an expression, indexed by the levels of its free variables."""
+
+    #: The free variables of the expression, in the order of the trailing axes of ``values``
+    variables: Tuple[Variable, ...]
+    #: The levels of each free variable
+    levels: Tuple[Tuple[Any, ...], ...]
+    #: The values. If more axes are present than variables, the leading axis indexes replicates.
+    values: np.ndarray
+
+    def to_frame(self) -> pd.DataFrame:
+        """Get a data frame with one row per combination of levels and one column per replicate."""
+        index = (
+            pd.MultiIndex.from_product(self.levels, names=[v.name for v in self.variables])
+            if self.variables
+            else pd.RangeIndex(1)
+        )
+        if self.values.ndim == len(self.variables):
+            return pd.DataFrame({"value": self.values.ravel()}, index=index)
+        return pd.DataFrame(self.values.reshape(self.values.shape[0], -1).T, index=index)
+
+
+class _Factor(NamedTuple):
+    """An intermediate tensor with a leading replicate axis and one axis per variable."""
+
+    variables: Tuple[Variable, ...]
+    values: np.ndarray
+
+
+def evaluate(expression: Expression, data: DataHint) -> Table:
+    """Evaluate an expression on discrete data.
+
+    :param expression: An expression over observable (i.e., non-counterfactual) variables
+    :param data: A data frame with one column per variable, a path to a CSV or Parquet file
+        that is counted chunk by chunk, or a pre-computed count table
+    :returns: The value of the expression for every combination of levels of its free variables
+
+    >>> import pandas as pd
+    >>> from y0.dsl import P, X, Y
+    >>> df = pd.DataFrame({"X": [0, 0, 1, 1], "Y": [0, 1, 1, 1]})
+    >>> evaluate(P(Y | X), df).values.tolist()
+    [[0.5, 0.5], [0.0, 1.0]]
+    """
+    counts = _get_count_table(expression, data)
+    factor = _Evaluator(counts, counts.counts[np.newaxis, ...]).evaluate(expression)
+    return _to_table(factor, counts, squeeze=True)
+
+
+def bootstrap(
+    expression: Expression,
+    data: DataHint,
+    *,
+    replicates: int = 1000,
+    method: str = "multinomial",
+    seed: Union[None, int, np.random.Generator] = None,
+) -> Table:
+    """Evaluate an expression on many bootstrap replicates of the data at once.
+
+    Resampling rows with replacement is equivalent to drawing a multinomial over the cells of the
+    joint count tensor with probabilities proportional to the observed counts. Similarly, giving each
+    row an independent Poisson(1) weight is equivalent to drawing a Poisson count for each cell with
+    the observed count as its mean. Either way, all replicates are drawn directly on the count tensor
+    and evaluated in a single batched pass rather than re-running the evaluation per replicate.
+
+    :param expression: An expression over observable (i.e., non-counterfactual) variables
+    :param data: A data frame with one column per variable, a path to a CSV or Parquet file
+        that is counted chunk by chunk, or a pre-computed count table
+    :param replicates: The number of bootstrap replicates
+    :param method: Either "multinomial" (the classic bootstrap) or "poisson"
+    :param seed: A seed or random generator for reproducibility
+    :returns: A table whose values have a leading axis over the replicates
+    :raises ValueError: If an invalid method is given
+    """
+    counts = _get_count_table(expression, data)
+    rng = np.random.default_rng(seed)
+    flat = counts.counts.ravel()
+    if method == "multinomial":
+        total = int(round(flat.sum()))
+        draws = rng.multinomial(total, flat / flat.sum(), size=replicates)
+    elif method == "poisson":
+        draws = rng.poisson(flat, size=(replicates, flat.size))
+    else:
+        raise ValueError(f"invalid bootstrap method: {method}")
+    batch = draws.astype(float).reshape((replicates, *counts.counts.shape))
+    factor = _Evaluator(counts, batch).evaluate(expression)
+    return _to_table(factor, counts, squeeze=False)
+
+
+def bootstrap_confidence_interval(
+    expression: Expression,
+    data: DataHint,
+    *,
+    alpha: float = 0.05,
+    **kwargs,
+) -> Tuple[Table, Table]:
+    """Calculate percentile bootstrap confidence intervals for an expression.
+
+    :param expression: An expression over observable (i.e., non-counterfactual) variables
+    :param data: A data frame with one column per variable, a path to a CSV or Parquet file
+        that is counted chunk by chunk, or a pre-computed count table
+    :param alpha: The significance level. Defaults to 0.05 for a 95% interval.
+    :param kwargs: Keyword arguments passed to :func:`bootstrap`
+    :returns: A pair of tables with the lower and upper bounds
+    """
+    table = bootstrap(expression, data, **kwargs)
+    lower, upper = np.nanquantile(table.values, [alpha / 2, 1 - alpha / 2], axis=0)
+    return (
+        Table(table.variables, table.levels, lower),
+        Table(table.variables, table.levels, upper),
+    )
+
+
+def _ensure_variables(names: Iterable[Union[str, Variable]]) -> Tuple[Variable, ...]:
+    return tuple(Variable.norm(name) for name in names)
+
+
+def _get_count_table(expression: Expression, data: DataHint) -> CountTable:
+    variables = expression.get_variables()
+    if any(isinstance(v, CounterfactualVariable) for v in variables):
+        raise ValueError("can not evaluate counterfactual variables on observational data")
+    if isinstance(data, CountTable):
+        missing = variables.difference(data.variables)
+        if missing:
+            raise ValueError(f"count table is missing variables: {sorted(missing)}")
+        return _marginalize_count_table(data, variables)
+    if isinstance(data, (str, Path)):
+        return CountTable.from_path(data, sorted(variables))
+    return CountTable.from_frame(data, sorted(variables))
+
+
+def _iter_chunks(
+    path: Path, names: Sequence[str], *, chunksize: int, **kwargs
+) -> Iterator[pd.DataFrame]:
+    if path.suffix in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=list(names)):
+            yield batch.to_pandas()
+    else:
+        with pd.read_csv(path, usecols=list(names), chunksize=chunksize, **kwargs) as reader:
+            yield from reader
+
+
+def _marginalize_count_table(counts: CountTable, variables: Iterable[Variable]) -> CountTable:
+    variables = set(variables)
+    if variables == set(counts.variables):
+        return counts
+    keep = [i for i, v in enumerate(counts.variables) if v in variables]
+    drop = tuple(i for i, v in enumerate(counts.variables) if v not in variables)
+    return CountTable(
+        variables=tuple(counts.variables[i] for i in keep),
+        levels=tuple(counts.levels[i] for i in keep),
+        counts=counts.counts.sum(axis=drop),
+    )
+
+
+def _to_table(factor: _Factor, counts: CountTable, *, squeeze: bool) -> Table:
+    level_lookup = dict(zip(counts.variables, counts.levels))
+    values = factor.values[0] if squeeze else factor.values
+    return Table(
+        variables=factor.variables,
+        levels=tuple(level_lookup[v] for v in factor.variables),
+        values=values,
+    )
+
+
+class _Evaluator:
+    """Evaluate expressions against a batch of joint count tensors."""
+
+    def __init__(self, counts: CountTable, batch: np.ndarray) -> None:
+        """Prepare the evaluator.
+
+        :param counts: The count table describing the axes
+        :param batch: A tensor of counts whose leading axis indexes replicates and whose
+            remaining axes correspond to ``counts.variables``
+        """
+        self.axis = {variable: i for i, variable in enumerate(counts.variables)}
+        self.cardinality = {v: len(level) for v, level in zip(counts.variables, counts.levels)}
+        self.batch = batch
+        self._marginals: Dict[FrozenSet[Variable], _Factor] = {}
+
+    def _order(self, variables: Iterable[Variable]) -> Tuple[Variable, ...]:
+        return tuple(sorted(set(variables), key=self.axis.__getitem__))
+
+    def marginal(self, variables: Iterable[Variable]) -> _Factor:
+        """Get the joint counts over the given variables, summing out the others."""
+        key = frozenset(variables)
+        rv = self._marginals.get(key)
+        if rv is None:
+            drop = tuple(1 + i for v, i in self.axis.items() if v not in key)
+            rv = self._marginals[key] = _Factor(self._order(key), self.batch.sum(axis=drop))
+        return rv
+
+    def _expand(self, factor: _Factor, variables: Sequence[Variable]) -> np.ndarray:
+        """Insert singleton axes so the factor broadcasts against the given (ordered) variables."""
+        shape = [factor.values.shape[0]]
+        shape.extend(self.cardinality[v] if v in factor.variables else 1 for v in variables)
+        return factor.values.reshape(shape)
+
+    def _combine(self, left: _Factor, right: _Factor, operation) -> _Factor:
+        variables = self._order((*left.variables, *right.variables))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = operation(self._expand(left, variables), self._expand(right, variables))
+        return _Factor(variables, values)
+
+    def evaluate(self, expression: Expression) -> _Factor:
+        """Evaluate the expression to a tensor over its free variables."""
+        if isinstance(expression, Probability):
+            joint = self.marginal((*expression.children, *expression.parents))
+            return self._combine(joint, self.marginal(expression.parents), np.divide)
+        elif isinstance(expression, Product):
+            rv = _Factor((), np.ones(self.batch.shape[0]))
+            for subexpression in expression.expressions:
+                rv = self._combine(rv, self.evaluate(subexpression), np.multiply)
+            return rv
+        elif isinstance(expression, Fraction):
+            return self._combine(
+                self.evaluate(expression.numerator),
+                self.evaluate(expression.denominator),
+                np.divide,
+            )
+        elif isinstance(expression, Sum):
+            factor = self.evaluate(expression.expression)
+            ranges = set(expression.ranges)
+            axes = tuple(1 + i for i, v in enumerate(factor.variables) if v in ranges)
+            values = factor.values.sum(axis=axes)
+            # summing a term that does not depend on a variable multiplies it by the cardinality
+            for variable in ranges.difference(factor.variables):
+                values = values * self.cardinality[variable]
+            return _Factor(tuple(v for v in factor.variables if v not in ranges), values)
+        elif isinstance(expression, One):
+            return _Factor((), np.ones(self.batch.shape[0]))
+        raise NotImplementedError(f"can not evaluate {expression.__class__.__name__}")
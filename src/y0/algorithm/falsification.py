@@ -5,16 +5,68 @@
 This module includes algorithms to perform those tests.
 """
 
-from collections import abc
-from typing import Iterable, Optional, Union
+from collections import abc, defaultdict
+from functools import partial
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    TYPE_CHECKING,
+    Tuple,
+    Union,
+)
 
+import numpy as np
 import pandas as pd
 from ananke.graphs import SG
 from tqdm import tqdm
 
-from .conditional_independencies import get_conditional_independencies
-from ..struct import DSeparationJudgement
-from ..util.stat_utils import cressie_read
+from .conditional_independencies import (
+    get_conditional_independencies,
+    ordered_local_markov,
+    update_conditional_independencies,
+)
+from ..graph import NxMixedGraph
+from ..struct import DSeparationJudgement, DSeparationSetJudgement
+from ..util.stat_utils import (
+    AdaptivePowerDivergence,
+    FisherZ,
+    _encode_strata,
+    power_divergence_by_conditions,
+    power_divergence_by_groups,
+)
+
+if TYPE_CHECKING:
+    import pyarrow
+
+__all__ = [
+    "Falsifications",
+    "falsifications",
+    "falsifications_by_dataset",
+    "FalsificationSession",
+    "run_conditional_independence_tests",
+]
+
+#: The key for the result of a conditional independence test, (left, right, conditions),
+#: where right is a tuple when the left variable is tested against several jointly
+TestKey = Tuple[Hashable, Hashable, Tuple[Hashable, ...]]
+#: A d-separation to test, either between two nodes or between a node and a set of nodes
+Judgement = Union[DSeparationJudgement, DSeparationSetJudgement]
+#: The result of a conditional independence test, (chi^2, degrees of freedom, p-value)
+TestResult = Tuple[float, int, float]
+#: Data to test, either in memory or as an Arrow table or the path to a Parquet file
+DataHint = Union[pd.DataFrame, str, Path, "pyarrow.Table"]
+#: A function that tests several (left, right) pairs with the same conditions
+Tester = Callable[[List[Tuple[Hashable, Hashable]], Tuple[Hashable, ...]], Dict[Any, TestResult]]
 
 
 class Falsifications(abc.Sequence):
@@ -26,14 +78,16 @@ class Falsifications(abc.Sequence):
     - Values are the covariances measured between them.
     """
 
-    def __init__(self, failures, evidence: pd.DataFrame):
+    def __init__(self, failures, evidence: pd.DataFrame, untested: Optional[List[TestKey]] = None):
         """Create Falsifications result.
 
         :param failures: Sequence of implications that did not pass
         :param evidence: Collection of all implications tested
+        :param untested: Implications that were skipped because testing stopped early
         """
         self._failures = failures
         self.evidence = evidence
+        self.untested = untested or []
 
     def __getitem__(self, i):
         return self._failures[i]
@@ -46,41 +100,293 @@ class Falsifications(abc.Sequence):
 
 
 def falsifications(
-    to_test: Union[SG, Iterable[DSeparationJudgement]],
-    df: pd.DataFrame,
+    to_test: Union[SG, Iterable[Judgement]],
+    df: DataHint,
     significance_level: float = 0.05,
     max_given: Optional[int] = None,
     verbose: bool = False,
+    method: str = "cressie_read",
+    stop_early: bool = False,
+    max_tests: Optional[int] = None,
+    sample_size: Optional[int] = None,
+    seed: Optional[int] = None,
+    local_markov: bool = False,
 ) -> Falsifications:
     """Test conditional independencies implied by a graph.
 
     :param to_test: Either a graph to generate d-separation from or a list of D-separations to check.
-    :param df: Data to check for consistency with a causal implications
+    :param df: Data to check for consistency with a causal implications. Besides a data frame,
+        this can be an Arrow table or the path to a Parquet file, from which only the columns
+        mentioned in the implications are read.
     :param significance_level: Significance for p-value test
     :param max_given: The maximum set size in the power set of the vertices minus the d-separable pairs
     :param verbose: If true, use tqdm for status updates.
-    :return: Falsifications report
+    :param method: The conditional independence test, see :func:`run_conditional_independence_tests`
+    :param stop_early: If true, stop testing as soon as the graph is conclusively falsified.
+    :param max_tests: The maximum number of tests to run. By default, there's no limit.
+    :param sample_size: If given, each test starts on a random subsample of this many rows,
+        which is only grown while its decision is uncertain. See below.
+    :param seed: The seed for choosing the random subsamples
+    :param local_markov: If true and a graph is given, test the d-separations of its ordered
+        local Markov property, see :func:`y0.algorithm.conditional_independencies.ordered_local_markov`.
+        These are found in one pass over the graph, and each node is tested once against
+        all of the predecessors it's d-separated from.
+    :return: Falsifications report. When testing stops early, the evidence only contains the
+        tests that were run, and the rest are listed in its ``untested`` attribute.
+    :raises ValueError: If a sample size is given, or a set of nodes is tested jointly, for a
+        method other than ``cressie_read``
+
+    For screening many candidate graphs, it's often only necessary to know if each one is
+    falsified. With ``stop_early`` or ``max_tests``, the tests are run in order of the size
+    of their conditions, since these tests are the cheapest and have the most samples in
+    each stratum. Testing stops once any p-value is below
+    ``significance_level / (n + 1)``, where ``n`` is the number of implications. This is the
+    strictest level in the Holm–Bonferroni report over all ``n`` tests, so the
+    implication is flagged regardless of the p-values of the tests that weren't run.
+
+    On very large datasets, most tests can be decided on a small fraction of the rows. With
+    ``sample_size``, each test is run with :class:`y0.util.stat_utils.AdaptivePowerDivergence`,
+    which doubles the subsample until its p-value is either below the strictest
+    Holm–Bonferroni level divided by the number of subsample sizes, or is projected to still
+    be above ``significance_level`` with all rows. The statistics in the report are then the
+    ones from the subsample each test stopped on.
+
+    When a :class:`y0.struct.DSeparationSetJudgement` is tested, the joint state of its right
+    nodes is packed into a single column, which is tested against the left node with the
+    same degrees of freedom as their joint contingency table.
+    """
+    if isinstance(to_test, SG):
+        if local_markov:
+            to_test = ordered_local_markov(to_test, max_conditions=max_given, verbose=verbose)
+        else:
+            to_test = get_conditional_independencies(
+                to_test, max_conditions=max_given, verbose=verbose
+            )
+
+    keys = [(judgement.left, judgement.right, judgement.conditions) for judgement in to_test]
+    df = _add_joint_columns(_load_data(df, _get_columns(keys)), keys, method)
+    if sample_size is None:
+        tester = _get_tester(df, method)
+    elif method == "cressie_read":
+        tester = AdaptivePowerDivergence(
+            df,
+            reject_below=significance_level / (len(keys) + 1),
+            accept_above=significance_level,
+            initial_size=sample_size,
+            seed=seed,
+        ).test_by_conditions
+    else:
+        raise ValueError(f"subsampling is not available for {method}")
+
+    if not stop_early and max_tests is None:
+        variances = _run_grouped(keys, tester, verbose)
+        return _get_falsifications({key: variances[key] for key in keys}, significance_level)
+
+    variances = _run_sequential(
+        keys,
+        tester,
+        threshold=significance_level / (len(keys) + 1) if stop_early else None,
+        max_tests=max_tests,
+        verbose=verbose,
+    )
+    return _get_falsifications(
+        {key: variances[key] for key in keys if key in variances},
+        significance_level,
+        n_tests=len(keys),
+        untested=[key for key in keys if key not in variances],
+    )
+
+
+def falsifications_by_dataset(
+    to_test: Union[SG, Iterable[Judgement]],
+    datasets: Mapping[Hashable, DataHint],
+    significance_level: float = 0.05,
+    max_given: Optional[int] = None,
+    verbose: bool = False,
+    method: str = "cressie_read",
+) -> pd.DataFrame:
+    """Test conditional independencies implied by a graph against each of several datasets.
+
+    The conditional independencies are only generated once. For the ``cressie_read`` method,
+    the columns needed by the tests are taken from each dataset, stacked, and counted together
+    in a single pass with :func:`y0.util.stat_utils.power_divergence_by_groups`. The Holm–Bonferroni correction is
+    applied to each dataset separately, as in :func:`falsifications`.
+
+    :param to_test: Either a graph to generate d-separation from or a list of D-separations to check.
+    :param datasets: A dictionary from a key for each dataset, like its site or period, to its
+        data. As in :func:`falsifications`, these can also be Arrow tables or Parquet files.
+    :param significance_level: Significance for p-value test
+    :param max_given: The maximum set size in the power set of the vertices minus the d-separable pairs
+    :param verbose: If true, use tqdm for status updates.
+    :param method: The conditional independence test, see :func:`run_conditional_independence_tests`
+    :return: The evidence of each dataset's falsifications report, stacked with a ``dataset``
+        column containing its key
     """
     if isinstance(to_test, SG):
         to_test = get_conditional_independencies(to_test, max_conditions=max_given, verbose=verbose)
+    keys = [(judgement.left, judgement.right, judgement.conditions) for judgement in to_test]
+    columns = _get_columns(keys)
+    frames = {name: _load_data(data, columns) for name, data in datasets.items()}
 
-    variances = {
-        (judgement.left, judgement.right, judgement.conditions): cressie_read(
-            judgement.left, judgement.right, judgement.conditions, df, boolean=False
+    variances: Dict[Hashable, Dict[TestKey, TestResult]] = {}
+    if method == "cressie_read":
+        names = list(frames)
+        # the joint states are packed after stacking, so they have the same codes in each dataset
+        data = _add_joint_columns(
+            pd.concat([frames[name] for name in names], ignore_index=True), keys, method
         )
-        for judgement in tqdm(to_test, disable=not verbose, desc="Checking conditionals")
-    }
+        groups = np.repeat(np.arange(len(names)), [len(frames[name].index) for name in names])
+        for name in names:
+            variances[name] = {}
+        for conditions, pairs in tqdm(
+            _group_by_conditions(keys).items(),
+            disable=not verbose,
+            desc="Checking conditionals",
+            unit="condition",
+        ):
+            results = power_divergence_by_groups(pairs, conditions, data, groups)
+            for (left, right), group_results in results.items():
+                for name, result in zip(names, group_results):
+                    variances[name][left, right, conditions] = result
+    else:
+        for name, df in frames.items():
+            df = _add_joint_columns(df, keys, method)
+            variances[name] = run_conditional_independence_tests(keys, df, verbose, method)
+
+    evidences: List[pd.DataFrame] = []
+    for name in frames:
+        evidence = _get_falsifications(
+            {key: variances[name][key] for key in keys}, significance_level
+        ).evidence
+        evidence.insert(0, "dataset", [name] * len(evidence.index))
+        evidences.append(evidence)
+    return pd.concat(evidences, ignore_index=True)
+
+
+def run_conditional_independence_tests(
+    keys: Iterable[TestKey],
+    df: pd.DataFrame,
+    verbose: bool = False,
+    method: str = "cressie_read",
+) -> Dict[TestKey, TestResult]:
+    """Run a conditional independence test for each (left, right, conditions).
+
+    The tests are grouped by their conditions, so the work for each set of conditions is
+    only done once for all of the pairs that share it. The methods are:
 
+    - ``cressie_read``: for discrete data, the data are stratified by the conditions once.
+      The results are the same as calling :func:`y0.util.stat_utils.cressie_read` on each one.
+    - ``fisher_z``: for continuous data, the partial correlations are all calculated from
+      a single covariance matrix with :class:`y0.util.stat_utils.FisherZ`. The chi^2
+      statistic is the square of the z statistic, with one degree of freedom.
+
+    :param keys: The (left, right, conditions) triples to test
+    :param df: Data to check for consistency with a causal implications
+    :param verbose: If true, use tqdm for status updates.
+    :param method: The name of the conditional independence test
+    :return: A dictionary from each triple to its chi^2 statistic, degrees of freedom, and p-value
+    """
+    return _run_grouped(keys, _get_tester(df, method), verbose)
+
+
+def _get_tester(df: pd.DataFrame, method: str) -> Tester:
+    """Get a function that tests several pairs with the same conditions."""
+    if method == "cressie_read":
+        return partial(power_divergence_by_conditions, data=df, lambda_="cressie-read")
+    if method == "fisher_z":
+        return FisherZ(df).test_by_conditions
+    raise ValueError(f"unknown conditional independence test: {method}")
+
+
+def _group_by_conditions(
+    keys: Iterable[TestKey],
+) -> Dict[Tuple[Hashable, ...], List[Tuple[Hashable, Hashable]]]:
+    """Group the (left, right) pairs of the tests by their conditions."""
+    rv: DefaultDict[Tuple[Hashable, ...], List[Tuple[Hashable, Hashable]]] = defaultdict(list)
+    for left, right, conditions in keys:
+        rv[conditions].append((left, right))
+    return dict(rv)
+
+
+def _run_grouped(
+    keys: Iterable[TestKey], tester: Tester, verbose: bool
+) -> Dict[TestKey, TestResult]:
+    groups = _group_by_conditions(keys)
+    rv = {}
+    for conditions, pairs in tqdm(
+        groups.items(), disable=not verbose, desc="Checking conditionals", unit="condition"
+    ):
+        results = tester(pairs, conditions)
+        for (left, right), result in results.items():
+            rv[left, right, conditions] = result
+    return rv
+
+
+def _run_sequential(
+    keys: Iterable[TestKey],
+    tester: Tester,
+    threshold: Optional[float],
+    max_tests: Optional[int],
+    verbose: bool,
+) -> Dict[TestKey, TestResult]:
+    """Run tests with the smallest conditions first, until a p-value is below the threshold.
+
+    :param keys: The tests to run
+    :param tester: A function that runs the tests for pairs with the same conditions
+    :param threshold: Testing stops after the first group of tests with a p-value below this.
+        If none, testing doesn't stop early.
+    :param max_tests: Testing stops after this many tests have been run, if given
+    :param verbose: If true, use tqdm for status updates.
+    :return: The results of the tests that were run
+    """
+    groups = _group_by_conditions(keys)
+    rv: Dict[TestKey, TestResult] = {}
+    for conditions in tqdm(
+        sorted(groups, key=len), disable=not verbose, desc="Checking conditionals", unit="condition"
+    ):
+        pairs = groups[conditions]
+        if max_tests is not None:
+            if max_tests <= len(rv):
+                break
+            pairs = pairs[: max_tests - len(rv)]
+        results = tester(pairs, conditions)
+        for (left, right), result in results.items():
+            rv[left, right, conditions] = result
+        if threshold is not None and any(p < threshold for _, _, p in results.values()):
+            break
+    return rv
+
+
+def _get_falsifications(
+    variances: Dict[TestKey, TestResult],
+    significance_level: float,
+    n_tests: Optional[int] = None,
+    untested: Optional[List[TestKey]] = None,
+) -> Falsifications:
+    """Apply the Holm–Bonferroni correction to the test results and collect the failures.
+
+    :param variances: The results of the tests that were run
+    :param significance_level: Significance for p-value test
+    :param n_tests: The total number of tests in the family, if only some of them were run.
+        The levels are then the same as the first ones in the report over all of them.
+    :param untested: The tests that weren't run
+    :return: Falsifications report
+    """
     rows = [
         (left, right, given, chi, p, dof)
         for (left, right, given), (chi, dof, p) in variances.items()
     ]
+    if n_tests is None:
+        n_tests = len(rows)
 
     evidence = (
         pd.DataFrame(rows, columns=["left", "right", "given", "chi^2", "p", "dof"])
         .sort_values("p")
         .assign(
-            **{"Holm–Bonferroni level": significance_level / pd.Series(range(len(rows) + 1, 0, -1))}
+            **{
+                "Holm–Bonferroni level": significance_level
+                / pd.Series(range(n_tests + 1, n_tests - len(rows), -1))
+            }
         )
         .pipe(_assign_flags)
         .sort_values(["flagged", "dof"], ascending=False)
@@ -89,7 +395,190 @@ def falsifications(
     failures = evidence[evidence["flagged"]][["left", "right", "given"]].apply(
         tuple, axis="columns"
     )
-    return Falsifications(failures, evidence)
+    return Falsifications(failures, evidence, untested)
+
+
+class FalsificationSession:
+    """Falsify successive versions of a graph against the same dataset.
+
+    The result of each conditional independence test is cached, so after the graph is
+    edited, only the newly implied conditional independencies are tested. When the same
+    :class:`NxMixedGraph` is passed again after being edited through its mutators, its
+    conditional independencies are also updated incrementally with
+    :func:`update_conditional_independencies`.
+
+    .. code-block:: python
+
+        session = FalsificationSession(df)
+        issues = session.falsify(graph)
+        graph.add_directed_edge("X", "Y")
+        issues = session.falsify(graph)  # only runs tests for new implications
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        significance_level: float = 0.05,
+        max_given: Optional[int] = None,
+        verbose: bool = False,
+        method: str = "cressie_read",
+    ) -> None:
+        """Create a falsification session.
+
+        :param df: Data to check for consistency with a causal implications
+        :param significance_level: Significance for p-value test
+        :param max_given: The maximum set size in the power set of the vertices minus the d-separable pairs
+        :param verbose: If true, use tqdm for status updates.
+        :param method: The conditional independence test, see :func:`run_conditional_independence_tests`
+        """
+        # continuous data is used as is, since the covariance matrix is only calculated once
+        self.data = _encode(df) if method == "cressie_read" else df
+        self._tester = _get_tester(self.data, method)
+        self.significance_level = significance_level
+        self.max_given = max_given
+        self.verbose = verbose
+        #: The results of all conditional independence tests run so far. These stay valid
+        #: for the dataset, so they're kept even when they're no longer implied by the graph.
+        self.results: Dict[TestKey, TestResult] = {}
+        #: The conditional independencies implied by the last graph
+        self.judgements: Set[DSeparationJudgement] = set()
+        self._graph: Optional[NxMixedGraph] = None
+        self._version = 0
+
+    def falsify(
+        self, to_test: Union[SG, NxMixedGraph, Iterable[DSeparationJudgement]]
+    ) -> Falsifications:
+        """Test the conditional independencies implied by the graph, reusing earlier tests.
+
+        :param to_test: Either a graph to generate d-separation from or a list of D-separations to check.
+        :return: Falsifications report over all conditional independencies currently implied
+        """
+        self.judgements = self._get_judgements(to_test)
+        keys = [
+            (judgement.left, judgement.right, judgement.conditions) for judgement in self.judgements
+        ]
+        untested = [key for key in keys if key not in self.results]
+        self.results.update(_run_grouped(untested, self._tester, self.verbose))
+        return _get_falsifications(
+            {key: self.results[key] for key in keys}, self.significance_level
+        )
+
+    def _get_judgements(
+        self, to_test: Union[SG, NxMixedGraph, Iterable[DSeparationJudgement]]
+    ) -> Set[DSeparationJudgement]:
+        if not isinstance(to_test, (SG, NxMixedGraph)):
+            self._graph = None
+            return set(to_test)
+        if isinstance(to_test, SG):
+            self._graph = None
+            return get_conditional_independencies(
+                to_test, max_conditions=self.max_given, verbose=self.verbose
+            )
+        graph: NxMixedGraph = to_test
+        if graph is self._graph:
+            rv = update_conditional_independencies(
+                graph,
+                self.judgements,
+                graph.changes_since(self._version),
+                max_conditions=self.max_given,
+            )
+        else:
+            rv = get_conditional_independencies(
+                graph, max_conditions=self.max_given, verbose=self.verbose
+            )
+        self._graph, self._version = graph, graph.version
+        return rv
+
+
+def _get_columns(keys: Iterable[TestKey]) -> List[Hashable]:
+    """Get the columns mentioned in the tests, in order of their first appearance."""
+    rv: Dict[Hashable, None] = {}
+    for left, right, conditions in keys:
+        rights = right if isinstance(right, tuple) else (right,)
+        rv.update(dict.fromkeys((left, *rights, *conditions)))
+    return list(rv)
+
+
+def _add_joint_columns(df: pd.DataFrame, keys: Sequence[TestKey], method: str) -> pd.DataFrame:
+    """Add a column for each tuple of right variables with their joint state.
+
+    The states are packed into integer codes in the same way as the strata of the conditions,
+    with :func:`y0.util.stat_utils._encode_strata`. Each column is named by its tuple, and
+    rows where any of the variables are missing are missing.
+
+    :param df: A data frame with the columns used by the tests
+    :param keys: The (left, right, conditions) triples to test
+    :param method: The name of the conditional independence test
+    :return: The data frame, with a column added for each tuple of right variables
+    :raises ValueError: If there are any tuples and the method isn't ``cressie_read``
+    """
+    joint = list(dict.fromkeys(right for _, right, _ in keys if isinstance(right, tuple)))
+    if not joint:
+        return df
+    if method != "cressie_read":
+        raise ValueError(f"testing several variables jointly is not available for {method}")
+    df = df.copy(deep=False)
+    for right in joint:
+        codes = _encode_strata(right, df)
+        df[right] = np.where(codes < 0, np.nan, codes)
+    return df
+
+
+def _load_data(data: DataHint, columns: Sequence[Hashable]) -> pd.DataFrame:
+    """Get a data frame for testing from a data frame, an Arrow table, or a Parquet file.
+
+    Only the given columns are read from Parquet files, which are memory-mapped. The columns
+    of Arrow tables are converted to numpy without copying when possible, and dictionary
+    encoded columns are replaced by their integer codes, which the tests group on directly.
+    Only the given columns of data frames are kept, in the same order.
+
+    :param data: A data frame, an Arrow table, or the path to a Parquet file
+    :param columns: The columns used by the tests
+    :return: A data frame with the given columns
+    """
+    if isinstance(data, pd.DataFrame):
+        return data[pd.Index(columns)]
+    names = [str(column) for column in columns]
+    if isinstance(data, (str, Path)):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(data, columns=names, memory_map=True)
+    else:
+        table = data.select(names)
+    return pd.DataFrame(
+        {column: _arrow_to_numpy(table.column(name)) for column, name in zip(columns, names)},
+        copy=False,
+    )
+
+
+def _arrow_to_numpy(column: "pyarrow.ChunkedArray") -> np.ndarray:
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(column.type):
+        # the chunks can have different dictionaries, so they're unified before taking codes
+        column = pa.chunked_array(
+            [chunk.indices for chunk in column.unify_dictionaries().chunks],
+            type=column.type.index_type,
+        )
+    # missing values become NaN, which the tests skip
+    return column.to_numpy()
+
+
+def _encode(df: pd.DataFrame) -> pd.DataFrame:
+    """Replace the values in each column with integer codes, which are faster to group by.
+
+    Columns with missing values are kept as they are, since grouping skips them.
+
+    :param df: A data frame
+    :return: A data frame with the same index and columns, holding the codes
+    """
+    return pd.DataFrame(
+        {
+            name: column if column.isna().any() else pd.factorize(column)[0]
+            for name, column in df.items()
+        },
+        index=df.index,
+    )
 
 
 def _assign_flags(df: pd.DataFrame) -> pd.DataFrame:
@@ -4,11 +4,14 @@
 
 from .id_c import idc  # noqa:F401
 from .id_std import identify  # noqa:F401
+from .id_tian import QEstimand, identify_tian  # noqa:F401
 from .utils import Unidentifiable, Identification, Query  # noqa:F401
 
 __all__ = [
     "identify",
     "idc",
+    "identify_tian",
+    "QEstimand",
     "Unidentifiable",
     "Query",
     "Identification",
@@ -2,29 +2,180 @@
 
 """Implementation of the IDC algorithm."""
 
+from collections import defaultdict
+from functools import partial
+from typing import Collection, DefaultDict, Dict, FrozenSet, Iterable, List, Optional, Set
+
 from .id_std import identify
-from .utils import Identification
-from ..conditional_independencies import are_d_separated
+from .utils import Identification, Query
+from ..conditional_independencies import DSeparationOracle, bayes_ball, d_connected_set
 from ...dsl import Expression, Variable
+from ...graph import NxMixedGraph
 
 __all__ = [
     "idc",
     "rule_2_of_do_calculus_applies",
+    "rule_2_table",
 ]
 
 
-def idc(identification: Identification) -> Expression:
+def idc(
+    identification: Identification, oracle: Optional[DSeparationOracle[Variable]] = None
+) -> Expression:
     """Run the IDC algorithm.
 
     :param identification: The identification tuple
+    :param oracle: A d-separation oracle for the graph of the identification tuple. If given,
+        the checks of rule 2 are answered by its mutilated oracles, so they are shared with
+        other calls that use the same oracle. It must be bound to the same graph object, so
+        its cache follows the version of the graph.
     :returns: An expression created by the :func:`identify` algorithm after simplifying the original query
+    :raises ValueError: If the oracle isn't bound to the graph of the identification tuple
     """
-    for condition in identification.conditions:
-        if rule_2_of_do_calculus_applies(identification=identification, condition=condition):
-            return idc(identification.exchange_observation_with_action(condition))
+    if oracle is not None and oracle.graph is not identification.graph:
+        raise ValueError("the d-separation oracle must be bound to the graph being identified")
+    outcomes = identification.outcomes
+    treatments = identification.treatments
+    conditions = identification.conditions
+
+    # Exchange conditions for treatments until rule 2 no longer applies to any of them.
+    # Without an oracle, each check is one traversal from the condition that skips the edges
+    # removed by the mutilation, so no mutilated graphs are constructed. With one, the checks
+    # are answered by its cached mutilated oracles.
+    exchanged = True
+    while exchanged:
+        exchanged = False
+        if oracle is None:
+            applies = _Rule2Separator(
+                identification.graph, outcomes, treatments, conditions
+            ).applies
+        else:
+            applies = partial(_oracle_rule_2_applies, oracle, outcomes, treatments, conditions)
+        for condition in conditions:
+            if applies(condition):
+                treatments, conditions = treatments | {condition}, conditions - {condition}
+                exchanged = True
+                break
 
     # Run ID algorithm
-    return identify(identification.uncondition()).marginalize(identification.outcomes)
+    unconditioned = Identification(
+        query=Query(outcomes=outcomes | conditions, treatments=treatments),
+        graph=identification.graph,
+        estimand=identification.estimand,
+    )
+    return identify(unconditioned).marginalize(outcomes)
+
+
+def _oracle_rule_2_applies(
+    oracle: DSeparationOracle[Variable],
+    outcomes: Collection[Variable],
+    treatments: Collection[Variable],
+    conditions: Collection[Variable],
+    condition: Variable,
+) -> bool:
+    mutilated = oracle.mutilate(incoming=treatments, outgoing=[condition])
+    blocked = set(treatments).union(conditions) - {condition}
+    return not mutilated.d_connected_set(condition, blocked).intersection(outcomes)
+
+
+def rule_2_table(identification: Identification) -> Dict[Variable, bool]:
+    r"""Check if rule 2 of the do-calculus applies to each of the conditions.
+
+    This gives the same results as calling :func:`rule_2_of_do_calculus_applies` on each
+    condition, but doesn't construct :math:`G_{\bar{\mathbf{X}}\underline{Z}}` for each
+    one. Instead, each condition is checked with a single traversal from it with
+    :func:`y0.algorithm.conditional_independencies.bayes_ball`, which skips the edges into
+    the treatments and out of the condition. The ancestors of the blocked nodes in the
+    mutilated graph are also found separately for each condition.
+
+    :param identification: The identification tuple
+    :returns: A dictionary from each condition to whether rule 2 applies to it
+    """
+    separator = _Rule2Separator(
+        identification.graph,
+        identification.outcomes,
+        identification.treatments,
+        identification.conditions,
+    )
+    return {condition: separator.applies(condition) for condition in identification.conditions}
+
+
+class _Rule2Separator:
+    r"""Check d-separations of the outcomes from each condition in :math:`G_{\bar{X}\underline{Z}}`.
+
+    The graph is searched from each condition with
+    :func:`y0.algorithm.conditional_independencies.bayes_ball`, where edges into the
+    treatments and out of the condition are skipped, so no new graphs are constructed.
+    """
+
+    def __init__(
+        self,
+        graph: NxMixedGraph[Variable],
+        outcomes: Collection[Variable],
+        treatments: Collection[Variable],
+        conditions: Collection[Variable],
+    ) -> None:
+        self.graph = graph
+        self.outcomes = set(outcomes)
+        self.treatments = set(treatments)
+        self.named = self.outcomes | self.treatments | set(conditions)
+        self.hyperedges: DefaultDict[Variable, List[FrozenSet[Variable]]] = defaultdict(list)
+        for nodes in graph.hyperedges.values():
+            for node in nodes:
+                self.hyperedges[node].append(nodes)
+
+    def _parents(self, node: Variable, condition: Variable) -> Iterable[Variable]:
+        if node in self.treatments:
+            return
+        for parent in self.graph.directed.predecessors(node):
+            if parent != condition:
+                yield parent
+
+    def _children(self, node: Variable, condition: Variable) -> Iterable[Variable]:
+        if node == condition:
+            return
+        for child in self.graph.directed.successors(node):
+            if child not in self.treatments:
+                yield child
+
+    def _siblings(self, node: Variable) -> Iterable[Variable]:
+        if node in self.treatments:
+            return
+        for neighbor in self._bidirected_neighbors(node):
+            if neighbor not in self.treatments:
+                yield neighbor
+
+    def _bidirected_neighbors(self, node: Variable) -> Iterable[Variable]:
+        yield from self.graph.undirected.neighbors(node)
+        for nodes in self.hyperedges.get(node, []):
+            for neighbor in nodes:
+                if neighbor != node:
+                    yield neighbor
+
+    def _ancestors_inclusive(
+        self, sources: Iterable[Variable], condition: Variable
+    ) -> Set[Variable]:
+        rv = set(sources)
+        stack = list(rv)
+        while stack:
+            for parent in self._parents(stack.pop(), condition):
+                if parent not in rv:
+                    rv.add(parent)
+                    stack.append(parent)
+        return rv
+
+    def applies(self, condition: Variable) -> bool:
+        """Check if rule 2 of the do-calculus applies to the condition."""
+        blocked = self.named - self.outcomes - {condition}
+        connected = bayes_ball(
+            [condition],
+            blocked,
+            ancestors=self._ancestors_inclusive(blocked, condition),
+            parents=partial(self._parents, condition=condition),
+            children=partial(self._children, condition=condition),
+            siblings=self._siblings,
+        )
+        return not connected.intersection(self.outcomes)
 
 
 def rule_2_of_do_calculus_applies(identification: Identification, condition: Variable) -> bool:
@@ -52,8 +203,9 @@ def rule_2_of_do_calculus_applies(identification: Identification, condition: Var
     # TODO give a better name
     graph_mod = graph.intervene(treatments).remove_outgoing_edges_from([condition])
 
-    judgements = [
-        are_d_separated(graph_mod, outcome, condition, conditions=conditions)
-        for outcome in identification.outcomes
-    ]
-    return all(judgement.separated for judgement in judgements)
+    # the mutilated graph drops nodes that lose all of their edges, which are d-separated
+    if condition not in graph_mod.nodes():
+        return True
+    # a single traversal from the condition answers the d-separation of every outcome
+    connected = d_connected_set(graph_mod, [condition], conditions.intersection(graph_mod.nodes()))
+    return not connected.intersection(identification.outcomes)
@@ -2,10 +2,11 @@
 
 """An implementation of the identification algorithm."""
 
-from typing import List, Sequence
+from typing import Collection, List, Sequence
 
 from .utils import Identification, Unidentifiable
 from ...dsl import Expression, P, Probability, Product, Sum, Variable
+from ...graph import NxMixedGraph
 
 
 def identify(identification: Identification) -> Expression:
@@ -24,8 +25,13 @@ def identify(identification: Identification) -> Expression:
     if not treatments:
         return Sum.safe(expression=P(vertices), ranges=vertices.difference(outcomes))
 
-    # line 2
+    # If there are no bidirected edges between ancestors of the outcomes, the
+    # recursion bottoms out in the truncated factorization, so build it directly
     outcomes_and_ancestors = graph.ancestors_inclusive(outcomes)
+    if not (outcomes & treatments) and _is_markovian(graph, outcomes_and_ancestors):
+        return identify_markovian(identification)
+
+    # line 2
     not_outcomes_or_ancestors = vertices.difference(outcomes_and_ancestors)
     if not_outcomes_or_ancestors:
         return identify(line_2(identification))
@@ -71,6 +77,84 @@ def identify(identification: Identification) -> Expression:
     return identify(line_7(identification))
 
 
+def identify_markovian(identification: Identification) -> Expression:
+    r"""Identify a query in one pass when the ancestral graph of the outcomes is Markovian.
+
+    When there are no bidirected edges between the ancestors of :math:`\mathbf Y`, every
+    query is identifiable and lines 2, 3, 4, and 6 of :func:`identify` always fire in the
+    same order. This function constructs the resulting truncated factorization directly
+    instead of building the intermediate subgraphs and :class:`Identification` objects.
+
+    .. math::
+
+        \sum_{\mathbf V - (\mathbf Y \cup \mathbf X)} \prod_{V_i \in \mathbf V - \mathbf X}
+        P\left(v_i | An(V_i)_G - \{V_i\}\right)
+
+    where :math:`\mathbf V = An(\mathbf Y)_G` and :math:`\mathbf X` has been extended with
+    the variables that have no effect on :math:`\mathbf Y` as in line 3.
+
+    :param identification: The data structure with the treatment, outcomes, estimand, and graph
+    :returns: The same expression as the recursive :func:`identify` algorithm
+    :raises ValueError: If there are bidirected edges between ancestors of the outcomes or
+        if the outcomes and treatments overlap
+    """
+    graph = identification.graph
+    outcomes = identification.outcomes
+    treatments = identification.treatments
+
+    # line 1
+    if not treatments:
+        return line_1(identification)
+
+    if outcomes & treatments:
+        raise ValueError("outcomes and treatments should not overlap")
+    vertices = graph.ancestors_inclusive(outcomes)
+    if not _is_markovian(graph, vertices):
+        raise ValueError("ancestral graph of the outcomes has bidirected edges")
+
+    # line 2
+    treatments = treatments & vertices
+    if not treatments:
+        return Sum.safe(expression=P(vertices), ranges=vertices.difference(outcomes))
+    graph = graph.subgraph(vertices)
+
+    # line 3
+    treatments = treatments | (
+        (vertices - treatments) - graph.intervene(treatments).ancestors_inclusive(outcomes)
+    )
+
+    ordering = list(graph.topological_sort())
+    remaining = vertices - treatments
+
+    # line 6, since the only district without treatments is the outcome itself
+    if 1 == len(remaining):
+        (outcome,) = remaining
+        return Product.safe(p_parents(outcome, ordering))
+
+    # line 4, where each district is a single variable that is identified
+    # by line 1 or line 6 on its own ancestral graph
+    expression = Product.safe(
+        _markovian_factor(graph, v, ordering) for v in ordering if v in remaining
+    )
+    return Sum.safe(expression=expression, ranges=remaining.difference(outcomes))
+
+
+def _markovian_factor(
+    graph: NxMixedGraph[Variable], child: Variable, ordering: Sequence[Variable]
+) -> Expression:
+    ancestors = graph.ancestors_inclusive([child])
+    if 1 == len(ancestors):
+        return Sum.safe(expression=P(ancestors), ranges=())
+    return Product.safe(p_parents(child, [v for v in ordering if v in ancestors]))
+
+
+def _is_markovian(graph: NxMixedGraph[Variable], vertices: Collection[Variable]) -> bool:
+    """Check that there are no bidirected edges between the given vertices."""
+    return not any(
+        u in vertices and v in vertices for u, v in graph.undirected.edges()
+    ) and not any(1 < len(nodes.intersection(vertices)) for nodes in graph.hyperedges.values())
+
+
 def line_1(identification: Identification) -> Expression:
     r"""Run line 1 of identification algorithm.
 
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+"""A non-recursive implementation of the identification algorithm based on Q-factors.
+
+This follows the C-component decomposition of [tian2002]_, where the interventional
+distribution is factorized into a product of Q-factors, one per district of the graph
+without the treatments. Each Q-factor is identified with an iterative loop over
+ancestral sets and districts instead of the recursion used by :func:`identify`.
+
+.. [tian2002] Tian, J., & Pearl, J. (2002). `A general identification condition for
+   causal effects <https://ftp.cs.ucla.edu/pub/stat_ser/r290-A.pdf>`_. AAAI/IAAI, 567-573.
+"""
+
+from collections import defaultdict
+from typing import (
+    Collection,
+    DefaultDict,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Set,
+)
+
+import networkx as nx
+
+from .utils import Identification, Unidentifiable
+from ...dsl import Expression, Fraction, P, Product, QFactor, Sum, Variable
+from ...graph import NxMixedGraph
+
+__all__ = [
+    "QEstimand",
+    "identify_tian",
+]
+
+
+class QEstimand(NamedTuple):
+    """An estimand written as a function of Q-factors, along with their definitions."""
+
+    #: The estimand, in which each district is represented by a :class:`QFactor`
+    estimand: Expression
+    #: The definitions of the Q-factors in terms of the observational distribution
+    factors: Mapping[QFactor, Expression]
+
+    def expand(self) -> Expression:
+        """Substitute the definitions of the Q-factors into the estimand.
+
+        :returns: An expression over the observational distribution that is equivalent
+            to the one returned by :func:`y0.algorithm.identify.identify`
+        """
+        return _substitute(self.estimand, self.factors)
+
+
+def identify_tian(identification: Identification) -> QEstimand:
+    """Run the Q-factor based identification algorithm.
+
+    :param identification: The identification tuple
+    :returns: The estimand written over Q-factors, along with their definitions
+    :raises Unidentifiable: If no appropriate identification can be found
+
+    # noqa: DAR402 Unidentifiable
+    """
+    engine = _Engine(identification.graph)
+    estimand = engine.identify(
+        outcomes=set(identification.outcomes),
+        treatments=set(identification.treatments),
+        vertices=set(identification.graph.nodes()),
+    )
+    return QEstimand(estimand=estimand, factors=engine.factors)
+
+
+class _Engine:
+    """Holds the state shared while identifying the Q-factors of a single query.
+
+    Rather than creating a new graph for every subproblem, the current subproblem is
+    represented by its set of vertices, which induces a subgraph of the original graph.
+    """
+
+    def __init__(self, graph: NxMixedGraph[Variable]) -> None:
+        self.graph = graph
+        self.ordering: List[Variable] = list(graph.topological_sort())
+        self.factors: Dict[QFactor, Expression] = {}
+        self.hyperedges: DefaultDict[Variable, List[FrozenSet[Variable]]] = defaultdict(list)
+        for nodes in graph.hyperedges.values():
+            for node in nodes:
+                self.hyperedges[node].append(nodes)
+
+    def identify(
+        self, outcomes: Set[Variable], treatments: Set[Variable], vertices: Set[Variable]
+    ) -> Expression:
+        """Identify the effect of the treatments on the outcomes in the induced subgraph."""
+        while True:
+            # line 1
+            if not treatments:
+                return Sum.safe(expression=P(vertices), ranges=vertices.difference(outcomes))
+
+            # line 2
+            ancestors = self.ancestors_inclusive(outcomes, vertices)
+            if vertices - ancestors:
+                vertices, treatments = ancestors, treatments & ancestors
+                continue
+
+            # line 3
+            no_effect = (vertices - treatments) - self.ancestors_inclusive(
+                outcomes, vertices, treatments
+            )
+            if no_effect:
+                treatments = treatments | no_effect
+                continue
+
+            # line 4
+            districts_without_treatments = self.get_c_components(vertices - treatments)
+            if 1 < len(districts_without_treatments):
+                expression = Product.safe(
+                    self.district_factor(district, vertices)
+                    for district in districts_without_treatments
+                )
+                return Sum.safe(
+                    expression=expression,
+                    ranges=vertices.difference(outcomes | treatments),
+                )
+
+            # line 5
+            district_without_treatments = districts_without_treatments[0]
+            district = self.get_c_component(district_without_treatments, vertices)
+            if district == vertices:
+                raise Unidentifiable(self.get_c_components(vertices), districts_without_treatments)
+
+            # line 6
+            if district == district_without_treatments:
+                factor = self.add_factor(district, self.factorize(district, vertices), vertices)
+                ranges = district - outcomes
+                if not ranges:
+                    return factor
+                return Sum.safe(expression=factor, ranges=ranges)
+
+            # line 7
+            vertices, treatments = set(district), treatments & district
+
+    def district_factor(self, district: Collection[Variable], vertices: Set[Variable]) -> QFactor:
+        """Identify the Q-factor for a district of the subgraph without treatments.
+
+        Because the district is a single C-component, identifying it never reaches line 4,
+        so this only goes one level deep.
+
+        :param district: A district of the subgraph induced by the vertices without treatments
+        :param vertices: The vertices of the current subproblem
+        :returns: The Q-factor of the district
+        """
+        expression = self.identify(
+            outcomes=set(district),
+            treatments=vertices.difference(district),
+            vertices=vertices,
+        )
+        if isinstance(expression, QFactor) and set(expression.codomain) == set(district):
+            return expression
+        return self.add_factor(district, expression, vertices)
+
+    def add_factor(
+        self, district: Collection[Variable], definition: Expression, vertices: Set[Variable]
+    ) -> QFactor:
+        """Create a Q-factor over the district and store its definition.
+
+        :param district: A district of the subgraph induced by the vertices
+        :param definition: The expression for the Q-factor
+        :param vertices: The vertices of the current subproblem, which contain the parents
+            of the district that make up the domain of the Q-factor
+        :returns: The Q-factor
+        :raises ValueError: If the same Q-factor was already given a different definition
+        """
+        domain = set(district)
+        for node in district:
+            domain.update(
+                parent for parent in self.graph.directed.predecessors(node) if parent in vertices
+            )
+        factor = QFactor.safe(domain, codomain=sorted(district))
+        existing = self.factors.setdefault(factor, definition)
+        if existing != definition:
+            raise ValueError(f"conflicting definitions of {factor}: {existing} and {definition}")
+        return factor
+
+    def factorize(self, district: Collection[Variable], vertices: Set[Variable]) -> Expression:
+        """Factorize a district with the topological ordering of the induced subgraph."""
+        ordering = [node for node in self.ordering if node in vertices]
+        return Product.safe(
+            P(node | ordering[: ordering.index(node)]) for node in ordering if node in district
+        )
+
+    def ancestors_inclusive(
+        self,
+        sources: Iterable[Variable],
+        vertices: Set[Variable],
+        treatments: Collection[Variable] = (),
+    ) -> Set[Variable]:
+        """Get the ancestors of the sources in the subgraph, with the treatments intervened."""
+        rv = set(sources)
+        stack = [node for node in rv if node not in treatments]
+        while stack:
+            node = stack.pop()
+            for parent in self.graph.directed.predecessors(node):
+                if parent in vertices and parent not in rv:
+                    rv.add(parent)
+                    if parent not in treatments:
+                        stack.append(parent)
+        return rv
+
+    def get_c_components(self, vertices: Collection[Variable]) -> List[frozenset]:
+        """Get the C-components of the subgraph induced by the vertices."""
+        if not self.hyperedges:
+            undirected = self.graph.undirected.subgraph(vertices)
+            return [frozenset(component) for component in nx.connected_components(undirected)]
+        vertices = set(vertices)
+        rv = []
+        remaining = set(vertices)
+        while remaining:
+            component = self.get_c_component([next(iter(remaining))], vertices)
+            remaining.difference_update(component)
+            rv.append(component)
+        return rv
+
+    def get_c_component(self, nodes: Collection[Variable], vertices: Set[Variable]) -> frozenset:
+        """Get the C-component of the subgraph induced by the vertices that contains the nodes."""
+        source = next(iter(nodes))
+        if not self.hyperedges:
+            undirected = self.graph.undirected.subgraph(vertices)
+            return frozenset(nx.node_connected_component(undirected, source))
+        # each hyperedge only needs to be expanded once per search
+        expanded: Set[FrozenSet[Variable]] = set()
+        rv = {source}
+        stack = [source]
+        while stack:
+            node = stack.pop()
+            neighbors = set(self.graph.undirected.neighbors(node))
+            for hyperedge in self.hyperedges.get(node, []):
+                if hyperedge not in expanded:
+                    expanded.add(hyperedge)
+                    neighbors.update(hyperedge)
+            for neighbor in neighbors:
+                if neighbor in vertices and neighbor not in rv:
+                    rv.add(neighbor)
+                    stack.append(neighbor)
+        return frozenset(rv)
+
+
+def _substitute(expression: Expression, factors: Mapping[QFactor, Expression]) -> Expression:
+    if isinstance(expression, QFactor):
+        return factors.get(expression, expression)
+    if isinstance(expression, Sum):
+        return Sum(expression=_substitute(expression.expression, factors), ranges=expression.ranges)
+    if isinstance(expression, Product):
+        return Product(tuple(_substitute(e, factors) for e in expression.expressions))
+    if isinstance(expression, Fraction):
+        return Fraction(
+            numerator=_substitute(expression.numerator, factors),
+            denominator=_substitute(expression.denominator, factors),
+        )
+    return expression
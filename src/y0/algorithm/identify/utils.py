@@ -321,6 +321,10 @@ def str_nodes_to_variable_nodes(graph: NxMixedGraph) -> NxMixedGraph[Variable]:
         nodes={Variable.norm(node) for node in graph.nodes()},
         directed=_convert(graph.directed),
         undirected=_convert(graph.undirected),
+        hyperedges={
+            latent: {Variable.norm(node) for node in nodes}
+            for latent, nodes in graph.hyperedges.items()
+        },
     )
 
 
@@ -7,7 +7,8 @@
 
 import itertools as itt
 import logging
-from typing import Iterable, Mapping, NamedTuple, Optional, Set, Tuple
+from collections import defaultdict
+from typing import DefaultDict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
 
 import networkx as nx
 
@@ -172,13 +173,32 @@ def remove_redundant_latents(
 
 
 def _iter_redundant_latents(graph, *, tag: Optional[str] = None) -> Iterable[str]:
-    latents: Mapping[str, Set[str]] = {
-        node: set(graph.successors(node)) for node in iter_latents(graph, tag=tag)
-    }
-    for (left, left_children), (right, right_children) in itt.product(latents.items(), repeat=2):
-        if left_children == right_children and left > right:
-            # if children are the same, keep the lower sort order node
-            yield left
-        elif left_children < right_children:
-            # if left's children are a proper subset of right's children, we don't need left
-            yield left
+    # group latents with the same children
+    groups: DefaultDict[FrozenSet[str], List[str]] = defaultdict(list)
+    for node in iter_latents(graph, tag=tag):
+        groups[frozenset(graph.successors(node))].append(node)
+    children_sets = list(groups)
+
+    # index from each child to a bitmask of the positions of children sets that contain it
+    index: DefaultDict[str, int] = defaultdict(int)
+    for i, children in enumerate(children_sets):
+        for child in children:
+            index[child] |= 1 << i
+    popcounts = {child: bin(bits).count("1") for child, bits in index.items()}
+
+    everything = (1 << len(children_sets)) - 1
+    for i, children in enumerate(children_sets):
+        # if children are the same, keep the lower sort order node
+        nodes = groups[children]
+        keep = min(nodes)
+        yield from (node for node in nodes if node != keep)
+
+        # if the children are a proper subset of another latent's children, we don't need it.
+        # intersect the rarest children first, since they eliminate the most candidates
+        supersets = everything & ~(1 << i)
+        for child in sorted(children, key=popcounts.__getitem__):
+            supersets &= index[child]
+            if not supersets:
+                break
+        if supersets:
+            yield keep
@@ -7,14 +7,23 @@ from __future__ import annotations
 import itertools as itt
 import json
 from dataclasses import dataclass, field
+from functools import partial
 from typing import (
     Any,
+    Callable,
     Collection,
+    Dict,
+    FrozenSet,
     Generic,
+    Hashable,
     Iterable,
+    List,
     Mapping,
+    NamedTuple,
     Optional,
+    Sequence,
     Tuple,
+    TypeVar,
     Union,
 )
 
@@ -27,6 +36,8 @@ from .constants import NodeType
 
 __all__ = [
     "NxMixedGraph",
+    "AncestorIndex",
+    "GraphChange",
     "CausalEffectGraph",
     "DEFULT_PREFIX",
     "DEFAULT_TAG",
@@ -44,6 +55,21 @@ DEFAULT_TAG = "hidden"
 #: there will be a number assigned that's incremented during construction.
 DEFULT_PREFIX = "u_"
 
+X = TypeVar("X")
+
+
+class GraphChange(NamedTuple):
+    """A change made to a :class:`NxMixedGraph` through one of its mutators."""
+
+    #: The version of the graph after the change
+    version: int
+    #: Either "add" or "remove"
+    action: str
+    #: One of "node", "directed", "undirected", or "hyperedge"
+    kind: str
+    #: The node, the pair of nodes for an edge, or the latent and its nodes for a hyperedge
+    item: Any
+
 
 @dataclass
 class NxMixedGraph(Generic[NodeType]):
@@ -59,47 +85,175 @@ class NxMixedGraph(Generic[NodeType]):
 
         # Convert to an Ananke acyclic directed mixed graph
         admg_graph = graph.to_admg()
+
+    A latent confounder of many variables can be stored as a single hyperedge instead
+    of a clique of undirected edges. Districts, subgraphs, and interventions work on the
+    hyperedges directly, and they are only expanded into undirected edges when converting
+    to other formats:
+
+    .. code-block:: python
+
+        graph = NxMixedGraph()
+        graph.add_hyperedge('U', {'X', 'Y', 'Z'})
     """
 
     #: A directed graph
     directed: nx.DiGraph = field(default_factory=nx.DiGraph)
     #: A undirected graph
     undirected: nx.Graph = field(default_factory=nx.Graph)
+    #: A dictionary from latent confounders to the set of variables they confound. Each
+    #: is equivalent to a clique of undirected edges between the confounded variables.
+    hyperedges: Dict[Hashable, FrozenSet[NodeType]] = field(default_factory=dict)
+    #: A counter that is incremented by every change made through the graph's mutators.
+    #: Edits made directly to the networkx graphs aren't counted, and aren't supported
+    #: once the graph has been used, since derived structures are cached by version.
+    version: int = field(default=0, init=False, compare=False)
+    #: The changes made through the graph's mutators, in order
+    changes: List[GraphChange] = field(default_factory=list, init=False, repr=False, compare=False)
+    #: Structures derived from the graph, along with the version they were derived from
+    _cache: Dict[str, Tuple[int, Any]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
     def __eq__(self, other: Any) -> bool:
-        """Check for equality of nodes, directed edges, and undirected edges."""
+        """Check for equality of nodes, directed edges, undirected edges, and hyperedges."""
         return (
             isinstance(other, NxMixedGraph)
             and self.nodes() == other.nodes()
             and (self.directed.edges() == other.directed.edges())
             and (self.undirected.edges() == other.undirected.edges())
+            and self.hyperedges == other.hyperedges
         )
 
+    def _record(self, action: str, kind: str, item: Any) -> None:
+        """Increment the version and add a change to the log."""
+        self.version += 1
+        self.changes.append(GraphChange(version=self.version, action=action, kind=kind, item=item))
+
+    def changes_since(self, version: int) -> List[GraphChange]:
+        """Get the changes made after the given version.
+
+        :param version: A previous value of :data:`version`
+        :returns: The changes made since, in order
+        """
+        return [change for change in self.changes if version < change.version]
+
+    def _get_cached(self, key: str, func: Callable[[], X]) -> X:
+        """Get a structure derived from the graph, only recalculating it if the graph changed."""
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        rv = func()
+        self._cache[key] = self.version, rv
+        return rv
+
+    def _peek_cached(self, key: str) -> Optional[Any]:
+        """Get a structure derived from the graph if it's cached and up to date."""
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        return None
+
+    def _set_cached(self, key: str, value: Any) -> None:
+        self._cache[key] = self.version, value
+
     def add_node(self, n: NodeType) -> None:
         """Add a node."""
+        if n in self.directed and n in self.undirected:
+            return
         self.directed.add_node(n)
         self.undirected.add_node(n)
+        self._record("add", "node", n)
 
     def add_directed_edge(self, u: NodeType, v: NodeType, **attr) -> None:
         """Add a directed edge from u to v."""
+        self.add_node(u)
+        self.add_node(v)
+        exists = self.directed.has_edge(u, v)
         self.directed.add_edge(u, v, **attr)
-        self.undirected.add_node(u)
-        self.undirected.add_node(v)
+        if not exists:
+            self._record("add", "directed", (u, v))
 
     def add_undirected_edge(self, u: NodeType, v: NodeType, **attr) -> None:
         """Add an undirected edge between u and v."""
+        self.add_node(u)
+        self.add_node(v)
+        exists = self.undirected.has_edge(u, v)
         self.undirected.add_edge(u, v, **attr)
-        self.directed.add_node(u)
-        self.directed.add_node(v)
+        if not exists:
+            self._record("add", "undirected", (u, v))
+
+    def add_hyperedge(self, latent: Hashable, nodes: Iterable[NodeType]) -> None:
+        """Add a latent confounder of the given nodes.
+
+        :param latent: The name of the latent confounder, which should not also be a node
+        :param nodes: The nodes confounded by the latent variable
+        """
+        nodes = frozenset(nodes)
+        for node in nodes:
+            self.add_node(node)
+        if 1 < len(nodes) and self.hyperedges.get(latent) != nodes:
+            self.hyperedges[latent] = nodes
+            self._record("add", "hyperedge", (latent, nodes))
+
+    def remove_directed_edge(self, u: NodeType, v: NodeType) -> None:
+        """Remove the directed edge from u to v, keeping both nodes.
+
+        :param u: The source of the edge
+        :param v: The target of the edge
+
+        Like :meth:`networkx.DiGraph.remove_edge`, this raises a
+        :class:`networkx.NetworkXError` if the edge is not in the graph.
+        """
+        self.directed.remove_edge(u, v)
+        self._record("remove", "directed", (u, v))
+
+    def remove_undirected_edge(self, u: NodeType, v: NodeType) -> None:
+        """Remove the undirected edge between u and v, keeping both nodes.
+
+        :param u: One end of the edge
+        :param v: The other end of the edge
+
+        Like :meth:`networkx.Graph.remove_edge`, this raises a
+        :class:`networkx.NetworkXError` if the edge is not in the graph.
+        """
+        self.undirected.remove_edge(u, v)
+        self._record("remove", "undirected", (u, v))
+
+    def iter_bidirected_edges(self) -> Iterable[Tuple[NodeType, NodeType]]:
+        """Iterate over the undirected edges, including the ones implied by hyperedges.
+
+        :yields: The pairs of nodes that are joined by an undirected edge or share a hyperedge
+        """
+        yield from self.undirected.edges()
+        seen = set()
+        for nodes in self.hyperedges.values():
+            for u, v in itt.combinations(nodes, 2):
+                if (u, v) in seen or (v, u) in seen or self.undirected.has_edge(u, v):
+                    continue
+                seen.add((u, v))
+                yield u, v
+
+    def expand_hyperedges(self) -> NxMixedGraph[NodeType]:
+        """Return a graph where the hyperedges are replaced with cliques of undirected edges."""
+        return self.from_edges(
+            nodes=self.nodes(),
+            directed=self.directed.edges(),
+            undirected=list(self.iter_bidirected_edges()),
+        )
 
     def nodes(self) -> NodeView:
         """Get the nodes in the graph."""
         return self.directed.nodes()
 
     def to_admg(self) -> ADMG:
-        """Get an ADMG instance."""
+        """Get an ADMG instance.
+
+        :return: A new ADMG with the same nodes and edges, where hyperedges are expanded
+            into bidirected edges
+        """
         di_edges = list(self.directed.edges())
-        bi_edges = list(self.undirected.edges())
+        bi_edges = list(self.iter_bidirected_edges())
         vertices = list(self.directed)  # could be either since they're maintained together
         return ADMG(vertices=vertices, di_edges=di_edges, bi_edges=bi_edges)
 
@@ -130,6 +284,7 @@ class NxMixedGraph(Generic[NodeType]):
         return _latent_dag(
             di_edges=self.directed.edges(),
             bi_edges=self.undirected.edges(),
+            hyperedges=self.hyperedges,
             prefix=prefix,
             start=start,
             tag=tag,
@@ -137,22 +292,68 @@ class NxMixedGraph(Generic[NodeType]):
 
     @classmethod
     def from_latent_variable_dag(
-        cls, graph: nx.DiGraph, tag: Optional[str] = None
+        cls, graph: nx.DiGraph, tag: Optional[str] = None, *, hyperedges: bool = False
     ) -> NxMixedGraph[NodeType]:
-        """Load a labeled DAG."""
+        """Load a labeled DAG by projecting out its latent variables.
+
+        There is a directed edge between two observed nodes if there's a directed path between
+        them whose intermediate nodes are all latent. There is an undirected edge between two
+        observed nodes if they can both be reached from the same latent node through paths
+        whose intermediate nodes are all latent. This means that latent variables may have
+        parents and may point to other latent variables, so it's not necessary to run
+        :func:`y0.algorithm.simplify_latent.simplify_latent_dag` first. The given graph
+        is not modified.
+
+        :param graph: A latent variable DAG
+        :param tag: The key for node data describing whether it is latent.
+            If None, defaults to :data:`y0.graph.DEFAULT_TAG`.
+        :param hyperedges: If true, keep each latent variable as a hyperedge over the observed
+            nodes it reaches instead of expanding it into a clique of undirected edges.
+        :returns: A mixed graph over the observed nodes
+        :raises ValueError: If any nodes are missing the latent tag
+        """
         if tag is None:
             tag = DEFAULT_TAG
         if any(tag not in data for data in graph.nodes.values()):
             raise ValueError(f"missing label {tag} in one or more nodes.")
 
-        rv = cls()
-        for node, data in graph.nodes.items():
-            if data[tag]:
-                for a, b in itt.combinations(graph.successors(node), 2):
-                    rv.add_undirected_edge(a, b)
-            else:
+        observed = [node for node, data in graph.nodes.items() if not data[tag]]
+        index = {node: i for i, node in enumerate(observed)}
+
+        # The observed nodes reachable from each latent node through latent nodes, as a bitset
+        reachable: Dict[Hashable, int] = {}
+        for node in reversed(list(nx.topological_sort(graph))):
+            if node not in index:
+                reachable[node] = 0
                 for child in graph.successors(node):
+                    reachable[node] |= reachable[child] if child not in index else 1 << index[child]
+
+        def _iter_reachable(node: Hashable) -> Iterable[NodeType]:
+            """Iterate over the observed nodes reachable through the children of the node."""
+            seen = 0
+            for child in graph.successors(node):
+                bits = 1 << index[child] if child in index else reachable[child]
+                bits &= ~seen
+                if not bits:
+                    continue
+                seen |= bits
+                yield from _iter_bits(bits, observed)
+
+        rv = cls()
+        for node in graph.nodes():
+            if node in index:
+                for child in _iter_reachable(node):
                     rv.add_directed_edge(node, child)
+            elif any(parent not in index for parent in graph.predecessors(node)):
+                # Nodes reachable from this latent are also reachable from its latent parents
+                continue
+            elif hyperedges:
+                rv.add_hyperedge(node, _iter_reachable(node))
+            else:
+                for a, b in itt.combinations(_iter_reachable(node), 2):
+                    rv.add_undirected_edge(a, b)
+        for node in observed:
+            rv.add_node(node)
         return rv
 
     def to_causaleffect(self) -> CausalEffectGraph:
@@ -171,7 +372,7 @@ class NxMixedGraph(Generic[NodeType]):
         rv = nx.MultiGraph()
         rv.add_nodes_from(self.directed)
         rv.add_edges_from(self.directed.edges)
-        rv.add_edges_from(self.undirected.edges)
+        rv.add_edges_from(self.iter_bidirected_edges())
         return rv
 
     def draw(
@@ -187,7 +388,7 @@ class NxMixedGraph(Generic[NodeType]):
         import matplotlib.pyplot as plt
 
         layout = nx.nx_pydot.graphviz_layout(self.joint(), prog=prog)
-        u_proxy = nx.DiGraph(self.undirected.edges)
+        u_proxy = nx.DiGraph(self.iter_bidirected_edges())
         labels = None if not latex else {node: _get_latex(node) for node in self.directed}
 
         if ax is None:
@@ -217,6 +418,8 @@ class NxMixedGraph(Generic[NodeType]):
         """Get a string to be imported by R."""
         if not self.directed:
             raise ValueError("graph must have some directed edges")
+        if self.hyperedges:
+            return self.expand_hyperedges().to_causaleffect_str()
 
         formula = ", ".join(f"{u} -+ {v}" for u, v in self.directed.edges())
         if self.undirected:
@@ -238,9 +441,10 @@ class NxMixedGraph(Generic[NodeType]):
         nodes: Optional[Iterable[NodeType]] = None,
         directed: Optional[Iterable[Tuple[NodeType, NodeType]]] = None,
         undirected: Optional[Iterable[Tuple[NodeType, NodeType]]] = None,
+        hyperedges: Optional[Mapping[Hashable, Iterable[NodeType]]] = None,
     ) -> NxMixedGraph[NodeType]:
-        """Make a mixed graph from a pair of edge lists."""
-        if directed is None and undirected is None:
+        """Make a mixed graph from a pair of edge lists and optional hyperedges."""
+        if directed is None and undirected is None and hyperedges is None:
             raise ValueError("must provide at least one of directed/undirected edge lists")
         rv = cls()
         for n in nodes or []:
@@ -249,6 +453,8 @@ class NxMixedGraph(Generic[NodeType]):
             rv.add_directed_edge(u, v)
         for u, v in undirected or []:
             rv.add_undirected_edge(u, v)
+        for latent, latent_nodes in (hyperedges or {}).items():
+            rv.add_hyperedge(latent, latent_nodes)
         return rv
 
     @classmethod
@@ -299,11 +505,16 @@ class NxMixedGraph(Generic[NodeType]):
         :returns: A NxMixedGraph subgraph
         """
         vertices = set(vertices)
-        return self.from_edges(
+        rv = self.from_edges(
             nodes=vertices,
             directed=_include_adjacent(self.directed, vertices),
             undirected=_include_adjacent(self.undirected, vertices),
+            hyperedges=_include_hyperedges(self.hyperedges, vertices),
         )
+        index = self._peek_cached("ancestor_index")
+        if index is not None:
+            rv._set_cached("ancestor_index", index.restrict(rv.nodes()))
+        return rv
 
     def intervene(self, vertices: Collection[NodeType]) -> NxMixedGraph[NodeType]:
         """Return a mutilated graph given a set of interventions.
@@ -312,11 +523,16 @@ class NxMixedGraph(Generic[NodeType]):
         :returns: A NxMixedGraph subgraph
         """
         vertices = set(vertices)
-        return self.from_edges(
+        rv = self.from_edges(
             nodes=vertices,
             directed=_exclude_target(self.directed, vertices),
             undirected=_exclude_adjacent(self.undirected, vertices),
+            hyperedges=_exclude_hyperedges(self.hyperedges, vertices),
         )
+        index = self._peek_cached("ancestor_index")
+        if index is not None:
+            rv._set_cached("ancestor_index", index.intervene(vertices).restrict(rv.nodes()))
+        return rv
 
     def remove_nodes_from(self, vertices: Collection[NodeType]) -> NxMixedGraph[NodeType]:
         """Return a subgraph that does not contain any of the specified vertices.
@@ -325,11 +541,16 @@ class NxMixedGraph(Generic[NodeType]):
         :returns: A NxMixedGraph subgraph
         """
         vertices = set(vertices)
-        return self.from_edges(
+        rv = self.from_edges(
             nodes=self.nodes() - vertices,
             directed=_exclude_adjacent(self.directed, vertices),
             undirected=_exclude_adjacent(self.undirected, vertices),
+            hyperedges=_exclude_hyperedges(self.hyperedges, vertices),
         )
+        index = self._peek_cached("ancestor_index")
+        if index is not None:
+            rv._set_cached("ancestor_index", index.restrict(rv.nodes()))
+        return rv
 
     def remove_outgoing_edges_from(self, vertices: Collection[NodeType]) -> NxMixedGraph:
         """Return a subgraph that does not have any outgoing edges from any of the given vertices.
@@ -342,34 +563,205 @@ class NxMixedGraph(Generic[NodeType]):
             nodes=self.nodes(),
             directed=_exclude_source(self.directed, vertices),
             undirected=self.undirected.edges(),
+            hyperedges=self.hyperedges,
         )
 
     def ancestors_inclusive(self, sources: Iterable[NodeType]) -> set[NodeType]:
         """Ancestors of a set include the set itself."""
-        return _ancestors_inclusive(self.directed, sources)
+        return self.get_ancestor_index().ancestors_inclusive(sources)
+
+    def descendants_inclusive(self, sources: Iterable[NodeType]) -> set[NodeType]:
+        """Descendants of a set include the set itself."""
+        return self.get_ancestor_index().descendants_inclusive(sources)
+
+    def get_ancestor_index(self) -> AncestorIndex[NodeType]:
+        """Get the transitive closure of the directed graph, building it on first use.
+
+        The index is cached on the graph and passed on to the graphs made with
+        :meth:`subgraph`, :meth:`intervene`, and :meth:`remove_nodes_from`, which only
+        recalculate the ancestors of nodes that lost one.
+
+        :return: The ancestor index of the graph
+        """
+        return self._get_cached("ancestor_index", partial(AncestorIndex.from_graph, self.directed))
 
     def topological_sort(self) -> Iterable[NodeType]:
         """Get a topological sort from the directed component of the mixed graph."""
-        return nx.topological_sort(self.directed)
+        return iter(self._get_cached("topological_sort", self._get_topological_sort))
+
+    def _get_topological_sort(self) -> Tuple[NodeType, ...]:
+        return tuple(nx.topological_sort(self.directed))
 
     def connected_components(self) -> Iterable[set[NodeType]]:
-        """Iterate over the connected components in the undirected graph."""
-        return nx.connected_components(self.undirected)
+        """Iterate over the connected components in the undirected graph and hyperedges."""
+        return (set(c) for c in self.get_c_components())
 
     def get_c_components(self) -> list[frozenset[NodeType]]:
         """Get the C-components in the undirected portion of the graph."""
-        return [frozenset(c) for c in self.connected_components()]
+        return list(self._get_cached("c_components", self._get_c_components))
+
+    def _get_c_components(self) -> Tuple[frozenset[NodeType], ...]:
+        return tuple(frozenset(c) for c in nx.connected_components(self._get_district_graph()))
 
     def is_connected(self) -> bool:
         """Return if there is only a single connected component in the undirected graph."""
-        return nx.is_connected(self.undirected)
+        return nx.is_connected(self._get_district_graph())
 
+    def _get_district_graph(self) -> nx.Graph:
+        """Get a graph with the same connected components as the undirected graph and hyperedges.
 
-def _ancestors_inclusive(graph: nx.DiGraph, sources: Iterable[NodeType]) -> set[NodeType]:
-    rv = set(sources)
-    for source in sources:
-        rv.update(nx.algorithms.dag.ancestors(graph, source))
-    return rv
+        Rather than a clique, the nodes in each hyperedge are connected with a path.
+
+        :return: The undirected graph itself if there are no hyperedges, otherwise a copy
+            with a path through the nodes of each hyperedge
+        """
+        if not self.hyperedges:
+            return self.undirected
+        rv = self.undirected.copy()
+        for nodes in self.hyperedges.values():
+            nx.add_path(rv, nodes)
+        return rv
+
+
+class AncestorIndex(Generic[NodeType]):
+    """The transitive closure of a directed acyclic graph, stored as bitsets.
+
+    Each node is assigned a bit by its position in a topological ordering, and its
+    ancestors (including itself) are the bitwise OR of its parents' ancestors, so the
+    whole closure is built in a single pass. The ancestors of a set of nodes are then
+    the bitwise OR of the ancestors of its members.
+
+    Restricting to a subgraph or intervening on some nodes keeps the same bit
+    assignments and only recalculates the nodes whose ancestors included a removed
+    node or an intervened node.
+    """
+
+    def __init__(
+        self,
+        nodes: Sequence[NodeType],
+        parents: Sequence[Sequence[int]],
+        ancestors: Sequence[int],
+        mask: int,
+    ) -> None:
+        """Instantiate the index. Use :meth:`from_graph` instead.
+
+        :param nodes: The nodes in topological order, where a node's bit is its position
+        :param parents: The positions of the parents of each node
+        :param ancestors: The bitset of the ancestors of each node, including itself
+        :param mask: The bitset of the nodes that are in the graph
+        """
+        self.nodes = nodes
+        self.parents = parents
+        self.ancestors = ancestors
+        self.mask = mask
+        self.positions = {node: i for i, node in enumerate(nodes)}
+        self._descendants: Optional[Sequence[int]] = None
+
+    @classmethod
+    def from_graph(cls, graph: nx.DiGraph) -> AncestorIndex[NodeType]:
+        """Build the transitive closure of a directed acyclic graph.
+
+        :param graph: A directed acyclic graph
+        :returns: An ancestor index over all nodes in the graph
+        """
+        nodes = list(nx.topological_sort(graph))
+        positions = {node: i for i, node in enumerate(nodes)}
+        parents = [[positions[parent] for parent in graph.predecessors(node)] for node in nodes]
+        ancestors = [0] * len(nodes)
+        for i, node_parents in enumerate(parents):
+            bits = 1 << i
+            for parent in node_parents:
+                bits |= ancestors[parent]
+            ancestors[i] = bits
+        return cls(nodes, parents, ancestors, (1 << len(nodes)) - 1)
+
+    def to_bits(self, nodes: Iterable[NodeType]) -> int:
+        """Get the bitset for the nodes."""
+        rv = 0
+        for node in nodes:
+            rv |= 1 << self.positions[node]
+        return rv
+
+    def _to_known_bits(self, nodes: Iterable[NodeType]) -> int:
+        """Get the bitset for the nodes, skipping ones that aren't in the index."""
+        return self.to_bits(node for node in nodes if node in self.positions)
+
+    def to_nodes(self, bits: int) -> set[NodeType]:
+        """Get the nodes in the bitset."""
+        return set(_iter_bits(bits, self.nodes))
+
+    def get_ancestor_bits(self, sources: Iterable[NodeType]) -> int:
+        """Get the bitset of the ancestors of the sources, including the sources."""
+        rv = 0
+        for source in sources:
+            rv |= self.ancestors[self.positions[source]]
+        return rv
+
+    def get_descendant_bits(self, sources: Iterable[NodeType]) -> int:
+        """Get the bitset of the descendants of the sources, including the sources."""
+        if self._descendants is None:
+            self._descendants = self._get_descendants()
+        rv = 0
+        for source in sources:
+            rv |= self._descendants[self.positions[source]]
+        return rv
+
+    def ancestors_inclusive(self, sources: Iterable[NodeType]) -> set[NodeType]:
+        """Get the ancestors of the sources, including the sources."""
+        return self.to_nodes(self.get_ancestor_bits(sources))
+
+    def descendants_inclusive(self, sources: Iterable[NodeType]) -> set[NodeType]:
+        """Get the descendants of the sources, including the sources."""
+        return self.to_nodes(self.get_descendant_bits(sources))
+
+    def _get_descendants(self) -> Sequence[int]:
+        descendants = [0] * len(self.nodes)
+        for i in reversed(range(len(self.nodes))):
+            if self.mask >> i & 1:
+                descendants[i] |= 1 << i
+                for parent in self.parents[i]:
+                    descendants[parent] |= descendants[i]
+        return descendants
+
+    def restrict(self, vertices: Iterable[NodeType]) -> AncestorIndex[NodeType]:
+        """Get the index for the subgraph induced by the vertices.
+
+        :param vertices: The nodes to keep, which should all be in the index
+        :returns: An ancestor index sharing the same bit assignments
+        """
+        mask = self._to_known_bits(vertices) & self.mask
+        parents = [
+            [parent for parent in node_parents if mask >> parent & 1]
+            for node_parents in self.parents
+        ]
+        return self._update(parents, mask, self.mask & ~mask)
+
+    def intervene(self, vertices: Iterable[NodeType]) -> AncestorIndex[NodeType]:
+        """Get the index for the graph where the incoming edges of the vertices are removed.
+
+        :param vertices: The nodes whose incoming edges are removed
+        :returns: An ancestor index sharing the same bit assignments
+        """
+        changed = self._to_known_bits(vertices)
+        parents = [
+            [] if changed >> i & 1 else node_parents for i, node_parents in enumerate(self.parents)
+        ]
+        return self._update(parents, self.mask, changed)
+
+    def _update(self, parents: Sequence[Sequence[int]], mask: int, changed: int) -> AncestorIndex:
+        """Recalculate the ancestors of the nodes whose ancestors overlap the changed nodes."""
+        ancestors = [0] * len(self.nodes)
+        for i, node_parents in enumerate(parents):
+            if not mask >> i & 1:
+                continue
+            if not self.ancestors[i] & changed:
+                ancestors[i] = self.ancestors[i]
+                continue
+            bits = 1 << i
+            for parent in node_parents:
+                bits |= ancestors[parent]
+            ancestors[i] = bits
+        return AncestorIndex(self.nodes, parents, ancestors, mask)
 
 
 def _include_adjacent(
@@ -378,6 +770,28 @@ def _include_adjacent(
     return [(u, v) for u, v in graph.edges() if u in vertices and v in vertices]
 
 
+def _iter_bits(bits: int, nodes: Sequence[NodeType]) -> Iterable[NodeType]:
+    """Iterate over the nodes whose positions are set in the bitset."""
+    while bits:
+        low = bits & -bits
+        yield nodes[low.bit_length() - 1]
+        bits ^= low
+
+
+def _include_hyperedges(
+    hyperedges: Mapping[Hashable, FrozenSet[NodeType]], vertices: Collection[NodeType]
+) -> Dict[Hashable, FrozenSet[NodeType]]:
+    rv = {latent: nodes.intersection(vertices) for latent, nodes in hyperedges.items()}
+    return {latent: nodes for latent, nodes in rv.items() if 1 < len(nodes)}
+
+
+def _exclude_hyperedges(
+    hyperedges: Mapping[Hashable, FrozenSet[NodeType]], vertices: Collection[NodeType]
+) -> Dict[Hashable, FrozenSet[NodeType]]:
+    rv = {latent: nodes.difference(vertices) for latent, nodes in hyperedges.items()}
+    return {latent: nodes for latent, nodes in rv.items() if 1 < len(nodes)}
+
+
 def _exclude_source(
     graph: nx.Graph, vertices: Collection[NodeType]
 ) -> Collection[Tuple[NodeType, NodeType]]:
@@ -432,9 +846,10 @@ def admg_from_latent_variable_dag(graph: nx.DiGraph, *, tag: Optional[str] = Non
 
 
 def _latent_dag(
-    di_edges: Iterable[Tuple[str, str]],
-    bi_edges: Iterable[Tuple[str, str]],
+    di_edges: Iterable[Tuple[NodeType, NodeType]],
+    bi_edges: Iterable[Tuple[NodeType, NodeType]],
     *,
+    hyperedges: Optional[Mapping[Hashable, Iterable[NodeType]]] = None,
     prefix: Optional[str] = None,
     start: int = 0,
     tag: Optional[str] = None,
@@ -443,6 +858,8 @@ def _latent_dag(
 
     :param di_edges: A list of directional edges
     :param bi_edges: A list of bi-directional edges
+    :param hyperedges: A dictionary from latent variables to the nodes they confound, which
+        are each added as a single latent node
     :param prefix: The prefix for latent variables. If none, defaults to :data:`y0.graph.DEFAULT_PREFIX`.
     :param start: The starting number for latent variables (defaults to 0, could be changed to 1 if desired)
     :param tag: The key for node data describing whether it is latent.
@@ -463,6 +880,10 @@ def _latent_dag(
         rv.add_node(latent_node, **{tag: True})
         rv.add_edge(latent_node, u)
         rv.add_edge(latent_node, v)
+    for latent, nodes in (hyperedges or {}).items():
+        rv.add_nodes_from(nodes, **{tag: False})
+        rv.add_node(latent, **{tag: True})
+        rv.add_edges_from((latent, node) for node in nodes)
     return rv
 
 
@@ -5,7 +5,20 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Generic, Iterable, NamedTuple, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
 
 from .constants import NodeType
 from .dsl import Expression, Variable
@@ -13,8 +26,14 @@ from .dsl import Expression, Variable
 __all__ = [
     "VermaConstraint",
     "DSeparationJudgement",
+    "DSeparationSetJudgement",
+    "DSeparationTable",
 ]
 
+#: The number of bits set in each byte
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+_WORD = (1 << 64) - 1
+
 
 class VermaConstraint(NamedTuple):
     """Represent a Verma constraint."""
@@ -93,3 +112,228 @@ class DSeparationJudgement(Generic[NodeType]):
             and isinstance(self.conditions, tuple)
             and tuple(sorted(self.conditions)) == (self.conditions)
         )
+
+
+@dataclass(frozen=True)
+class DSeparationSetJudgement(Generic[NodeType]):
+    """
+    Record if a node is d-separated from a set of nodes given the conditions.
+
+    This is a single judgement about the right nodes jointly, which implies the d-separation
+    of the left node from each of them, but can be tested with one conditional independence
+    test instead of one for each.
+    """
+
+    separated: bool
+    left: NodeType
+    right: Tuple[NodeType, ...]
+    conditions: Tuple[NodeType, ...]
+
+    @classmethod
+    def create(
+        cls,
+        left: NodeType,
+        right: Iterable[NodeType],
+        conditions: Optional[Iterable[NodeType]] = None,
+        *,
+        separated: bool = True,
+    ) -> DSeparationSetJudgement[NodeType]:
+        """Create a d-separation judgement with the right nodes and conditions in canonical form."""
+        if conditions is None:
+            conditions = tuple()
+        return cls(separated, left, tuple(sorted(set(right))), tuple(sorted(set(conditions))))
+
+    def __bool__(self) -> bool:
+        return self.separated
+
+    def __repr__(self) -> str:
+        return f"{repr(self.separated)} -- '{self.left}' d-sep {self.right} conditioned on {self.conditions}"
+
+    def to_judgements(self) -> List[DSeparationJudgement[NodeType]]:
+        """Split into the d-separations of the left node from each of the right nodes."""
+        return [
+            DSeparationJudgement.create(self.left, right, self.conditions, separated=self.separated)
+            for right in self.right
+        ]
+
+
+class DSeparationTable(Generic[NodeType]):
+    """Store many d-separation judgements in columns.
+
+    Each judgement's left and right nodes are stored as positions in :attr:`nodes`, and its
+    conditions are stored as a bitmask over the same positions, split into 64-bit words.
+    This takes a few dozen bytes per judgement instead of a Python object with a tuple of
+    conditions, and filtering, grouping, and minimizing are vectorized with :mod:`numpy`.
+    Judgements are only created again when the table is iterated.
+
+    .. code-block:: python
+
+        from y0.algorithm.conditional_independencies import d_separations
+
+        table = DSeparationTable.from_judgements(d_separations(graph, return_all=True))
+        small = table.select(table.sizes() <= 2)
+        judgements = small.minimal().to_judgements()
+    """
+
+    def __init__(
+        self,
+        nodes: Sequence[NodeType],
+        separated: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        conditions: np.ndarray,
+    ) -> None:
+        """Create a table from its columns.
+
+        :param nodes: The nodes, whose positions are used in the other columns
+        :param separated: A boolean array of whether each pair is d-separated
+        :param left: An integer array of the position of each left node
+        :param right: An integer array of the position of each right node
+        :param conditions: An unsigned 64-bit integer array with a row for each judgement
+            and a column for every 64 nodes, where bit ``i`` is set if the ``i``-th node is
+            in the conditions.
+        """
+        self.nodes = tuple(nodes)
+        self.positions = {node: i for i, node in enumerate(self.nodes)}
+        self.separated = separated
+        self.left = left
+        self.right = right
+        self.conditions = conditions
+
+    @classmethod
+    def from_judgements(
+        cls,
+        judgements: Iterable[DSeparationJudgement[NodeType]],
+        nodes: Optional[Sequence[NodeType]] = None,
+    ) -> DSeparationTable[NodeType]:
+        """Build a table from judgements, like the ones generated by ``d_separations``.
+
+        :param judgements: The judgements, which are consumed one at a time
+        :param nodes: The nodes, in the order of their positions. If not given, all of the
+            nodes mentioned in the judgements are used in sorted order.
+        :return: A table of the judgements
+        """
+        if nodes is None:
+            # the positions aren't known until all judgements are seen
+            judgements = list(judgements)
+            nodes = sorted({node for j in judgements for node in (j.left, j.right, *j.conditions)})
+        positions = {node: i for i, node in enumerate(nodes)}
+
+        separated, left, right, masks = [], [], [], []
+        for judgement in judgements:
+            separated.append(judgement.separated)
+            left.append(positions[judgement.left])
+            right.append(positions[judgement.right])
+            mask = 0
+            for node in judgement.conditions:
+                mask |= 1 << positions[node]
+            masks.append(mask)
+
+        n_words = max(1, -(-len(nodes) // 64))
+        conditions = np.zeros((len(masks), n_words), dtype=np.uint64)
+        for word in range(n_words):
+            conditions[:, word] = [(mask >> (64 * word)) & _WORD for mask in masks]
+        return cls(
+            nodes,
+            np.array(separated, dtype=bool),
+            np.array(left, dtype=np.int32),
+            np.array(right, dtype=np.int32),
+            conditions,
+        )
+
+    def __len__(self) -> int:
+        return len(self.separated)
+
+    def __getitem__(self, index: int) -> DSeparationJudgement[NodeType]:
+        membership = self._unpack(self.conditions[index : index + 1])[0]
+        return DSeparationJudgement.create(
+            left=self.nodes[self.left[index]],
+            right=self.nodes[self.right[index]],
+            conditions=[node for node, member in zip(self.nodes, membership) if member],
+            separated=bool(self.separated[index]),
+        )
+
+    def __iter__(self) -> Iterator[DSeparationJudgement[NodeType]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_judgements(self) -> List[DSeparationJudgement[NodeType]]:
+        """Get the judgements in the table, in order."""
+        return list(self)
+
+    def select(self, index: np.ndarray) -> DSeparationTable[NodeType]:
+        """Get a table with only some of the judgements.
+
+        :param index: A boolean mask or an array of positions of the judgements to keep
+        :return: A new table over the same nodes
+        """
+        return DSeparationTable(
+            self.nodes,
+            self.separated[index],
+            self.left[index],
+            self.right[index],
+            self.conditions[index],
+        )
+
+    def sizes(self) -> np.ndarray:
+        """Get the number of conditions in each judgement."""
+        return _POPCOUNT[self._bytes(self.conditions)].sum(axis=1)
+
+    def membership(self) -> np.ndarray:
+        """Get a boolean matrix of whether each node is in the conditions of each judgement."""
+        return self._unpack(self.conditions)
+
+    def contains(self, nodes: Iterable[NodeType]) -> np.ndarray:
+        """Get a boolean mask of the judgements whose conditions contain all of the nodes."""
+        mask = np.zeros(self.conditions.shape[1], dtype=np.uint64)
+        for node in nodes:
+            i = self.positions[node]
+            mask[i // 64] |= np.uint64(1 << (i % 64))
+        return ((self.conditions & mask) == mask).all(axis=1)
+
+    def pair_codes(self) -> np.ndarray:
+        """Get an integer for the (left, right) pair of each judgement, for grouping."""
+        return self.left.astype(np.int64) * len(self.nodes) + self.right
+
+    def groups(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Group the judgements by their (left, right) pair.
+
+        :return: A pair of arrays, with the positions of the left and right nodes of each
+            group, and the group of each judgement.
+        """
+        codes, inverse = np.unique(self.pair_codes(), return_inverse=True)
+        return np.stack(np.divmod(codes, len(self.nodes)), axis=1), inverse
+
+    def minimal(
+        self, policy: Optional[Callable[[DSeparationTable[NodeType]], Sequence[np.ndarray]]] = None
+    ) -> DSeparationTable[NodeType]:
+        """Keep the first judgement of each (left, right) pair according to the policy.
+
+        This is the columnar version of ``y0.algorithm.conditional_independencies.minimal``.
+
+        :param policy: A function from the table to a sequence of arrays that are sorted on,
+            with the most significant first. By default, judgements are sorted by the
+            number of conditions, then lexicographically by the conditions.
+        :return: A table with one judgement for each (left, right) pair, sorted by pair
+        """
+        if policy is None:
+            policy = _len_lex_keys
+        # ties are kept in their original order, since the sort is stable
+        codes = self.pair_codes()
+        order = np.lexsort([*reversed(list(policy(self))), codes])
+        _, first = np.unique(codes[order], return_index=True)
+        return self.select(order[first])
+
+    def _unpack(self, conditions: np.ndarray) -> np.ndarray:
+        bits = np.unpackbits(self._bytes(conditions), axis=1, bitorder="little")
+        return bits[:, : len(self.nodes)].astype(bool)
+
+    @staticmethod
+    def _bytes(conditions: np.ndarray) -> np.ndarray:
+        return conditions.astype("<u8", copy=False).view(np.uint8)
+
+
+def _len_lex_keys(table: DSeparationTable) -> Sequence[np.ndarray]:
+    """Sort by the number of conditions, then lexicographically by the sorted conditions."""
+    # for sets of the same size, the one containing the first node where they differ is first
+    return [table.sizes(), *(~column for column in table.membership().T)]
@@ -28,7 +28,9 @@
 
 from warnings import warn
 
-from scipy import stats
+import numpy as np
+import pandas as pd
+from scipy import linalg, special, stats
 
 
 def chi_square(X, Y, Z, data, boolean=True, **kwargs):
@@ -609,35 +611,576 @@ def power_divergence(X, Y, Z, data, boolean=True, lambda_="cressie-read", **kwar
     if (X in Z) or (Y in Z):
         raise ValueError(f"The variables X or Y can't be in Z. Found {X if X in Z else Y} in Z.")
 
-    # Step 2: Do a simple contingency test if there are no conditional variables.
-    if len(Z) == 0:
-        chi, p_value, dof, expected = stats.chi2_contingency(
-            data.groupby([X, Y]).size().unstack(Y, fill_value=0), lambda_=lambda_
-        )
+    # Step 2: Count the (X, Y) pairs in each state of Z with sparse integer keys, and
+    #         sum the contingency test over the states. Without conditional variables,
+    #         this is a simple contingency test.
+    ((chi, dof, p_value),) = _sparse_power_divergence(
+        X, Y, Z, data, _encode_strata(Z, data), [lambda_]
+    )
 
-    # Step 3: If there are conditionals variables, iterate over unique states and do
-    #         the contingency test.
+    # Step 4: Return the values
+    if boolean:
+        return p_value >= kwargs["significance_level"]
     else:
-        chi = 0
-        dof = 0
-        for z_state, df in data.groupby(Z):
-            try:
-                c, _, d, _ = stats.chi2_contingency(
-                    df.groupby([X, Y]).size().unstack(Y, fill_value=0), lambda_=lambda_
-                )
-                chi += c
-                dof += d
-            except ValueError:
-                # If one of the values is 0 in the 2x2 table.
-                if isinstance(z_state, str):
-                    warn(f"Skipping the test {X} \u27C2 {Y} | {Z[0]}={z_state}. Not enough samples")
-                else:
-                    z_str = ", ".join([f"{var}={state}" for var, state in zip(Z, z_state)])
-                    warn(f"Skipping the test {X} \u27C2 {Y} | {z_str}. Not enough samples")
-        p_value = 1 - stats.chi2.cdf(chi, df=dof)
+        return chi, dof, p_value
 
-    # Step 4: Return the values
+
+def power_divergence_by_conditions(pairs, Z, data, lambda_="cressie-read"):
+    """
+    Computes the power divergence statistic for several pairs that share the same conditions.
+
+    The data are stratified by Z once, and the strata are reused for every pair, which gives
+    the same results as calling :func:`power_divergence` on each pair with ``boolean=False``.
+
+    Parameters
+    ----------
+    pairs: iterable of pairs of hashable objects
+        The (X, Y) pairs of variable names contained in the data set
+
+    Z: list, array-like
+        A list of variable names contained in the data set, different from each X and Y.
+
+    data: pandas.DataFrame
+        The dataset on which to test the independence conditions.
+
+    lambda_: float or string
+        The lambda parameter for the power_divergence statistic. See :func:`power_divergence`.
+
+    Returns
+    -------
+    A dictionary from each (X, Y) pair to the chi, dof, and p_value of its test.
+    """
+    Z = list(Z)
+    pairs = list(pairs)
+    for X, Y in pairs:
+        if (X in Z) or (Y in Z):
+            raise ValueError(
+                f"The variables X or Y can't be in Z. Found {X if X in Z else Y} in Z."
+            )
+
+    strata = _encode_strata(Z, data)
+    return {(X, Y): _sparse_power_divergence(X, Y, Z, data, strata, [lambda_])[0] for X, Y in pairs}
+
+
+def power_divergences(X, Y, Z, data, lambdas=None):
+    """
+    Computes several power divergence statistics for the same test at once.
+
+    The contingency tables of X and Y in each state of Z are only built once, then every
+    statistic is calculated from them together. This gives the same results as calling
+    :func:`power_divergence` with ``boolean=False`` for each lambda.
+
+    Parameters
+    ----------
+    X: int, string, hashable object
+        A variable name contained in the data set
+
+    Y: int, string, hashable object
+        A variable name contained in the data set, different from X
+
+    Z: list, array-like
+        A list of variable names contained in the data set, different from X and Y.
+
+    data: pandas.DataFrame
+        The dataset on which to test the independence condition.
+
+    lambdas: list of floats or strings
+        The lambda parameters for the power_divergence statistics. See :func:`power_divergence`.
+        Default: all of the named statistics
+
+    Returns
+    -------
+    A dictionary from each lambda to the chi, dof, and p_value of its test.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> import numpy as np
+    >>> data = pd.DataFrame(np.random.randint(0, 2, size=(50000, 3)), columns=list('ABC'))
+    >>> results = power_divergences(X='A', Y='B', Z=['C'], data=data)
+    >>> sorted(results)
+    ['cressie-read', 'freeman-tukey', 'log-likelihood', 'mod-log-likelihood', 'neyman', 'pearson']
+    """
+    Z = list(Z)
+    if (X in Z) or (Y in Z):
+        raise ValueError(f"The variables X or Y can't be in Z. Found {X if X in Z else Y} in Z.")
+    lambdas = list(_LAMBDAS if lambdas is None else lambdas)
+
+    results = _sparse_power_divergence(X, Y, Z, data, _encode_strata(Z, data), lambdas)
+    return dict(zip(lambdas, results))
+
+
+def power_divergence_by_groups(pairs, Z, data, groups, lambda_="cressie-read"):
+    """
+    Computes the power divergence statistic separately in each group of rows, such as the rows
+    that came from each of several datasets stacked together.
+
+    The group is treated as an extra conditioning variable, so all groups are counted in a
+    single pass, then the statistics are summed over the states of Z within each group. This
+    gives the same results as calling :func:`power_divergence` on each group's rows with
+    ``boolean=False``.
+
+    Parameters
+    ----------
+    pairs: iterable of pairs of hashable objects
+        The (X, Y) pairs of variable names contained in the data set
+
+    Z: list, array-like
+        A list of variable names contained in the data set, different from each X and Y.
+
+    data: pandas.DataFrame
+        The dataset on which to test the independence conditions.
+
+    groups: array-like of ints
+        The group of each row of the data, numbered from 0.
+
+    lambda_: float or string
+        The lambda parameter for the power_divergence statistic. See :func:`power_divergence`.
+
+    Returns
+    -------
+    A dictionary from each (X, Y) pair to a list with the chi, dof, and p_value of its test
+    in each group.
+    """
+    Z = list(Z)
+    pairs = list(pairs)
+    for X, Y in pairs:
+        if (X in Z) or (Y in Z):
+            raise ValueError(
+                f"The variables X or Y can't be in Z. Found {X if X in Z else Y} in Z."
+            )
+
+    groups = np.asarray(groups, dtype=np.int64)
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    strata = _encode_strata(Z, data)
+    n_strata = int(strata.max()) + 1 if len(strata) else 0
+    strata = np.where(strata >= 0, groups * n_strata + strata, -1)
+
+    rv = {}
+    for X, Y in pairs:
+        keys, counts, n_x, n_y = _count_cells(X, Y, Z, data, strata)
+        stratum_keys, chis, dofs = _stratum_power_divergence(keys, counts, n_x, n_y, [lambda_])
+        stratum_groups = stratum_keys // max(n_strata, 1)
+        group_chis = np.bincount(stratum_groups, weights=chis[0], minlength=n_groups)
+        group_dofs = np.bincount(stratum_groups, weights=dofs, minlength=n_groups)
+        rv[X, Y] = [_finish(Z, float(chi), int(dof)) for chi, dof in zip(group_chis, group_dofs)]
+    return rv
+
+
+#: The values of lambda for the named power divergence statistics, as in :func:`scipy.stats.power_divergence`
+_LAMBDAS = {
+    "pearson": 1,
+    "log-likelihood": 0,
+    "freeman-tukey": -0.5,
+    "mod-log-likelihood": -1,
+    "neyman": -2,
+    "cressie-read": 2 / 3,
+}
+
+
+def _encode(column):
+    """Get the integer codes of a column, where missing values are -1, and the number of codes."""
+    codes, uniques = pd.factorize(column)
+    return codes.astype(np.int64), len(uniques)
+
+
+def _encode_strata(Z, data):
+    """
+    Get the integer code of the state of Z in each row, where rows with missing values are -1.
+
+    Each variable's codes are packed into a single 64-bit key, then the keys are replaced
+    with dense codes before the next variable is packed, so they never overflow.
+    """
+    rv = np.zeros(len(data.index), dtype=np.int64)
+    for z in Z:
+        codes, n_codes = _encode(data[z])
+        missing = (rv < 0) | (codes < 0)
+        _, rv = np.unique(rv * n_codes + codes, return_inverse=True)
+        rv[missing] = -1
+    return rv
+
+
+def _sparse_power_divergence(X, Y, Z, data, strata, lambdas):
+    """
+    Sum the contingency test of X and Y over each state of Z for each lambda, using sparse counts.
+
+    This gives the same statistic as grouping the data by Z and calling
+    :func:`scipy.stats.chi2_contingency` on the dense table of X and Y in each group,
+    including the Yates correction for tables with one degree of freedom. States of Z
+    where no rows have both X and Y are skipped, with a single warning for all of them.
+    The tables are shared by all lambdas, and a list of results in the same order is returned.
+    """
+    return _counts_power_divergence(Z, *_count_cells(X, Y, Z, data, strata), lambdas)
+
+
+def _count_cells(X, Y, Z, data, strata):
+    """Count the rows in each state of (Z, X, Y), and get the numbers of codes of X and Y."""
+    x, n_x = _encode(data[X])
+    y, n_y = _encode(data[Y])
+    valid = (strata >= 0) & (x >= 0) & (y >= 0)
+    n_skipped = len(np.unique(strata[strata >= 0])) - len(np.unique(strata[valid]))
+    if n_skipped:
+        z_str = ", ".join(map(str, Z))
+        warn(
+            f"Skipping {n_skipped} states of {z_str} in the test {X} \u27C2 {Y}. Not enough samples"
+        )
+
+    # count each (Z, X, Y) combination from a single sorted pass over packed keys
+    keys, counts = np.unique((strata[valid] * n_x + x[valid]) * n_y + y[valid], return_counts=True)
+    return keys, counts, n_x, n_y
+
+
+def _counts_power_divergence(Z, keys, counts, n_x, n_y, lambdas):
+    """
+    Sum the contingency test over each state of Z from the counts of the packed (Z, X, Y) keys.
+
+    The keys are sorted and unique, as from :func:`numpy.unique`.
+    """
+    _, chis, dofs = _stratum_power_divergence(keys, counts, n_x, n_y, lambdas)
+    dof = int(dofs.sum())
+    return [_finish(Z, float(chi), dof) for chi in chis.sum(axis=1)]
+
+
+def _stratum_power_divergence(keys, counts, n_x, n_y, lambdas):
+    """
+    Get the contingency test in each state of Z from the counts of the packed (Z, X, Y) keys.
+
+    Returns the code of each state of Z, the statistic of each lambda in each state with one
+    row per lambda, and the degrees of freedom in each state.
+    """
+    if 0 == len(keys):
+        return np.zeros(0, dtype=np.int64), np.zeros((len(lambdas), 0)), np.zeros(0, dtype=int)
+    cell_rows, cell_y = np.divmod(keys, n_y)  # cell_rows identify (Z, X)
+    cell_strata = cell_rows // n_x
+
+    # the rows and columns of each stratum's dense table are the X and Y values in it
+    row_keys, cell_row = np.unique(cell_rows, return_inverse=True)
+    column_keys, cell_column = np.unique(cell_strata * n_y + cell_y, return_inverse=True)
+    stratum_keys, cell_stratum = np.unique(cell_strata, return_inverse=True)
+    row_stratum = np.searchsorted(stratum_keys, row_keys // n_x)
+    column_stratum = np.searchsorted(stratum_keys, column_keys // n_y)
+    n_rows = np.bincount(row_stratum, minlength=len(stratum_keys))
+    n_columns = np.bincount(column_stratum, minlength=len(stratum_keys))
+    row_sums = np.bincount(cell_row, weights=counts)
+    column_sums = np.bincount(cell_column, weights=counts)
+    totals = np.bincount(cell_stratum, weights=counts)
+    dofs = (n_rows - 1) * (n_columns - 1)
+
+    # enumerate every cell of each stratum's dense table, including the empty ones
+    sizes = n_rows * n_columns
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    grid_stratum = np.repeat(np.arange(len(stratum_keys)), sizes)
+    local = np.arange(sizes.sum()) - offsets[grid_stratum]
+    first_row = np.concatenate([[0], np.cumsum(n_rows)[:-1]])
+    first_column = np.concatenate([[0], np.cumsum(n_columns)[:-1]])
+    grid_row = first_row[grid_stratum] + local // n_columns[grid_stratum]
+    grid_column = first_column[grid_stratum] + local % n_columns[grid_stratum]
+    observed = np.zeros(len(grid_stratum))
+    local_row = cell_row - first_row[cell_stratum]
+    local_column = cell_column - first_column[cell_stratum]
+    observed[offsets[cell_stratum] + local_row * n_columns[cell_stratum] + local_column] = counts
+    expected = row_sums[grid_row] * column_sums[grid_column] / totals[grid_stratum]
+
+    # Yates' correction for tables with one degree of freedom
+    correct = dofs[grid_stratum] == 1
+    difference = expected[correct] - observed[correct]
+    observed[correct] += np.minimum(0.5, np.abs(difference)) * np.sign(difference)
+
+    # one row of terms per lambda, summed over the contiguous cells of each stratum
+    terms = _power_divergence_terms(
+        observed, expected, [_LAMBDAS.get(lambda_, lambda_) for lambda_ in lambdas]
+    )
+    chis = np.add.reduceat(terms, offsets, axis=1)
+    chis[:, dofs == 0] = 0.0  # as in chi2_contingency, tables with one row or column are ignored
+    return stratum_keys, chis, dofs
+
+
+def _finish(Z, chi, dof):
+    """Get the p-value in the same way as the contingency test on its own or summed over Z."""
+    if Z:
+        return chi, dof, 1 - stats.chi2.cdf(chi, df=dof)
+    if 0 == dof:
+        return chi, dof, 1.0
+    return chi, dof, stats.chi2.sf(chi, dof)
+
+
+def _power_divergence_terms(observed, expected, lambdas):
+    """
+    Get the terms of the power divergence statistic for each lambda, as in
+    :func:`scipy.stats.power_divergence`, with one row per lambda.
+    """
+    rv = np.empty((len(lambdas), len(observed)))
+    ratio = observed / expected
+    general = [i for i, lambda_ in enumerate(lambdas) if lambda_ not in (1, 0, -1)]
+    if general:
+        powers = np.array([lambdas[i] for i in general], dtype=float)[:, None]
+        rv[general] = observed * (ratio**powers - 1) / (0.5 * powers * (powers + 1))
+    for i, lambda_ in enumerate(lambdas):
+        if lambda_ == 1:
+            rv[i] = (observed - expected) ** 2 / expected
+        elif lambda_ == 0:
+            rv[i] = 2.0 * special.xlogy(observed, ratio)
+        elif lambda_ == -1:
+            with np.errstate(divide="ignore"):
+                rv[i] = 2.0 * special.xlogy(expected, expected / observed)
+    return rv
+
+
+def fisher_z(X, Y, Z, data, boolean=True, **kwargs):
+    """
+    Fisher's z test of the partial correlation for conditional independence [1].
+    Tests the null hypothesis that X is independent of Y given Zs, assuming the data
+    are jointly Gaussian.
+
+    Parameters
+    ----------
+    X: int, string, hashable object
+        A variable name contained in the data set
+
+    Y: int, string, hashable object
+        A variable name contained in the data set, different from X
+
+    Z: list, array-like
+        A list of variable names contained in the data set, different from X and Y.
+        This is the separating set that (potentially) makes X and Y independent.
+        Default: []
+
+    data: pandas.DataFrame
+        The dataset on which to test the independence condition.
+
+    boolean: bool
+        If boolean=True, an additional argument `significance_level` must
+            be specified. If p_value of the test is greater than equal to
+            `significance_level`, returns True. Otherwise returns False.
+
+        If boolean=False, returns the statistic, dof, and p_value of the test.
+
+    Returns
+    -------
+    If boolean = False, Returns 3 values:
+        chi: float
+            The square of the z statistic, which has a chi-square distribution with
+            one degree of freedom under the null hypothesis.
+
+        dof: int
+            The degrees of freedom of the test, which is always 1.
+
+        p_value: float
+            The two-sided p_value of the z statistic.
+
+    If boolean = True, returns:
+        independent: boolean
+            If the p_value of the test is greater than significance_level, returns True.
+            Else returns False.
+
+    References
+    ----------
+    [1] https://en.wikipedia.org/wiki/Partial_correlation#As_conditional_independence_test
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> import numpy as np
+    >>> data = pd.DataFrame(np.random.normal(size=(50000, 4)), columns=list('ABCD'))
+    >>> data['E'] = data['A'] + data['B'] + data['C']
+    >>> fisher_z(X='A', Y='C', Z=[], data=data, boolean=True, significance_level=0.05)
+    True
+    >>> fisher_z(X='A', Y='B', Z=['D', 'E'], data=data, boolean=True, significance_level=0.05)
+    False
+    """
+    chi, dof, p_value = FisherZ(data).test_by_conditions([(X, Y)], Z)[X, Y]
     if boolean:
         return p_value >= kwargs["significance_level"]
     else:
         return chi, dof, p_value
+
+
+class FisherZ:
+    """
+    Fisher's z tests of partial correlations computed from a single covariance matrix.
+
+    The sample covariance matrix is calculated once. For each conditioning set Z, the
+    Cholesky factor of the covariance of Z is calculated once and shared by all pairs
+    tested with it. Because conditioning sets are sorted tuples, the factor for Z is
+    built by appending a single row to the cached factor for Z without its last variable,
+    so nested conditioning sets reuse each other's factorizations.
+    """
+
+    def __init__(self, data):
+        self.columns = {column: i for i, column in enumerate(data.columns)}
+        self.n = len(data.index)
+        self.covariance = np.cov(data.to_numpy(dtype=float), rowvar=False)
+        self._cholesky = {(): np.zeros((0, 0))}
+
+    def get_cholesky(self, Z):
+        """Get the lower triangular Cholesky factor of the covariance of Z."""
+        Z = tuple(Z)
+        rv = self._cholesky.get(Z)
+        if rv is not None:
+            return rv
+        # extend the factor of the prefix by a single row
+        prefix = self.get_cholesky(Z[:-1])
+        indices = [self.columns[z] for z in Z]
+        row = _solve_lower(prefix, self.covariance[indices[:-1], indices[-1]])
+        diagonal = self.covariance[indices[-1], indices[-1]] - row @ row
+        rv = np.zeros((len(Z), len(Z)))
+        rv[:-1, :-1] = prefix
+        rv[-1, :-1] = row
+        rv[-1, -1] = np.sqrt(diagonal) if diagonal > 0 else np.nan
+        self._cholesky[Z] = rv
+        return rv
+
+    def test_by_conditions(self, pairs, Z):
+        """
+        Test several pairs that share the same conditions.
+
+        Returns a dictionary from each (X, Y) pair to the chi, dof, and p_value of its test.
+        """
+        Z = tuple(Z)
+        pairs = list(pairs)
+        for X, Y in pairs:
+            if (X in Z) or (Y in Z):
+                raise ValueError(
+                    f"The variables X or Y can't be in Z. Found {X if X in Z else Y} in Z."
+                )
+
+        variables = sorted({v for pair in pairs for v in pair}, key=self.columns.__getitem__)
+        positions = {v: i for i, v in enumerate(variables)}
+        indices = [self.columns[v] for v in variables]
+        z_indices = [self.columns[z] for z in Z]
+
+        # the covariance of the variables after regressing out Z
+        residual = self.covariance[np.ix_(indices, indices)]
+        if Z:
+            w = _solve_lower(self.get_cholesky(Z), self.covariance[np.ix_(z_indices, indices)])
+            residual = residual - w.T @ w
+
+        left = np.array([positions[X] for X, _ in pairs], dtype=int)
+        right = np.array([positions[Y] for _, Y in pairs], dtype=int)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = residual[left, right] / np.sqrt(residual[left, left] * residual[right, right])
+            r = np.clip(r, -1.0, 1.0)
+            z = np.arctanh(r) * np.sqrt(self.n - len(Z) - 3)
+        chi = z**2
+        p_values = stats.chi2.sf(chi, df=1)
+        return {
+            pair: (float(c), 1, float(p_value)) for pair, c, p_value in zip(pairs, chi, p_values)
+        }
+
+
+class AdaptivePowerDivergence:
+    """
+    Power divergence tests that only use as many rows as they need to reach a decision.
+
+    The rows are shuffled once, so the first n rows are a random subsample of size n. Each
+    test starts on a subsample, and is only grown geometrically while its decision is
+    uncertain. The counts of the (Z, X, Y) states are accumulated as the subsample grows,
+    so each row is only counted once. A test is settled when either:
+
+    - its p-value is below ``reject_below / n_looks``, where ``n_looks`` is the number of
+      subsample sizes up to all rows. Stopping at the first of several looks that rejects
+      would otherwise raise the chance of a false rejection above ``reject_below``, so the
+      level is split evenly between the looks, as in a Bonferroni correction.
+    - its p-value is still at least ``accept_above`` after projecting its statistic to all
+      rows as ``dof + max(chi - dof, 0) * n / size``. This assumes that the statistic's
+      excess over its degrees of freedom grows in proportion to the number of rows, as it
+      does when X and Y are dependent. It's only a heuristic, and doesn't bound the chance
+      of accepting a test that all rows would reject.
+
+    Otherwise, all rows are used, which gives the same results as :func:`power_divergence`.
+    """
+
+    def __init__(
+        self,
+        data,
+        reject_below,
+        accept_above,
+        initial_size=10_000,
+        growth=2,
+        lambda_="cressie-read",
+        seed=None,
+    ):
+        self.data = data
+        self.reject_below = reject_below
+        self.accept_above = accept_above
+        self.initial_size = initial_size
+        self.growth = growth
+        self.lambda_ = lambda_
+        self.n = len(data.index)
+        self.order = np.random.default_rng(seed).permutation(self.n)
+        self._codes = {}
+        self.n_looks = len(self._get_sizes())
+
+    def _get_sizes(self):
+        """Get the sizes of the subsamples that a test can look at, ending with all rows."""
+        rv = [min(self.n, self.initial_size)]
+        while rv[-1] < self.n:
+            rv.append(min(self.n, max(rv[-1] + 1, int(rv[-1] * self.growth))))
+        return rv
+
+    def get_codes(self, column):
+        """Get the integer codes of a column in the shuffled order, and the number of codes."""
+        rv = self._codes.get(column)
+        if rv is None:
+            codes, n_codes = _encode(self.data[column])
+            rv = self._codes[column] = codes[self.order], n_codes
+        return rv
+
+    def get_strata(self, Z):
+        """Get the integer code of the state of Z in each shuffled row, where missing ones are -1."""
+        rv = np.zeros(self.n, dtype=np.int64)
+        for z in Z:
+            codes, n_codes = self.get_codes(z)
+            missing = (rv < 0) | (codes < 0)
+            rv = pd.factorize(rv * n_codes + codes)[0]
+            rv[missing] = -1
+        return rv
+
+    def test_by_conditions(self, pairs, Z):
+        """
+        Test several pairs that share the same conditions.
+
+        Returns a dictionary from each (X, Y) pair to the chi, dof, and p_value of its test.
+        """
+        Z = list(Z)
+        pairs = list(pairs)
+        for X, Y in pairs:
+            if (X in Z) or (Y in Z):
+                raise ValueError(
+                    f"The variables X or Y can't be in Z. Found {X if X in Z else Y} in Z."
+                )
+        strata = self.get_strata(Z)
+        return {(X, Y): self._test(X, Y, Z, strata) for X, Y in pairs}
+
+    def _test(self, X, Y, Z, strata):
+        x, n_x = self.get_codes(X)
+        y, n_y = self.get_codes(Y)
+        keys, counts = np.zeros(0, dtype=np.int64), np.zeros(0)
+        reject_below = self.reject_below / self.n_looks
+        start = 0
+        for stop in self._get_sizes():
+            # add the counts of the new rows to the ones already accumulated
+            s, a, b = strata[start:stop], x[start:stop], y[start:stop]
+            valid = (s >= 0) & (a >= 0) & (b >= 0)
+            new_keys, new_counts = np.unique(
+                (s[valid] * n_x + a[valid]) * n_y + b[valid], return_counts=True
+            )
+            keys, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate([counts, new_counts]))
+
+            ((chi, dof, p_value),) = _counts_power_divergence(
+                Z, keys, counts, n_x, n_y, [self.lambda_]
+            )
+            if stop == self.n or p_value < reject_below:
+                return chi, dof, p_value
+            projected = dof + max(chi - dof, 0.0) * self.n / stop
+            if 0 == dof or stats.chi2.sf(projected, dof) >= self.accept_above:
+                return chi, dof, p_value
+            start = stop
+
+
+def _solve_lower(lower, b):
+    """Solve the lower triangular system, allowing for an empty one."""
+    if 0 == len(lower):
+        return np.zeros((0,) + np.shape(b)[1:])
+    return linalg.solve_triangular(lower, b, lower=True)
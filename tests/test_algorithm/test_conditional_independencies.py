@@ -2,19 +2,32 @@
 
 """Test getting conditional independencies (and related)."""
 
+import itertools as itt
 import unittest
+from collections import defaultdict
 from typing import Iterable, Set, Union
 
-from ananke.graphs import ADMG, SG
+import networkx as nx
+from ananke.graphs import SG
 
 from y0.algorithm.conditional_independencies import (
+    DSeparationOracle,
     are_d_separated,
+    d_connected_set,
+    d_separations,
     get_conditional_independencies,
-    get_moral_links,
+    minimal,
+    minimal_d_separators,
+    ordered_local_markov,
+    topological_policy,
+    topological_table_policy,
+    update_conditional_independencies,
 )
 from y0.examples import Example, d_separation_example, examples
 from y0.graph import NxMixedGraph
-from y0.struct import DSeparationJudgement
+from y0.struct import DSeparationJudgement, DSeparationTable
+from y0.util.combinatorics import powerset
+from ..utils import get_rng, random_graph
 
 
 class TestDSeparation(unittest.TestCase):
@@ -32,6 +45,90 @@ class TestDSeparation(unittest.TestCase):
         self.assertFalse(are_d_separated(graph, "D", "E", conditions=["AA", "B"]))
         self.assertFalse(are_d_separated(graph, "G", "G", conditions=["C"]))
 
+    def test_bidirected_collider(self):
+        """Test that a collider between a directed and a bidirected edge is opened by conditioning."""
+        graph = NxMixedGraph.from_edges(directed=[("A", "B")], undirected=[("B", "C")])
+        for g in [graph, graph.to_admg()]:
+            self.assertTrue(are_d_separated(g, "A", "C"))
+            self.assertFalse(are_d_separated(g, "A", "C", conditions=["B"]))
+        self.assertEqual([(True, "A", "C", ())], _as_tuples(get_conditional_independencies(graph)))
+
+    def test_d_connected_set(self):
+        """Test getting all nodes d-connected to a source in one traversal."""
+        graph = d_separation_example.graph
+        self.assertIn("B", d_connected_set(graph, ["AA"], ["D", "F"]))
+        self.assertNotIn("B", d_connected_set(graph, ["AA"]))
+        self.assertNotIn("E", d_connected_set(graph, ["D"], ["C"]))
+        self.assertEqual(set(), d_connected_set(graph, ["G"], ["C"]) & {"G", "C"})
+
+        rng = get_rng()
+        for trial in range(60):
+            nodes = [f"V{i}" for i in range(rng.randint(2, 7))]
+            # every other graph is a DAG
+            graph = random_graph(rng, nodes, directed=0.4, undirected=0.2 if trial % 2 else 0.0)
+            source = rng.choice(nodes)
+            conditions = set(rng.sample(nodes, rng.randint(0, len(nodes) - 1))) - {source}
+            connected = d_connected_set(graph, [source], conditions)
+            for target in set(nodes) - conditions - {source}:
+                with self.subTest(source=source, target=target, conditions=conditions):
+                    self.assertEqual(
+                        _m_separated(graph, source, target, conditions), target not in connected
+                    )
+                    if not graph.undirected.edges():
+                        self.assertEqual(
+                            nx.is_d_separator(graph.directed, source, target, conditions),
+                            target not in connected,
+                        )
+
+        # colliders on bidirected edges and hyperedges are opened by conditioning on them
+        for graph in [
+            NxMixedGraph.from_edges(undirected=[("A", "B"), ("B", "C")]),
+            NxMixedGraph.from_edges(hyperedges={"U": ["A", "B"], "W": ["B", "C"]}),
+        ]:
+            self.assertEqual(set(), d_connected_set(graph, ["A"]) & {"C"})
+            self.assertEqual({"C"}, d_connected_set(graph, ["A"], ["B"]))
+
+    def test_oracle(self):
+        """Test the memoizing d-separation oracle agrees with direct checks."""
+        rng = get_rng()
+        for _ in range(20):
+            nodes = [f"V{i}" for i in range(rng.randint(2, 6))]
+            graph = random_graph(rng, nodes, directed=0.4, undirected=0.1)
+            oracle = DSeparationOracle(graph)
+            for a, b in itt.permutations(nodes, 2):
+                for conditions in powerset(set(nodes) - {a, b}):
+                    with self.subTest(a=a, b=b, conditions=conditions):
+                        self.assertEqual(
+                            b not in d_connected_set(graph, [a], conditions),
+                            oracle.is_separated(a, b, conditions),
+                        )
+            self.assertEqual(
+                _as_tuples(d_separations(graph, return_all=True)),
+                _as_tuples(d_separations(oracle, return_all=True)),
+            )
+
+        graph = d_separation_example.graph
+        oracle = DSeparationOracle(graph)
+        self.assertEqual(0.0, oracle.hit_rate)
+        self.assertTrue(oracle.is_separated("AA", "B"))
+        self.assertEqual(1, oracle.misses)
+        self.assertTrue(oracle.is_separated("B", "AA", []))
+        self.assertEqual(1, oracle.hits)
+        self.assertFalse(oracle.is_separated("AA", "C", ["D"]))
+        self.assertEqual(1, oracle.inferred)
+        self.assertEqual(2 / 3, oracle.hit_rate)
+        self.assertEqual(
+            _as_tuples(get_conditional_independencies(graph)),
+            _as_tuples(get_conditional_independencies(oracle)),
+        )
+
+        # changing the graph clears the cache
+        oracle = DSeparationOracle(NxMixedGraph.from_edges(nodes=["A", "B"], directed=[]))
+        self.assertTrue(oracle.is_separated("A", "B"))
+        oracle.graph.add_directed_edge("A", "B")
+        self.assertFalse(oracle.is_separated("A", "B"))
+        self.assertFalse(oracle.are_d_separated("A", "B").separated)
+
     def test_examples(self):
         """Check that example conditional independencies are d-separations and that conditions (if present) are required.
 
@@ -56,56 +153,6 @@ class TestDSeparation(unittest.TestCase):
                             msg="Unexpected d-separation",
                         )
 
-    def test_moral_links(self):
-        """Test adding 'moral links' (part of the d-separation algorithm).
-
-        This test covers several cases around moral links to ensure that they are added when needed.
-        """
-        graph = ADMG(
-            vertices=("a", "b", "c"),
-            di_edges=[("a", "b"), ("b", "c")],
-        )
-        links = set(tuple(sorted(e)) for e in get_moral_links(graph))
-        self.assertEqual(set(), links, msg="Unexpected moral links added.")
-
-        graph = ADMG(
-            vertices=("a", "b", "c"),
-            di_edges=[("a", "c"), ("b", "c")],
-        )
-        links = set(tuple(sorted(e)) for e in get_moral_links(graph))
-        self.assertEqual(
-            {("a", "b")}, links, msg="Moral links not as expected in single-link case."
-        )
-
-        graph = ADMG(
-            vertices=("a", "b", "aa", "bb", "c"),
-            di_edges=[("a", "c"), ("b", "c"), ("aa", "c"), ("bb", "c")],
-        )
-        links = set(tuple(sorted(e)) for e in get_moral_links(graph))
-        self.assertEqual(
-            {
-                ("a", "b"),
-                ("a", "aa"),
-                ("a", "bb"),
-                ("aa", "b"),
-                ("aa", "bb"),
-                ("b", "bb"),
-            },
-            links,
-            msg="Moral links not as expected in multi-link case.",
-        )
-
-        graph = ADMG(
-            vertices=("a", "b", "c", "d", "e"),
-            di_edges=[("a", "c"), ("b", "c"), ("c", "e"), ("d", "e")],
-        )
-        links = set(tuple(sorted(e)) for e in get_moral_links(graph))
-        self.assertEqual(
-            {("a", "b"), ("c", "d")},
-            links,
-            msg="Moral links not as expected in multi-site case.",
-        )
-
 
 class TestGetConditionalIndependencies(unittest.TestCase):
     """Test getting conditional independencies."""
@@ -194,3 +241,183 @@ class TestGetConditionalIndependencies(unittest.TestCase):
             with self.subTest(name=example.name):
                 self.maxDiff = None
                 self.assert_example_has_judgements(example)
+
+    def test_update(self):
+        """Test updating the conditional independencies after editing the graph."""
+        rng = get_rng()
+        for _ in range(40):
+            nodes = [f"V{i}" for i in range(rng.randint(3, 6))]
+            graph = random_graph(rng, nodes, directed=0.3, undirected=0.1)
+            judgements = get_conditional_independencies(graph)
+            version = graph.version
+            for _ in range(rng.randint(1, 3)):
+                if rng.random() < 0.5 and graph.directed.number_of_edges():
+                    graph.remove_directed_edge(*rng.choice(sorted(graph.directed.edges())))
+                elif rng.random() < 0.8:
+                    graph.add_directed_edge(*sorted(rng.sample(nodes, 2)))
+                else:
+                    graph.add_undirected_edge(*rng.sample(nodes, 2))
+            if rng.random() < 0.2:
+                graph.add_directed_edge(nodes[0], "W")
+
+            with self.subTest(changes=graph.changes_since(version)):
+                actual = update_conditional_independencies(
+                    graph, judgements, graph.changes_since(version)
+                )
+                self.assert_valid_judgements(graph, actual)
+                expected = get_conditional_independencies(graph)
+                # the same pairs are separable, with the same number of conditions, but ties
+                # between separating sets of that size can be broken differently
+                self.assertEqual(
+                    {(j.left, j.right): len(j.conditions) for j in expected},
+                    {(j.left, j.right): len(j.conditions) for j in actual},
+                )
+
+    def test_minimal_separators(self):
+        """Test enumerating the minimal d-separators agrees with an exhaustive search."""
+        rng = get_rng()
+        for _ in range(50):
+            nodes = [f"V{i}" for i in range(rng.randint(2, 6))]
+            graph = random_graph(rng, nodes, directed=0.4, undirected=0.1)
+            separators = defaultdict(list)
+            for judgement in d_separations(graph, return_all=True):
+                separators[judgement.left, judgement.right].append(set(judgement.conditions))
+            for left, right in itt.combinations(sorted(nodes), 2):
+                expected = [
+                    conditions
+                    for conditions in separators[left, right]
+                    if not any(other < conditions for other in separators[left, right])
+                ]
+                actual = [
+                    set(judgement.conditions)
+                    for judgement in minimal_d_separators(graph, left, right)
+                ]
+                with self.subTest(left=left, right=right):
+                    self.assertEqual(len(actual), len(expected))
+                    self.assertTrue(all(conditions in expected for conditions in actual))
+
+        for example in examples:
+            if example.conditional_independencies is None:
+                continue
+            with self.subTest(name=example.name):
+                policy = topological_policy(example.graph.to_admg())
+                expected = minimal(d_separations(example.graph, return_all=True), policy=policy)
+                actual = get_conditional_independencies(example.graph, minimal_separators=True)
+                self.assertEqual(
+                    {(j.left, j.right): policy(j) for j in expected},
+                    {(j.left, j.right): policy(j) for j in actual},
+                )
+
+    def test_local_markov(self):
+        """Test the d-separations of the ordered local Markov property."""
+        rng = get_rng()
+        for _ in range(50):
+            nodes = [f"V{i}" for i in range(rng.randint(2, 7))]
+            graph = random_graph(rng, nodes, directed=0.4, undirected=0.1)
+            judgements = list(ordered_local_markov(graph, order=nodes))
+            self.assertEqual(len(judgements), len({judgement.left for judgement in judgements}))
+            for judgement in judgements:
+                with self.subTest(judgement=judgement):
+                    self.assertTrue(
+                        set(judgement.right).isdisjoint(
+                            d_connected_set(graph, [judgement.left], judgement.conditions)
+                        )
+                    )
+                    # the right nodes and conditions are all of the node's predecessors
+                    index = nodes.index(judgement.left)
+                    self.assertEqual(set(nodes[:index]), {*judgement.right, *judgement.conditions})
+
+        # in a DAG, each node is separated from its non-parent predecessors by its parents
+        graph = d_separation_example.graph
+        order = list(graph.topological_sort())
+        expected = set()
+        for i, node in enumerate(order):
+            rest = tuple(sorted(set(order[:i]) - set(graph.directed.predecessors(node))))
+            if rest:
+                expected.add((True, node, rest, tuple(sorted(graph.directed.predecessors(node)))))
+        self.assertEqual(expected, set(_as_tuples(ordered_local_markov(graph))))
+
+        # the blanket of a node includes the parents of its whole district
+        graph = NxMixedGraph.from_edges(directed=[("A", "B")], undirected=[("B", "C")])
+        self.assertEqual(
+            [(True, "C", ("A",), ())],
+            _as_tuples(ordered_local_markov(graph, order=["A", "C", "B"])),
+        )
+        graph = NxMixedGraph.from_edges(directed=[("A", "C")], undirected=[("B", "C")])
+        self.assertEqual(
+            [(True, "B", ("A",), ())],
+            _as_tuples(ordered_local_markov(graph, order=["A", "B", "C"])),
+        )
+
+        # an order that puts a node before its ancestor would give judgements that are false
+        graph = NxMixedGraph.from_edges(directed=[("A", "B"), ("B", "C")])
+        for order in [["A", "C", "B"], ["C", "B", "A"], ["A", "B"], ["A", "B", "B", "C"]]:
+            with self.subTest(order=order), self.assertRaises(ValueError):
+                list(ordered_local_markov(graph, order=order))
+
+    def test_table(self):
+        """Test storing all d-separations in a columnar table."""
+        rng = get_rng()
+        nodes = [f"V{i}" for i in range(7)]
+        graph = random_graph(rng, nodes, directed=0.3, undirected=0.1).to_admg()
+        judgements = list(d_separations(graph, return_all=True))
+        table = DSeparationTable.from_judgements(judgements)
+        self.assertEqual(len(judgements), len(table))
+        self.assertEqual(_as_tuples(judgements), _as_tuples(table.to_judgements()))
+        self.assertEqual([len(j.conditions) for j in judgements], table.sizes().tolist())
+        self.assertEqual(
+            _as_tuples(j for j in judgements if {"V1", "V2"}.issubset(j.conditions)),
+            _as_tuples(table.select(table.contains(["V1", "V2"]))),
+        )
+        pairs, groups = table.groups()
+        self.assertEqual(
+            {(j.left, j.right) for j in judgements},
+            {(table.nodes[left], table.nodes[right]) for left, right in pairs},
+        )
+        for judgement, group in zip(judgements, groups):
+            left, right = pairs[group]
+            self.assertEqual(
+                (judgement.left, judgement.right), (table.nodes[left], table.nodes[right])
+            )
+
+        self.assertEqual(set(_as_tuples(minimal(judgements))), set(_as_tuples(table.minimal())))
+        self.assertEqual(
+            set(_as_tuples(minimal(judgements, policy=topological_policy(graph)))),
+            set(_as_tuples(table.minimal(policy=topological_table_policy(graph)))),
+        )
+
+        # more than 64 nodes need several words for each set of conditions
+        nodes = [f"V{i:03}" for i in range(150)]
+        judgements = [
+            DSeparationJudgement.create(u, v, rng.sample(nodes, rng.randint(0, 5)))
+            for u, v in rng.sample(list(itt.combinations(nodes[:10], 2)), 20)
+            for _ in range(5)
+        ]
+        judgements = [
+            j for j in judgements if j.left not in j.conditions and j.right not in j.conditions
+        ]
+        table = DSeparationTable.from_judgements(judgements, nodes)
+        self.assertEqual((len(judgements), 3), table.conditions.shape)
+        self.assertEqual(_as_tuples(judgements), _as_tuples(table.to_judgements()))
+        self.assertEqual(set(_as_tuples(minimal(judgements))), set(_as_tuples(table.minimal())))
+
+
+def _m_separated(graph: NxMixedGraph, a, b, conditions) -> bool:
+    """Check m-separation in the moral graph of the ancestral subgraph, as a reference."""
+    ancestral = {a, b, *conditions}
+    for node in list(ancestral):
+        ancestral.update(nx.ancestors(graph.directed, node))
+    moral = nx.Graph()
+    moral.add_nodes_from(ancestral)
+    # nodes joined by a path of colliders are adjacent: a district and its parents
+    for district in nx.connected_components(graph.undirected.subgraph(ancestral)):
+        members = set(district)
+        for node in district:
+            members.update(graph.directed.predecessors(node))
+        moral.add_edges_from(itt.combinations(members, 2))
+    moral.remove_nodes_from(conditions)
+    return not nx.has_path(moral, a, b)
+
+
+def _as_tuples(judgements):
+    return [(j.separated, j.left, j.right, j.conditions) for j in judgements]
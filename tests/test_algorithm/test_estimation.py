@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the numeric evaluation of estimands."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from y0.algorithm.estimation import CountTable, bootstrap, bootstrap_confidence_interval, evaluate
+from y0.dsl import One, P, Sum, X, Y, Z
+
+try:
+    import pyarrow  # noqa:F401
+except ImportError:
+    missing_pyarrow = True
+else:
+    missing_pyarrow = False
+
+
+def _backdoor_data(n: int = 5000, seed: int = 0) -> pd.DataFrame:
+    """Generate data from the backdoor graph Z -> X -> Y <- Z."""
+    rng = np.random.default_rng(seed)
+    z = rng.binomial(1, 0.3, size=n)
+    x = rng.binomial(1, 0.2 + 0.6 * z)
+    y = rng.binomial(1, 0.1 + 0.5 * x + 0.3 * z)
+    return pd.DataFrame({"X": x, "Y": y, "Z": z})
+
+
+class TestEvaluate(unittest.TestCase):
+    """Test evaluating expressions on data."""
+
+    def setUp(self) -> None:
+        """Set up the test case."""
+        self.data = _backdoor_data()
+        self.adjustment = Sum[Z](P(Y | X, Z) * P(Z))
+
+    def test_probability(self):
+        """Test evaluating marginal and conditional probabilities."""
+        table = evaluate(P(Y | X), self.data)
+        self.assertEqual((X, Y), table.variables)
+        expected = pd.crosstab(self.data["X"], self.data["Y"], normalize="index").to_numpy()
+        np.testing.assert_allclose(expected, table.values)
+
+        table = evaluate(P(Y), self.data)
+        np.testing.assert_allclose(
+            self.data["Y"].value_counts(normalize=True).sort_index(), table.values
+        )
+
+    def test_adjustment(self):
+        """Test evaluating the backdoor adjustment formula."""
+        table = evaluate(self.adjustment, self.data)
+        self.assertEqual((X, Y), table.variables)
+
+        p_z = self.data["Z"].value_counts(normalize=True)
+        p_y_given_xz = self.data.groupby(["X", "Z"])["Y"].mean()
+        for x in (0, 1):
+            expected = sum(p_y_given_xz[x, z] * p_z[z] for z in (0, 1))
+            self.assertAlmostEqual(expected, table.values[x, 1])
+        np.testing.assert_allclose(1.0, table.values.sum(axis=1))
+
+    def test_fraction(self):
+        """Test evaluating fractions and the multiplicative identity."""
+        table = evaluate(P(X, Y) / Sum[Y](P(X, Y)), self.data)
+        np.testing.assert_allclose(evaluate(P(Y | X), self.data).values, table.values)
+        np.testing.assert_allclose(1.0, evaluate(One() * P(Y), self.data).values.sum())
+
+    def test_count_table(self):
+        """Test that pre-computed counts give the same result as a data frame."""
+        counts = CountTable.from_counts(self.data.groupby(["X", "Y", "Z"]).size())
+        np.testing.assert_allclose(
+            evaluate(self.adjustment, self.data).values,
+            evaluate(self.adjustment, counts).values,
+        )
+
+    def test_counterfactual(self):
+        """Test that counterfactual expressions can not be evaluated."""
+        with self.assertRaises(ValueError):
+            evaluate(P(Y @ X), self.data)
+
+
+class TestOutOfCore(unittest.TestCase):
+    """Test evaluating expressions on files read chunk by chunk."""
+
+    def setUp(self) -> None:
+        """Set up the test case."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.data = _backdoor_data().assign(W=0)
+        self.data.loc[::7, "Z"] = None
+        self.adjustment = Sum[Z](P(Y | X, Z) * P(Z))
+        self.expected = CountTable.from_frame(self.data, [X, Y, Z])
+
+    def tearDown(self) -> None:
+        """Tear down the test case."""
+        self.directory.cleanup()
+
+    def assert_count_table_equal(self, expected: CountTable, actual: CountTable) -> None:
+        """Assert two count tables have the same variables, levels, and counts."""
+        self.assertEqual(expected.variables, actual.variables)
+        self.assertEqual(expected.levels, actual.levels)
+        np.testing.assert_array_equal(expected.counts, actual.counts)
+
+    def test_csv(self):
+        """Test counting a CSV file in chunks."""
+        path = Path(self.directory.name).joinpath("data.csv")
+        self.data.to_csv(path, index=False)
+        actual = CountTable.from_path(path, [X, Y, Z], chunksize=333)
+        self.assert_count_table_equal(self.expected, actual)
+        np.testing.assert_allclose(
+            evaluate(self.adjustment, self.data).values,
+            evaluate(self.adjustment, path).values,
+        )
+
+    @unittest.skipIf(missing_pyarrow, "pyarrow is not installed")
+    def test_parquet(self):
+        """Test counting a Parquet file in chunks."""
+        path = Path(self.directory.name).joinpath("data.parquet")
+        self.data.to_parquet(path, index=False)
+        actual = CountTable.from_path(path, [X, Y, Z], chunksize=333)
+        self.assert_count_table_equal(self.expected, actual)
+        np.testing.assert_allclose(
+            evaluate(self.adjustment, self.data).values,
+            evaluate(self.adjustment, str(path)).values,
+        )
+
+
+class TestBootstrap(unittest.TestCase):
+    """Test batched bootstrap evaluation."""
+
+    def setUp(self) -> None:
+        """Set up the test case."""
+        self.data = _backdoor_data()
+        self.adjustment = Sum[Z](P(Y | X, Z) * P(Z))
+
+    def test_shape(self):
+        """Test that replicates are stacked on a leading axis."""
+        for method in ("multinomial", "poisson"):
+            with self.subTest(method=method):
+                table = bootstrap(self.adjustment, self.data, replicates=50, method=method, seed=0)
+                self.assertEqual((X, Y), table.variables)
+                self.assertEqual((50, 2, 2), table.values.shape)
+                np.testing.assert_allclose(1.0, table.values.sum(axis=2))
+        with self.assertRaises(ValueError):
+            bootstrap(self.adjustment, self.data, method="jackknife")
+
+    def test_reproducible(self):
+        """Test that seeding gives the same replicates."""
+        a = bootstrap(self.adjustment, self.data, replicates=10, seed=42)
+        b = bootstrap(self.adjustment, self.data, replicates=10, seed=42)
+        np.testing.assert_array_equal(a.values, b.values)
+
+    def test_confidence_interval(self):
+        """Test that the confidence interval covers the point estimate."""
+        point = evaluate(self.adjustment, self.data)
+        lower, upper = bootstrap_confidence_interval(
+            self.adjustment, self.data, replicates=200, seed=0
+        )
+        self.assertTrue((lower.values <= point.values).all())
+        self.assertTrue((point.values <= upper.values).all())
+        self.assertTrue((upper.values - lower.values < 0.1).all())
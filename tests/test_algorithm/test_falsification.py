@@ -2,11 +2,42 @@
 
 """Test falsification of testable implications given a graph."""
 
+import itertools as itt
+import tempfile
 import unittest
+import warnings
+from pathlib import Path
 
-from y0.algorithm.conditional_independencies import get_conditional_independencies
-from y0.algorithm.falsification import falsifications
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from y0.algorithm.conditional_independencies import (
+    get_conditional_independencies,
+    ordered_local_markov,
+)
+from y0.algorithm.falsification import (
+    FalsificationSession,
+    falsifications,
+    falsifications_by_dataset,
+    run_conditional_independence_tests,
+)
 from y0.examples import asia_example
+from y0.graph import NxMixedGraph
+from y0.util.stat_utils import (
+    AdaptivePowerDivergence,
+    FisherZ,
+    cressie_read,
+    power_divergence,
+    power_divergences,
+)
+
+try:
+    import pyarrow as pa
+except ImportError:
+    missing_pyarrow = True
+else:
+    missing_pyarrow = False
 
 
 class TestFalsification(unittest.TestCase):
@@ -28,3 +59,317 @@ class TestFalsification(unittest.TestCase):
         issues = falsifications(implications, df)
         self.assertEqual(0, len(issues))
         self.assertEqual(len(issues.evidence), len(implications))
+
+    def test_asia_local_markov(self):
+        """Test falsifying with the d-separations of the ordered local Markov property."""
+        graph = asia_example.graph.to_admg()
+        issues = falsifications(graph, asia_example.data, local_markov=True)
+        # every node but the first is separated from some of its predecessors
+        self.assertEqual(len(graph.vertices) - 1, len(issues.evidence))
+
+        # the judgements depend on the order, so it's fixed for checking the results
+        order = ["Asia", "Smoke", "Tub", "Bronc", "Lung", "Either", "Xray", "Dysp"]
+        judgements = list(ordered_local_markov(asia_example.graph, order=order))
+        issues = falsifications(judgements, asia_example.data)
+        self.assertEqual(0, len(issues))
+        self.assertEqual(len(judgements), len(issues.evidence))
+
+        # each node is tested once against the joint state of the predecessors it's separated from
+        df = asia_example.data
+        for judgement in judgements:
+            with self.subTest(judgement=judgement):
+                joint = df[list(judgement.right)].astype(str).agg(",".join, axis="columns")
+                chi, dof, p_value = cressie_read(
+                    judgement.left,
+                    "joint",
+                    list(judgement.conditions),
+                    df.assign(joint=joint),
+                    boolean=False,
+                )
+                row = issues.evidence[issues.evidence["left"] == judgement.left].iloc[0]
+                self.assertEqual(judgement.right, row["right"])
+                self.assertAlmostEqual(chi, row["chi^2"])
+                self.assertEqual(dof, row["dof"])
+                # a node that's determined by its blanket has no degrees of freedom left
+                np.testing.assert_allclose(p_value, row["p"])
+
+        with self.assertRaises(ValueError):
+            falsifications(graph, df, local_markov=True, method="fisher_z")
+
+    def test_asia_stop_early(self):
+        """Test stopping once a graph is falsified, or after a budget of tests."""
+        df = asia_example.data
+        issues = falsifications(asia_example.graph.to_admg(), df, stop_early=True)
+        self.assertEqual(0, len(issues))
+        self.assertEqual([], issues.untested)
+
+        graph = asia_example.graph.subgraph(asia_example.graph.nodes())  # don't modify the example
+        graph.remove_directed_edge("Smoke", "Lung")
+        implications = get_conditional_independencies(graph.to_admg())
+        expected = falsifications(implications, df)
+        self.assertLess(0, len(expected))
+
+        issues = falsifications(implications, df, stop_early=True)
+        self.assertLess(0, len(issues))
+        self.assertLess(0, len(issues.untested))
+        self.assertEqual(len(implications), len(issues.evidence) + len(issues.untested))
+        # the tests with the smallest conditions are run first
+        self.assertLessEqual(
+            issues.evidence["given"].map(len).max(),
+            min(len(conditions) for _, _, conditions in issues.untested),
+        )
+
+        issues = falsifications(implications, df, max_tests=3)
+        self.assertEqual(3, len(issues.evidence))
+        self.assertEqual(len(implications) - 3, len(issues.untested))
+
+    def test_asia_subsample(self):
+        """Test starting each test on a random subsample of the rows."""
+        df = asia_example.data
+        issues = falsifications(asia_example.graph.to_admg(), df, sample_size=500, seed=0)
+        self.assertEqual(0, len(issues))
+
+        graph = asia_example.graph.subgraph(asia_example.graph.nodes())  # don't modify the example
+        graph.remove_directed_edge("Smoke", "Lung")
+        implications = get_conditional_independencies(graph.to_admg())
+        expected = falsifications(implications, df)
+        issues = falsifications(implications, df, sample_size=500, seed=0)
+        self.assertLess(0, len(issues))
+        self.assertLessEqual(len(issues), len(expected))
+
+        # starting from all of the rows gives the same results
+        issues = falsifications(implications, df, sample_size=len(df), seed=0)
+        self.assertEqual(len(expected), len(issues))
+        np.testing.assert_allclose(
+            np.sort(expected.evidence["p"].values), np.sort(issues.evidence["p"].values)
+        )
+
+        with self.assertRaises(ValueError):
+            falsifications(implications, df, method="fisher_z", sample_size=500)
+
+        # the rejection level is split between the subsamples of 500, 1000, 2000, 4000, and
+        # all 5000 rows, so a test is only rejected early below 0.01 / 5
+        tester = AdaptivePowerDivergence(df, 0.01, 0.5, initial_size=500, seed=0)
+        self.assertEqual(5, tester.n_looks)
+        ((_, _, p_value),) = tester.test_by_conditions([("Smoke", "Lung")], []).values()
+        self.assertLess(p_value, 0.01 / 5)
+
+    def test_asia_datasets(self):
+        """Test falsifying a graph against several datasets at once."""
+        graph = asia_example.graph.to_admg()
+        df = asia_example.data
+        datasets = {
+            "first": df.iloc[:2000],
+            "second": df.iloc[2000:3500].assign(extra=0),  # columns that aren't tested
+            "third": df.iloc[3500:][list(reversed(df.columns))],  # columns in another order
+        }
+        evidence = falsifications_by_dataset(graph, datasets)
+        self.assertEqual("dataset", evidence.columns[0])
+        self.assertEqual(set(datasets), set(evidence["dataset"]))
+        for name, data in datasets.items():
+            with self.subTest(name=name):
+                expected = falsifications(graph, data).evidence
+                actual = evidence[evidence["dataset"] == name]
+                self.assertEqual(len(expected), len(actual))
+                self.assertEqual(
+                    {tuple(row) for row in expected[["left", "right", "given", "dof"]].values},
+                    {tuple(row) for row in actual[["left", "right", "given", "dof"]].values},
+                )
+                np.testing.assert_allclose(
+                    np.sort(expected["p"].values), np.sort(actual["p"].values)
+                )
+
+    @unittest.skipIf(missing_pyarrow, "pyarrow is not installed")
+    def test_asia_arrow(self):
+        """Test reading the data from an Arrow table or a Parquet file."""
+        graph = asia_example.graph.to_admg()
+        df = asia_example.data
+        expected = falsifications(graph, df).evidence
+
+        # dictionary encode some of the columns, with different dictionaries in each chunk
+        labels = df.drop(columns="Unnamed: 0").replace({-1: "no", 1: "yes"})
+        table = pa.Table.from_batches(
+            [
+                pa.RecordBatch.from_pandas(
+                    labels.iloc[:2000].astype({"Smoke": "category"}), preserve_index=False
+                ),
+                pa.RecordBatch.from_pandas(
+                    labels.iloc[2000:].astype({"Smoke": "category"}), preserve_index=False
+                ),
+            ]
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath("asia.parquet")
+            labels.astype({"Lung": "category"}).assign(Extra=0.0).to_parquet(path, index=False)
+            for data in [table, path, str(path)]:
+                with self.subTest(data=type(data)):
+                    actual = falsifications(graph, data).evidence
+                    self.assertEqual(len(expected), len(actual))
+                    np.testing.assert_allclose(
+                        np.sort(expected["p"].values), np.sort(actual["p"].values)
+                    )
+
+    def test_asia_session(self):
+        """Test that a falsification session only runs tests for new implications."""
+        graph = asia_example.graph
+        df = asia_example.data
+        session = FalsificationSession(df)
+        issues = session.falsify(graph)
+        self.assertEqual(0, len(issues))
+        self.assertEqual(len(get_conditional_independencies(graph)), len(issues.evidence))
+
+        graph = graph.subgraph(graph.nodes())  # don't modify the example
+        session.falsify(graph)
+        before = set(session.results)
+        graph.add_directed_edge("Asia", "Lung")
+        graph.remove_directed_edge("Either", "Xray")
+        issues = session.falsify(graph)
+        implications = session.judgements
+        self.assertEqual(
+            {(j.left, j.right) for j in get_conditional_independencies(graph)},
+            {(j.left, j.right) for j in implications},
+        )
+        keys = {(j.left, j.right, j.conditions) for j in implications}
+        self.assertEqual(len(implications), len(issues.evidence))
+        self.assertEqual(
+            keys, {tuple(row) for row in issues.evidence[["left", "right", "given"]].values}
+        )
+        # only the new implications were tested
+        self.assertEqual(keys - before, set(session.results) - before)
+
+        expected = falsifications(implications, df)
+        np.testing.assert_allclose(
+            np.sort(expected.evidence["p"].values), np.sort(issues.evidence["p"].values)
+        )
+
+    def test_grouped_tests(self):
+        """Test that grouping the tests by their conditions gives the same results."""
+        df = asia_example.data
+        keys = [
+            ("Asia", "Smoke", ()),
+            ("Asia", "Bronc", ()),
+            ("Asia", "Lung", ("Smoke",)),
+            ("Bronc", "Tub", ("Smoke",)),
+            ("Asia", "Dysp", ("Bronc", "Either")),
+            ("Smoke", "Xray", ("Bronc", "Either")),
+            ("Lung", "Xray", ("Either", "Tub")),
+        ]
+        results = run_conditional_independence_tests(keys, df)
+        self.assertEqual(set(keys), set(results))
+        for left, right, conditions in keys:
+            with self.subTest(left=left, right=right, conditions=conditions):
+                np.testing.assert_array_equal(
+                    cressie_read(left, right, conditions, df, boolean=False),
+                    results[left, right, conditions],
+                )
+
+    def test_fisher_z(self):
+        """Test the partial correlation tests on data from a linear Gaussian model."""
+        rng = np.random.default_rng(0)
+        graph = NxMixedGraph.from_edges(
+            directed=[("A", "C"), ("B", "C"), ("C", "D"), ("D", "E"), ("B", "E")]
+        )
+        columns = {}
+        for node in graph.topological_sort():
+            noise = rng.normal(size=3000)
+            columns[node] = noise + sum(
+                columns[parent] for parent in graph.directed.predecessors(node)
+            )
+        df = pd.DataFrame(columns)
+
+        # compare against inverting the covariance matrix of each test's variables
+        tester = FisherZ(df)
+        covariance = df.cov().to_numpy()
+        for left, right in itt.combinations(df.columns, 2):
+            others = [column for column in df.columns if column not in {left, right}]
+            for conditions in itt.chain.from_iterable(
+                itt.combinations(others, k) for k in range(4)
+            ):
+                indices = [df.columns.get_loc(column) for column in (left, right, *conditions)]
+                precision = np.linalg.inv(covariance[np.ix_(indices, indices)])
+                r = -precision[0, 1] / np.sqrt(precision[0, 0] * precision[1, 1])
+                z = np.arctanh(r) * np.sqrt(len(df.index) - len(conditions) - 3)
+                chi, dof, _ = tester.test_by_conditions([(left, right)], conditions)[left, right]
+                self.assertAlmostEqual(z**2, chi)
+                self.assertEqual(1, dof)
+
+        issues = falsifications(graph.to_admg(), df, method="fisher_z")
+        self.assertEqual(0, len(issues))
+        self.assertGreater(len(issues.evidence), 0)
+
+        # a graph missing the B -> E edge implies a false independence
+        wrong = graph.subgraph(graph.nodes())
+        wrong.remove_directed_edge("B", "E")
+        session = FalsificationSession(df, method="fisher_z")
+        self.assertLess(0, len(session.falsify(wrong)))
+
+        with self.assertRaises(ValueError):
+            falsifications(graph.to_admg(), df, method="nope")
+
+    def test_sparse_counting(self):
+        """Test the sparse contingency counts against dense tables for each stratum."""
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame(
+            {column: rng.integers(0, k, size=2000) for column, k in zip("ABCD", [2, 3, 4, 30])}
+        )
+        df["E"] = (df["A"] + df["B"] + rng.integers(0, 2, size=2000)) % 3
+        df["B"] = df["B"].astype(str)
+        for lambda_ in ["cressie-read", "pearson", "log-likelihood"]:
+            for left, right in itt.combinations(df.columns, 2):
+                others = [column for column in df.columns if column not in {left, right}]
+                for conditions in itt.chain.from_iterable(
+                    itt.combinations(others, k) for k in range(3)
+                ):
+                    with self.subTest(left=left, right=right, conditions=conditions):
+                        expected = _dense_power_divergence(left, right, conditions, df, lambda_)
+                        actual = power_divergence(
+                            left, right, conditions, df, boolean=False, lambda_=lambda_
+                        )
+                        self.assertEqual(expected[1], actual[1])
+                        np.testing.assert_allclose(expected[0], actual[0])
+                        np.testing.assert_allclose(expected[2], actual[2])
+
+        # strata without any complete rows are reported together
+        df = pd.DataFrame({"X": [0, 1, None, None], "Y": [0, 1, 1, 0], "Z": [0, 0, 1, 2]})
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            power_divergence("X", "Y", ["Z"], df, boolean=False)
+        self.assertEqual(1, len(caught))
+        self.assertIn("Skipping 2 states", str(caught[0].message))
+
+    def test_power_divergences(self):
+        """Test calculating several power divergence statistics from the same tables."""
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({column: rng.integers(0, 3, size=2000) for column in "ABCD"})
+        df["E"] = (df["A"] + df["B"]) % 2
+        lambdas = ["pearson", "log-likelihood", "freeman-tukey", "mod-log-likelihood", 0.3]
+        for left, right, conditions in [("A", "B", ()), ("A", "E", ("C",)), ("A", "E", ("B", "C"))]:
+            with self.subTest(left=left, right=right, conditions=conditions):
+                results = power_divergences(left, right, conditions, df, lambdas)
+                self.assertEqual(lambdas, list(results))
+                for lambda_, actual in results.items():
+                    expected = power_divergence(
+                        left, right, conditions, df, boolean=False, lambda_=lambda_
+                    )
+                    self.assertEqual(expected[1], actual[1])
+                    np.testing.assert_allclose(expected[0], actual[0])
+                    np.testing.assert_allclose(expected[2], actual[2])
+
+        self.assertEqual(6, len(power_divergences("A", "B", ["C"], df)))
+        with self.assertRaises(ValueError):
+            power_divergences("A", "B", ["A"], df)
+
+
+def _dense_power_divergence(left, right, conditions, df, lambda_):
+    """Run the contingency test on the dense table of each group of the data."""
+    if not conditions:
+        table = df.groupby([left, right]).size().unstack(right, fill_value=0)
+        chi, p, dof, _ = stats.chi2_contingency(table, lambda_=lambda_)
+        return chi, dof, p
+    chi, dof = 0, 0
+    for _, group in df.groupby(list(conditions)):
+        table = group.groupby([left, right]).size().unstack(right, fill_value=0)
+        c, _, d, _ = stats.chi2_contingency(table, lambda_=lambda_)
+        chi += c
+        dof += d
+    return chi, dof, 1 - stats.chi2.cdf(chi, df=dof)
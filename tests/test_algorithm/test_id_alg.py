@@ -4,9 +4,14 @@
 
 import itertools as itt
 import unittest
+from unittest import mock
 
-from y0.algorithm.identify import Unidentifiable, idc, identify
+from y0.algorithm.conditional_independencies import DSeparationOracle
+from y0.algorithm.identify import Identification, Query, Unidentifiable, idc, identify
+from y0.algorithm.identify import id_std
+from y0.algorithm.identify.id_c import rule_2_of_do_calculus_applies, rule_2_table
 from y0.algorithm.identify.id_std import (
+    identify_markovian,
     line_1,
     line_2,
     line_3,
@@ -26,7 +31,9 @@ from y0.examples import (
     line_6_example,
     line_7_example,
 )
+from y0.graph import NxMixedGraph
 from y0.mutate import canonicalize
+from ..utils import get_rng, random_graph
 
 P_XY = P(X, Y)
 P_XYZ = P(X, Y, Z)
@@ -60,6 +67,37 @@ class TestIdentify(unittest.TestCase):
                 expected=id_out.estimand,
                 actual=idc(id_in),
             )
+            self.assert_expr_equal(
+                expected=id_out.estimand,
+                actual=idc(id_in, oracle=DSeparationOracle(id_in.graph)),
+            )
+
+        # an oracle for any other graph, even an equal copy, is rejected
+        id_in = figure_6a.identifications[0]["id_in"][0]
+        copy = NxMixedGraph.from_edges(
+            nodes=id_in.graph.nodes(),
+            directed=list(id_in.graph.directed.edges()),
+            undirected=list(id_in.graph.undirected.edges()),
+        )
+        with self.assertRaises(ValueError):
+            idc(id_in, oracle=DSeparationOracle(copy))
+
+    def test_rule_2_table(self):
+        """Test the shared rule 2 analysis agrees with checking each condition separately."""
+        rng = get_rng()
+        for _ in range(100):
+            variables = [Variable(f"V{i}") for i in range(rng.randint(3, 7))]
+            graph = random_graph(rng, variables, directed=0.5, undirected=0.2)
+            outcome, treatment, *conditions = rng.sample(variables, len(variables))
+            identification = Identification(
+                query=Query(outcomes={outcome}, treatments={treatment}, conditions=set(conditions)),
+                graph=graph,
+            )
+            expected = {
+                condition: rule_2_of_do_calculus_applies(identification, condition)
+                for condition in conditions
+            }
+            self.assertEqual(expected, rule_2_table(identification))
 
     def test_line_1(self):
         r"""Test that line 1 of ID algorithm works correctly.
@@ -200,3 +238,38 @@ class TestIdentify(unittest.TestCase):
                 Sum(P(Y1)),
                 identify(identification["id_in"][0]),
             )
+
+    def test_markovian(self):
+        """Test the one-pass identification on graphs without bidirected edges."""
+        graph = NxMixedGraph.from_edges(directed=[(Z, X), (X, Y), (Z, Y)])
+        identification = Identification.from_expression(graph=graph, query=P(Y @ X))
+        self.assert_expr_equal(Sum[Z](P(Y | X, Z) * P(Z)), identify_markovian(identification))
+        self.assert_expr_equal(Sum[Z](P(Y | X, Z) * P(Z)), identify(identification))
+
+        # bidirected edges outside the ancestors of the outcome don't matter
+        graph = NxMixedGraph.from_edges(directed=[(X, Y), (Y, Z)], undirected=[(X, Z)])
+        identification = Identification.from_expression(graph=graph, query=P(Y @ X))
+        self.assert_expr_equal(P(Y | X), identify_markovian(identification))
+
+        graph = NxMixedGraph.from_edges(directed=[(X, Y)], undirected=[(X, Y)])
+        identification = Identification.from_expression(graph=graph, query=P(Y @ X))
+        with self.assertRaises(ValueError):
+            identify_markovian(identification)
+
+    def test_markovian_recursive(self):
+        """Test the one-pass identification gives the same estimands as the recursion."""
+        rng = get_rng()
+        for _ in range(100):
+            variables = [Variable(f"V{i}") for i in range(rng.randint(2, 7))]
+            graph = random_graph(rng, variables, directed=0.4)
+            *candidates, outcome = variables
+            treatments = rng.sample(candidates, rng.randint(0, len(candidates)))
+            identification = Identification.from_parts(
+                outcomes={outcome}, treatments=set(treatments), graph=graph
+            )
+            fast = identify(identification)
+            with mock.patch.object(id_std, "_is_markovian", return_value=False):
+                recursive = identify(identification)
+            self.assertEqual(
+                canonicalize(recursive, variables), canonicalize(fast, variables), msg=str(graph)
+            )
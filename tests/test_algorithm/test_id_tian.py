@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for the Q-factor based identification algorithm."""
+
+import itertools as itt
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from y0.algorithm.estimation import CountTable, evaluate
+from y0.algorithm.identify import Identification, Unidentifiable, identify, identify_tian
+from y0.algorithm.identify.id_tian import _Engine
+from y0.dsl import P, QFactor, Variable, X, Y
+from y0.examples import (
+    frontdoor_example,
+    line_1_example,
+    line_2_example,
+    line_3_example,
+    line_4_example,
+    line_5_example,
+    line_6_example,
+    line_7_example,
+    napkin_example,
+)
+from y0.graph import NxMixedGraph
+from y0.mutate.canonicalize_expr import canonical_expr_equal
+from ..utils import get_rng, random_graph
+
+
+def _exact_counts(graph: NxMixedGraph, seed: int) -> CountTable:
+    """Get the exact joint distribution of a random binary model over the graph.
+
+    Each bidirected edge is replaced by a binary latent variable, which is summed out.
+
+    :param graph: A graph without hyperedges
+    :param seed: The seed for the random weights of the model
+    :returns: A count table whose counts are the probabilities of each assignment
+    """
+    rng = np.random.default_rng(seed)
+    observed = list(graph.topological_sort())
+    latents = list(graph.undirected.edges())
+    weights = {node: rng.normal(0, 2, size=1 + len(observed) + len(latents)) for node in observed}
+    index, probabilities = [], []
+    for assignment in itt.product((0, 1), repeat=len(observed) + len(latents)):
+        values = dict(zip(observed, assignment))
+        probability = 0.5 ** len(latents)
+        for node in observed:
+            inputs = [1.0]
+            inputs.extend(values[parent] for parent in graph.directed.predecessors(node))
+            inputs.extend(assignment[len(observed) + i] for i, e in enumerate(latents) if node in e)
+            p = 1 / (1 + np.exp(-weights[node][: len(inputs)] @ np.array(inputs, dtype=float)))
+            probability *= p if values[node] else 1 - p
+        index.append(assignment[: len(observed)])
+        probabilities.append(probability)
+    series = pd.Series(
+        probabilities, index=pd.MultiIndex.from_tuples(index, names=[v.name for v in observed])
+    )
+    return CountTable.from_counts(series.groupby(level=list(range(len(observed)))).sum())
+
+
+class TestIdentifyTian(unittest.TestCase):
+    """Test the Q-factor based identification algorithm."""
+
+    def test_examples(self):
+        """Test the estimands are the same as the ones from the recursive algorithm."""
+        for example in [
+            line_1_example,
+            line_2_example,
+            line_3_example,
+            line_4_example,
+            line_6_example,
+            line_7_example,
+        ]:
+            for identification in example.identifications:
+                id_in = identification["id_in"][0]
+                with self.subTest(name=example.name):
+                    self.assertTrue(
+                        canonical_expr_equal(identify(id_in), identify_tian(id_in).expand())
+                    )
+
+        for identification in line_5_example.identifications:
+            with self.assertRaises(Unidentifiable):
+                identify_tian(identification["id_in"][0])
+
+    def test_q_factors(self):
+        """Test that the districts are represented by Q-factors."""
+        for example in [frontdoor_example, napkin_example]:
+            identification = Identification.from_expression(graph=example.graph, query=P(Y @ X))
+            result = identify_tian(identification)
+            factors = {e for e in _iter_q_factors(result.estimand)}
+            self.assertLess(0, len(factors))
+            self.assertEqual(factors, set(result.factors))
+            self.assertTrue(
+                canonical_expr_equal(identify(identification), result.expand()),
+                msg=f"\n{example.name}: {result.estimand}",
+            )
+
+    def test_add_factor(self):
+        """Test the domain of a Q-factor only has parents in the subproblem."""
+        z = Variable("Z")
+        engine = _Engine(NxMixedGraph.from_edges(directed=[(X, z), (z, Y)], undirected=[(X, Y)]))
+        factor = engine.add_factor({z}, P(z), {z})
+        self.assertEqual((z,), factor.domain)
+        self.assertEqual(factor, engine.add_factor({z}, P(z), {z}))
+        with self.assertRaises(ValueError):
+            engine.add_factor({z}, P(z | X), {z})
+        self.assertEqual((X, z), engine.add_factor({z}, P(z | X), {X, z}).domain)
+
+    def test_random(self):
+        """Test the estimands agree with the recursive algorithm on random graphs.
+
+        Both algorithms may factorize a district with a different topological ordering, so
+        the estimands are compared on the exact distribution of a random model.
+        """
+        rng = get_rng()
+        for seed in range(30):
+            variables = [Variable(f"V{i}") for i in range(rng.randint(3, 6))]
+            graph = random_graph(rng, variables, directed=0.4, undirected=0.2)
+            *candidates, outcome = variables
+            treatments = rng.sample(candidates, rng.randint(1, 2))
+            identification = Identification.from_parts(
+                outcomes={outcome}, treatments=set(treatments), graph=graph
+            )
+            try:
+                expected = identify(identification)
+            except Unidentifiable:
+                with self.assertRaises(Unidentifiable):
+                    identify_tian(identification)
+                continue
+            actual = identify_tian(identification).expand()
+            counts = _exact_counts(graph, seed)
+            expected_table, actual_table = evaluate(expected, counts), evaluate(actual, counts)
+            self.assertEqual(expected_table.variables, actual_table.variables)
+            np.testing.assert_allclose(expected_table.values, actual_table.values)
+
+    def test_factors_defined_once(self):
+        """Test each Q-factor is only defined once, on queries with several outcomes.
+
+        The districts of line 4 are disjoint, and each is only split further inside its own
+        subproblem, so the same district can't be reached through two recursion paths and
+        the check for conflicting definitions in ``add_factor`` never fires.
+        """
+        original = _Engine.add_factor
+        added = []
+
+        def _add_factor(engine, district, definition, vertices):
+            factor = original(engine, district, definition, vertices)
+            added.append(factor)
+            return factor
+
+        rng = get_rng()
+        for _ in range(300):
+            variables = [Variable(f"V{i}") for i in range(rng.randint(3, 7))]
+            graph = random_graph(rng, variables, directed=0.4, undirected=0.25)
+            shuffled = rng.sample(variables, len(variables))
+            n_outcomes = rng.randint(1, 3)
+            identification = Identification.from_parts(
+                outcomes=set(shuffled[:n_outcomes]),
+                treatments=set(shuffled[n_outcomes : n_outcomes + rng.randint(1, 2)]),
+                graph=graph,
+            )
+            added.clear()
+            with mock.patch.object(_Engine, "add_factor", _add_factor):
+                try:
+                    result = identify_tian(identification)
+                except Unidentifiable:
+                    continue
+            with self.subTest(identification=identification):
+                self.assertEqual(len(added), len(set(added)))
+                self.assertEqual(set(added), set(result.factors))
+
+    def test_hyperedges(self):
+        """Test identification on graphs where latent confounders are stored as hyperedges."""
+        variables = [Variable(f"V{i}") for i in range(8)]
+        directed = list(zip(variables, variables[1:]))
+        for latents in [{"U": variables[2::2]}, {"U": variables[:3], "W": variables[5:]}]:
+            graph = NxMixedGraph.from_edges(directed=directed, hyperedges=latents)
+            identification = Identification.from_parts(
+                outcomes={variables[-1]}, treatments={variables[3]}, graph=graph
+            )
+            expanded = Identification.from_parts(
+                outcomes={variables[-1]}, treatments={variables[3]}, graph=graph.expand_hyperedges()
+            )
+            try:
+                expected = identify(expanded)
+            except Unidentifiable:
+                with self.assertRaises(Unidentifiable):
+                    identify_tian(identification)
+                with self.assertRaises(Unidentifiable):
+                    identify(identification)
+                continue
+            self.assertTrue(canonical_expr_equal(expected, identify(identification)))
+            self.assertTrue(canonical_expr_equal(expected, identify_tian(identification).expand()))
+
+    def test_large(self):
+        """Test a graph too large for the recursive algorithm to finish quickly."""
+        rng = get_rng()
+        variables = [Variable(f"V{i}") for i in range(500)]
+        graph = NxMixedGraph.from_edges(
+            nodes=variables,
+            directed=[
+                (u, v)
+                for i, u in enumerate(variables)
+                for v in variables[i + 1 : i + 6]
+                if rng.random() < 0.5
+            ],
+            undirected=[(u, v) for u, v in zip(variables, variables[3:]) if rng.random() < 0.03],
+        )
+        identification = Identification.from_parts(
+            outcomes={variables[-1]}, treatments={variables[250]}, graph=graph
+        )
+        result = identify_tian(identification)
+        self.assertLess(100, len(result.factors))
+
+
+def _iter_q_factors(expression):
+    if isinstance(expression, QFactor):
+        yield expression
+    for attribute in ("expression", "numerator", "denominator"):
+        if hasattr(expression, attribute):
+            yield from _iter_q_factors(getattr(expression, attribute))
+    for child in getattr(expression, "expressions", ()):
+        yield from _iter_q_factors(child)
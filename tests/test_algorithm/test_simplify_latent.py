@@ -129,3 +129,29 @@ class TestSimplify(unittest.TestCase):
         set_latent(expected, ["U"])
 
         self.assert_latent_variable_dag_equal(expected, graph)
+
+    def test_remove_redundant_latents_duplicates(self):
+        """Test removing latents with the same or nested children."""
+        graph = nx.DiGraph()
+        graph.add_edges_from(
+            [
+                ("U1", "X1"),
+                ("U1", "X2"),
+                ("U2", "X1"),
+                ("U2", "X2"),
+                ("U3", "X1"),
+                ("U3", "X2"),
+                ("U3", "X3"),
+                ("U4", "X3"),
+                ("U4", "X4"),
+                ("U5", "X4"),
+                ("U5", "X3"),
+                ("U6", "X4"),
+                ("U6", "X5"),
+            ]
+        )
+        set_latent(graph, ["U1", "U2", "U3", "U4", "U5", "U6"])
+        _, removed = remove_redundant_latents(graph)
+        # U1 and U2 are contained in U3, U5 duplicates U4, and U6 is kept
+        self.assertEqual({"U1", "U2", "U5"}, removed)
+        self.assertEqual({"U3", "U4", "U6"}, set(iter_latents(graph)))
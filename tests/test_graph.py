@@ -10,8 +10,9 @@ import networkx as nx
 from ananke.graphs import ADMG
 
 from y0.examples import verma_1
-from y0.graph import DEFAULT_TAG, DEFULT_PREFIX, NxMixedGraph
+from y0.graph import DEFAULT_TAG, DEFULT_PREFIX, GraphChange, NxMixedGraph, set_latent
 from y0.resources import VIRAL_PATHOGENESIS_PATH
+from .utils import get_rng, random_graph
 
 
 class TestGraph(unittest.TestCase):
@@ -193,6 +194,104 @@ class TestGraph(unittest.TestCase):
         self.assertEqual({"X", "Z"}, graph.ancestors_inclusive({"Z"}))
         self.assertEqual({"X"}, graph.ancestors_inclusive({"X"}))
 
+    def test_ancestor_index(self):
+        """Test the cached ancestor index agrees with networkx after subgraphs and interventions."""
+        rng = get_rng()
+        for _ in range(20):
+            nodes = list(range(rng.randint(2, 15)))
+            graph = random_graph(rng, nodes, directed=0.3)
+            for _ in range(3):
+                sources = rng.sample(
+                    sorted(graph.nodes()), rng.randint(1, graph.directed.number_of_nodes())
+                )
+                expected_ancestors, expected_descendants = set(sources), set(sources)
+                for source in sources:
+                    expected_ancestors.update(nx.ancestors(graph.directed, source))
+                    expected_descendants.update(nx.descendants(graph.directed, source))
+                self.assertEqual(expected_ancestors, graph.ancestors_inclusive(sources))
+                self.assertEqual(expected_descendants, graph.descendants_inclusive(sources))
+
+                vertices = rng.sample(
+                    sorted(graph.nodes()), rng.randint(1, graph.directed.number_of_nodes())
+                )
+                if rng.random() < 0.5:
+                    graph = graph.subgraph(vertices)
+                else:
+                    graph = graph.intervene(vertices)
+                # the index carried over to the new graph agrees with its edges
+                index = graph.get_ancestor_index()
+                for node in graph.nodes():
+                    self.assertEqual(
+                        nx.ancestors(graph.directed, node) | {node},
+                        index.ancestors_inclusive([node]),
+                    )
+                    self.assertEqual(
+                        nx.descendants(graph.directed, node) | {node},
+                        index.descendants_inclusive([node]),
+                    )
+
+        # edits made after the index is built are reflected in later results
+        graph = NxMixedGraph.from_edges(directed=[("X", "Y")])
+        self.assertEqual({"X", "Y"}, graph.ancestors_inclusive({"Y"}))
+        self.assertEqual({"X", "Y"}, graph.descendants_inclusive({"X"}))
+        graph.add_directed_edge("Z", "X")
+        self.assertEqual({"X", "Y", "Z"}, graph.ancestors_inclusive({"Y"}))
+        self.assertEqual({"X", "Y", "Z"}, graph.descendants_inclusive({"Z"}))
+        graph.remove_directed_edge("X", "Y")
+        self.assertEqual({"Y"}, graph.ancestors_inclusive({"Y"}))
+        self.assertEqual({"X", "Z"}, graph.descendants_inclusive({"Z"}))
+        self.assertEqual({"X", "Z"}, graph.remove_nodes_from({"Y"}).ancestors_inclusive({"X"}))
+
+    def test_versions(self):
+        """Test the change log and that derived structures are recalculated after changes."""
+        graph = NxMixedGraph()
+        graph.add_directed_edge("X", "Y")
+        graph.add_directed_edge("X", "Y")
+        self.assertEqual(3, graph.version)
+        self.assertEqual(
+            [
+                GraphChange(1, "add", "node", "X"),
+                GraphChange(2, "add", "node", "Y"),
+                GraphChange(3, "add", "directed", ("X", "Y")),
+            ],
+            graph.changes,
+        )
+
+        # each ADMG is a new object, so changing one doesn't affect the others
+        admg = graph.to_admg()
+        self.assertIsNot(admg, graph.to_admg())
+        admg.add_biedge("X", "Y")
+        self.assertEqual(set(), set(graph.to_admg().bi_edges))
+        self.assertEqual(
+            [frozenset("X"), frozenset("Y")], sorted(graph.get_c_components(), key=min)
+        )
+        self.assertEqual(["X", "Y"], list(graph.topological_sort()))
+
+        graph.add_undirected_edge("X", "Z")
+        self.assertEqual(
+            [GraphChange(4, "add", "node", "Z"), GraphChange(5, "add", "undirected", ("X", "Z"))],
+            graph.changes_since(3),
+        )
+        self.assertEqual({("X", "Z")}, set(graph.to_admg().bi_edges))
+        self.assertEqual(
+            [frozenset("XZ"), frozenset("Y")], sorted(graph.get_c_components(), key=min)
+        )
+
+        graph.remove_directed_edge("X", "Y")
+        graph.remove_undirected_edge("X", "Z")
+        self.assertEqual(
+            [
+                GraphChange(6, "remove", "directed", ("X", "Y")),
+                GraphChange(7, "remove", "undirected", ("X", "Z")),
+            ],
+            graph.changes_since(5),
+        )
+        self.assertEqual({"X", "Y", "Z"}, set(graph.nodes()))
+        self.assertEqual(3, len(graph.get_c_components()))
+        self.assertEqual({"Y"}, graph.ancestors_inclusive({"Y"}))
+        with self.assertRaises(nx.NetworkXError):
+            graph.remove_directed_edge("X", "Y")
+
     def test_get_c_components(self):
         """Test that get_c_components works correctly."""
         g1 = NxMixedGraph().from_edges(directed=[("X", "Y"), ("Z", "X"), ("Z", "Y")])
@@ -204,3 +303,70 @@ class TestGraph(unittest.TestCase):
         for graph, components in [(g1, c1), (g2, c2), (g3, c3)]:
             self.assertIsInstance(graph, NxMixedGraph)
             self.assertEqual(components, graph.get_c_components())
+
+    def test_hyperedges(self):
+        """Test that hyperedges behave like cliques of undirected edges."""
+        graph = NxMixedGraph.from_edges(
+            directed=[("A", "B"), ("B", "C"), ("C", "D")],
+            hyperedges={"U": {"A", "C", "D"}},
+        )
+        expanded = NxMixedGraph.from_edges(
+            directed=[("A", "B"), ("B", "C"), ("C", "D")],
+            undirected=[("A", "C"), ("A", "D"), ("C", "D")],
+        )
+        self.assertEqual(expanded, graph.expand_hyperedges())
+        self.assertEqual({frozenset("ACD"), frozenset("B")}, set(graph.get_c_components()))
+        self.assertEqual(
+            set(map(frozenset, expanded.to_admg().bi_edges)),
+            set(map(frozenset, graph.to_admg().bi_edges)),
+        )
+
+        subgraph = graph.subgraph({"A", "B", "C"})
+        self.assertEqual({"U": frozenset("AC")}, subgraph.hyperedges)
+        self.assertEqual({"U": frozenset("CD")}, graph.intervene({"A"}).hyperedges)
+        self.assertEqual({}, graph.remove_nodes_from({"A", "C"}).hyperedges)
+        self.assertEqual(graph.hyperedges, graph.remove_outgoing_edges_from({"A"}).hyperedges)
+
+    def test_hyperedge_latent_variable_dag(self):
+        """Test keeping the latent variables from a latent variable DAG as hyperedges."""
+        dag = nx.DiGraph([("U", "A"), ("U", "B"), ("U", "C"), ("A", "B")])
+        nx.set_node_attributes(dag, False, DEFAULT_TAG)
+        dag.nodes["U"][DEFAULT_TAG] = True
+
+        graph = NxMixedGraph.from_latent_variable_dag(dag, hyperedges=True)
+        self.assertEqual({"U": frozenset("ABC")}, graph.hyperedges)
+        self.assertEqual(0, graph.undirected.number_of_edges())
+        self.assertEqual(NxMixedGraph.from_latent_variable_dag(dag), graph.expand_hyperedges())
+
+        reconstituted = graph.to_latent_variable_dag()
+        self.assertEqual(set(dag.edges()), set(reconstituted.edges()))
+        self.assertTrue(reconstituted.nodes["U"][DEFAULT_TAG])
+
+    def test_latent_projection(self):
+        """Test projecting a latent variable DAG with latent parents and chains of latents."""
+        dag = nx.DiGraph(
+            [
+                ("A", "U1"),
+                ("U1", "B"),
+                ("U1", "U2"),
+                ("U2", "C"),
+                ("U2", "D"),
+                ("C", "U3"),
+                ("U3", "D"),
+            ]
+        )
+        set_latent(dag, {"U1", "U2", "U3"})
+        expected_dag = dag.copy()
+
+        graph = NxMixedGraph.from_latent_variable_dag(dag)
+        self.assertTrue(nx.utils.graphs_equal(expected_dag, dag), msg="input was modified")
+        self.assertEqual(
+            NxMixedGraph.from_edges(
+                directed=[("A", "B"), ("A", "C"), ("A", "D"), ("C", "D")],
+                undirected=[("B", "C"), ("B", "D"), ("C", "D")],
+            ),
+            graph,
+        )
+
+        graph = NxMixedGraph.from_latent_variable_dag(dag, hyperedges=True)
+        self.assertEqual({"U1": frozenset("BCD")}, graph.hyperedges)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""Utilities for tests."""
+
+import itertools as itt
+import random
+from typing import Sequence
+
+from y0.graph import NxMixedGraph
+
+__all__ = [
+    "get_rng",
+    "random_graph",
+]
+
+
+def get_rng(seed: int = 0) -> random.Random:
+    """Get a seeded random number generator for sampling test cases.
+
+    :param seed: The seed, so the test cases are the same on every run
+    :returns: A random number generator
+    """
+    return random.Random(seed)  # noqa: S311
+
+
+def random_graph(
+    rng: random.Random,
+    nodes: Sequence,
+    directed: float,
+    undirected: float = 0.0,
+) -> NxMixedGraph:
+    """Sample a random acyclic directed mixed graph over the nodes.
+
+    Each pair of nodes gets a directed edge from the earlier node to the later one with the
+    given probability, so the order of the nodes is a topological order. Then, each pair
+    gets a bidirected edge with its own probability.
+
+    :param rng: A random number generator, from :func:`get_rng`
+    :param nodes: The nodes of the graph
+    :param directed: The probability of each directed edge
+    :param undirected: The probability of each bidirected edge. If zero, no random numbers
+        are drawn for them.
+    :returns: A graph with all of the nodes
+    """
+    return NxMixedGraph.from_edges(
+        nodes=nodes,
+        directed=[(u, v) for u, v in itt.combinations(nodes, 2) if rng.random() < directed],
+        undirected=[
+            (u, v) for u, v in itt.combinations(nodes, 2) if undirected and rng.random() < undirected
+        ],
+    )